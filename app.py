@@ -1,10 +1,27 @@
-from flask import Flask, render_template, jsonify, send_from_directory
-import os
-import re
-from config.vsphere_conn import get_all_hosts_name
+from flask import Flask, Response, render_template, jsonify, send_from_directory, request, abort
+import gzip
+import json
+import hashlib
+from config.run_store import latest_run, run_path, list_runs, load_manifest, diff_runs
+from config.result_index import get_result_index
+from config.host_list import get_host_list
+
+try:
+    import brotli  # 可选依赖：未安装时只提供 gzip
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 
+# 小于该大小的响应不压缩
+GZIP_MIN_SIZE = 1024
+
+# 支持的响应压缩（Content-Encoding -> 压缩函数），客户端同样接受时按顺序优先
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=5)
+ENCODERS["gzip"] = lambda body: gzip.compress(body, compresslevel=6)
+
 DEFAULT_HOSTS = [
     'vx-t-esxi-uat08.vsphere.aiib.org', 'vx-t-esxi-uat09.vsphere.aiib.org',
     'vx-t-esxi-uat07.vsphere.aiib.org', 'vx-p-esxi-csz08.vsphere.aiib.org',
@@ -34,26 +51,139 @@ def serve_log(filename):
     return send_from_directory('log', filename)
 
 
-@app.route('/log_files')
-def log_files():
-    log_dir = 'log'
-    files = [f"/log/{f}" for f in os.listdir(log_dir) if f.endswith('.json')]
+@app.route('/runs/<run_id>/<path:filename>')
+def serve_run_file(run_id, filename):
+    return send_from_directory(run_path(run_id), filename)
+
+
+@app.route('/runs')
+def runs():
+    """已完成的运行列表（新的在前）"""
+    result = []
+    for run_id in reversed(list_runs()):
+        manifest = load_manifest(run_id) or {}
+        result.append({
+            "RunId": run_id,
+            "StartedAt": manifest.get("StartedAt"),
+            "FinishedAt": manifest.get("FinishedAt"),
+            "Selection": manifest.get("Selection"),
+            "Files": len(manifest.get("Files", {})),
+        })
+    return jsonify({"Latest": latest_run(), "Runs": result})
+
+
+@app.route('/runs/diff')
+def runs_diff():
+    """比较两次运行的结果文件（按 manifest 中的摘要），默认比较 latest 和它的上一次运行"""
+    new_id = request.args.get('new') or latest_run()
+    if not new_id:
+        abort(404)
+    old_id = request.args.get('old') or (load_manifest(new_id) or {}).get("Previous")
+    if not old_id:
+        abort(404)
+    return jsonify({"Old": old_id, "New": new_id, **diff_runs(old_id, new_id)})
+
+
+def _results_etag(index):
+    """运行目录完成后内容不再变化，ETag 由运行（manifest 修改时间）和查询参数决定"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    return hashlib.sha1(f"{index.directory}:{index.version}{request.path}?{query}".encode("utf-8")).hexdigest()
 
-    def sort_key(f):
-        # 提取文件名中的数字部分，例如 no_2.1_ => 2.1
-        m = re.search(r'no_(\d+(?:\.\d+)*)_', f)
-        if m:
-            parts = m.group(1).split('.')
-            return tuple(int(p) for p in parts)
-        return (0,)  # 如果没有匹配，排在最前面
 
-    return jsonify(sorted(files, key=sort_key))
+def _cached_json(index, etag, build):
+    """
+    JSON 响应：支持 If-None-Match（304），响应较大时按客户端的 Accept-Encoding 压缩（br 优先，其次 gzip）；
+    序列化（及压缩）后的响应体按查询参数和编码缓存在运行索引中，同一运行的相同查询只生成一次。
+    压缩后的响应体使用 "<etag>-br" / "<etag>-gzip"，和未压缩的响应体区分开（强 ETag 要求同一个值对应的字节完全相同）
+    """
+    encoding = request.accept_encodings.best_match(list(ENCODERS))
+    encoded_etag = f"{etag}-{encoding}" if encoding else None
+    if encoded_etag and encoded_etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(encoded_etag)
+    elif etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+    else:
+        def encode():
+            body = json.dumps(build(), ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+            if encoding and len(body) >= GZIP_MIN_SIZE:
+                return ENCODERS[encoding](body), True
+            return body, False
+
+        query = tuple(sorted(request.args.items(multi=True)))
+        body, compressed = index.cached_response((request.path, query, encoding), encode)
+        response = Response(body, mimetype="application/json")
+        if compressed:
+            response.headers["Content-Encoding"] = encoding
+        response.set_etag(encoded_etag if compressed else etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    # 每次使用前向服务端验证，latest 切换后页面立即拿到新结果
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route('/api/results')
+def api_results():
+    """
+    一次返回一次运行的全部检查记录（页面只需要一次请求），参数：
+    run（默认 latest）、host（同时返回 ALL_HOSTS 汇总记录）、status、check（AIIB.No）、
+    offset / limit（分页，limit 为空时返回全部，负数返回 400）
+    """
+    index = get_result_index().get(request.args.get('run'))
+    if index is None:
+        abort(404)
+    try:
+        offset = max(int(request.args.get('offset') or 0), 0)
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+    except ValueError:
+        abort(400)
+    if limit is not None and limit < 0:
+        abort(400)
+
+    def build():
+        records = index.select(
+            host=request.args.get('host') or None,
+            status=request.args.get('status') or None,
+            aiib_no=request.args.get('check') or None,
+        )
+        return {
+            "Run": index.run_id,
+            "Total": len(records),
+            "Offset": offset,
+            "Limit": limit,
+            "Records": records[offset:offset + limit] if limit is not None else records[offset:],
+        }
+
+    return _cached_json(index, _results_etag(index), build)
+
+
+@app.route('/api/summary')
+def api_summary():
+    """
+    一次运行的汇总（参数 run，默认 latest）：总数，按检查 / 章节 / 主机的状态计数，
+    以及主机 × 检查的状态矩阵（Matrix.Rows 每台主机一个字符串，字符含义见 Matrix.Codes）
+    """
+    index = get_result_index().get(request.args.get('run'))
+    if index is None:
+        abort(404)
+    return _cached_json(index, _results_etag(index), lambda: index.summary)
+
+
+@app.route('/log_files')
+def log_files():
+    # latest 指向的运行目录中的结果文件（来自内存索引），还没有运行目录时为 log/
+    index = get_result_index().get()
+    if index is None:
+        return jsonify([])
+    prefix = f"/runs/{index.run_id}/" if index.run_id else "/log/"
+    return jsonify([prefix + f for f in index.files])
 
 
-# 新增 API：返回所有 ESXi 主机名
+# 新增 API：返回所有 ESXi 主机名（来自采集缓存，后台定时从 vCenter 刷新；都没有时为 DEFAULT_HOSTS）
 @app.route('/all_hosts')
 def all_hosts():
-    return jsonify(DEFAULT_HOSTS)
+    return jsonify(get_host_list(DEFAULT_HOSTS).get())
 
 
 if __name__ == '__main__':
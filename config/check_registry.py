@@ -0,0 +1,200 @@
+# config/check_registry.py
+
+import re
+import ast
+import fnmatch
+import logging
+import importlib
+import importlib.util
+from typing import List, Dict, Any, Iterable, Set
+
+logger = logging.getLogger(__name__)
+
+# === 检查注册表（按 AIIB 编号顺序），只在调度到该检查时才导入模块 ===
+# (AIIB.No, CIS.No, vmware_cis_checks 下的模块名, Automated / Manual)
+# Tag、规则等其余信息取模块的 CHECK_INFO，依赖的主机数据项由 pipeline.check_facts 从规则定义推导
+CHECKS = [
+    ("1.1", "2.1", "software_general_manual", "Manual"),
+    ("1.2", "2.6", "ntp_info", "Automated"),
+    ("1.3", "2.7", "time_sync_manual", "Manual"),
+    ("1.4", "2.10", "mem_share_salt", "Automated"),
+    ("2.1", "3.1", "tsm_ssh", "Automated"),
+    ("2.2", "3.2", "tsm", "Automated"),
+    ("2.3", "3.3", "solo_enable_moob", "Automated"),
+    ("2.4", "3.6", "snmp", "Automated"),
+    ("2.5", "3.7", "dcui_timeout", "Automated"),
+    ("2.6", "3.10", "shell_warning", "Automated"),
+    ("2.7", "3.11", "password_complexity", "Automated"),
+    ("2.8", "3.12", "account_lock_failure", "Automated"),
+    ("2.9", "3.13", "account_unlock_time", "Automated"),
+    ("2.10", "3.14", "password_history", "Automated"),
+    ("2.11", "3.15", "password_max_days", "Automated"),
+    ("2.12", "3.16", "session_timeout_api", "Automated"),
+    ("2.13", "3.17", "idle_timeout", "Automated"),
+    ("2.14", "3.18", "dcui_access", "Automated"),
+    ("2.15", "3.19", "exception_users", "Automated"),
+    ("2.16", "3.26", "tls_version", "Automated"),
+    ("3.1", "4.1", "syslog_persistent", "Automated"),
+    ("3.2", "4.2", "syslog_remote_loghost", "Automated"),
+    ("3.3", "4.4", "hostagent_log_level", "Automated"),
+    ("3.4", "4.5", "log_filtering", "Automated"),
+    ("3.5", "4.10", "tls_log_verify", "Automated"),
+    ("4.1", "5.1", "firewall_services_manual", "Manual"),
+    ("4.2", "5.3", "collect_dvfilter", "Automated"),
+    ("4.3", "5.4", "bpdu_filter", "Automated"),
+    ("4.4", "5.6", "forged_transmits", "Automated"),
+    ("4.5", "5.7", "mac_changes", "Automated"),
+    ("4.6", "5.8", "vss_promiscuous_mode", "Automated"),
+    ("4.7", "5.9", "vss_vlan_restrict", "Automated"),
+    ("4.8", "5.10", "vss_vgt_check", "Automated"),
+    ("4.9", "5.11", "management_network_manual", "Manual"),
+    ("5.1", "6.2.2", "datastore_unique_names", "Automated"),
+    ("6.1", "7.4", "vm_3d_graphics_status", "Automated"),
+    ("6.2", "7.7", "vm_pci_passthru", "Automated"),
+    ("6.3", "7.10", "vm_audio_device_manual", "Automated"),
+    ("6.4", "7.11", "vm_ahci_device_manual", "Automated"),
+    ("6.5", "7.12", "vm_usb_settings", "Automated"),
+    ("6.6", "7.13", "vm_serial_port", "Automated"),
+    ("6.7", "7.14", "vm_parallel_port", "Automated"),
+    ("6.8", "7.15", "vm_cd_drive", "Automated"),
+    ("6.9", "7.16", "vm_floppy_drive", "Automated"),
+    ("6.10", "7.29", "vm_hardware_version_manual", "Automated"),
+    ("7.1", "8.2", "vmware_tools_update_manual", "Automated"),
+    ("7.2", "8.3", "vmware_tools_auto_upgrade_manual", "Automated"),
+    ("7.3", "8.4", "vmware_tools_prevent_recustomization_manual", "Manual"),
+]
+
+# 编号类筛选条件（数字、点和通配符）
+_NUMBER_PATTERN = re.compile(r"^[\d.*?\[\]]+$")
+
+# AIIB.No 第一段 -> 章节
+SECTIONS = {
+    "1": "Install",
+    "2": "Access",
+    "3": "Logging",
+    "4": "Network",
+    "5": "Storage",
+    "6": "VM",
+    "7": "VMware Tools",
+}
+
+
+def read_check_info(module_name: str) -> Dict[str, Any]:
+    """从模块源码中读取 CHECK_INFO 字面量，不导入模块（不需要 pyVmomi，也不连接 vCenter）"""
+    spec = importlib.util.find_spec(module_name)
+    with open(spec.origin, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), spec.origin)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "CHECK_INFO" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"{module_name} 没有定义 CHECK_INFO")
+
+
+class CheckEntry:
+    """注册表中的一项检查；列出、筛选检查只读取模块源码中的 CHECK_INFO，module 在第一次访问时才导入"""
+
+    def __init__(self, aiib_no: str, cis_no: str, name: str, mode: str):
+        self.aiib_no = aiib_no
+        self.cis_no = cis_no
+        self.module_name = f"vmware_cis_checks.{name}"
+        self.short_name = name
+        self.mode = mode
+        self.section = SECTIONS.get(aiib_no.split(".")[0], "")
+        self._module = None
+        self._info = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            self._module = importlib.import_module(self.module_name)
+        return self._module
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        """模块的 CHECK_INFO（模块未导入时从源码读取）"""
+        if self._info is None:
+            self._info = self._module.CHECK_INFO if self._module is not None else read_check_info(self.module_name)
+        return self._info
+
+    @property
+    def tag(self) -> str:
+        """CHECK_INFO["Tag"] 去掉方括号"""
+        return self.info.get("Tag", "").strip("[]")
+
+    @property
+    def facts(self) -> Set[str]:
+        """依赖的主机数据项（HostFacts.data 的键，见 pipeline.check_facts），需要导入模块和规则引擎"""
+        from config.pipeline import check_facts
+
+        return check_facts(self.module)
+
+    def matches(self, token: str) -> bool:
+        """
+        判断检查是否匹配一个筛选条件：
+        - 编号通配符，如 2.* / 3.1 / 6.1?（只匹配 AIIB.No）
+        - 章节编号或名称，如 4 / Network
+        - Automated / Manual
+        - 模块名通配符或 Tag，如 tsm / vm_* / "API Session Timeout"（不区分大小写）
+        """
+        token = token.strip()
+        if _NUMBER_PATTERN.match(token):
+            if "." not in token and not any(c in token for c in "*?["):
+                return self.aiib_no.split(".")[0] == token
+            return fnmatch.fnmatchcase(self.aiib_no, token)
+
+        lowered = token.lower()
+        if lowered in (self.section.lower(), self.mode.lower()):
+            return True
+        if fnmatch.fnmatchcase(self.short_name.lower(), lowered):
+            return True
+        return self.tag.lower() == lowered
+
+    def __repr__(self):
+        return f"CheckEntry({self.aiib_no}, {self.module_name})"
+
+
+class CheckRegistry:
+    """全部检查的注册表，main.py / run_check.py 共用，列出或按编号筛选检查时不导入检查模块"""
+
+    def __init__(self, checks=CHECKS):
+        self.entries: List[CheckEntry] = [CheckEntry(*row) for row in checks]
+        self._by_no: Dict[str, CheckEntry] = {e.aiib_no: e for e in self.entries}
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, aiib_no: str) -> CheckEntry:
+        if aiib_no not in self._by_no:
+            raise KeyError(f"未知的检查编号 {aiib_no}")
+        return self._by_no[aiib_no]
+
+    def select(self, only: List[str] = None) -> List[CheckEntry]:
+        """
+        筛选检查，保持注册表顺序；多个条件之间为“或”
+        :param only: 筛选条件列表（如 ["2.*", "3.1", "Network", "tsm"]，见 CheckEntry.matches），为空时返回全部
+        """
+        if not only:
+            return list(self.entries)
+        tokens = [t.strip() for t in only if t.strip()]
+        selected = [e for e in self.entries if any(e.matches(t) for t in tokens)]
+        if not selected:
+            raise KeyError(f"没有匹配 {','.join(tokens)} 的检查")
+        return selected
+
+
+def required_facts(entries: Iterable[CheckEntry]) -> Set[str]:
+    """一组检查需要采集的主机数据项（并集），只运行部分检查时只采集这些数据项"""
+    return {fact for entry in entries for fact in entry.facts}
+
+
+_registry: CheckRegistry = None
+
+
+def get_registry() -> CheckRegistry:
+    global _registry
+    if _registry is None:
+        _registry = CheckRegistry()
+    return _registry
@@ -0,0 +1,257 @@
+# config/cmdb_exporter.py
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from typing import List, Dict, Any, Iterator, Tuple, Callable
+
+from config import settings
+from config.run_store import latest_run, run_path, load_manifest, MANIFEST
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ["run_id", "file", "seq", "host", "aiib_no", "cis_no", "name", "vcenter", "status", "value",
+            "description", "error", "updated_at"]
+# 一条记录 = 运行 + 结果文件 + 文件内序号；同一主机同一检查可以有多条记录（如每个 vCenter 一条错误记录）
+_KEY_COLUMNS = ("run_id", "file", "seq")
+
+# MySQL 可重试的错误码：连接断开 / 丢失、死锁、锁等待超时
+_TRANSIENT_MYSQL_ERRORS = {2003, 2006, 2013, 1205, 1213}
+
+
+class MysqlDialect:
+    """PyMySQL + DATABASE_CONFIG；executemany 会把整批改写成一条多行 INSERT，一批一次往返"""
+
+    paramstyle = "%s"
+
+    def __init__(self, db_config: Dict[str, Any]):
+        self.db_config = db_config
+
+    def connect(self):
+        import pymysql
+        return pymysql.connect(**self.db_config, autocommit=False)
+
+    def ddl(self, table: str) -> str:
+        return f"""
+CREATE TABLE IF NOT EXISTS `{table}` (
+    `id`          BIGINT AUTO_INCREMENT PRIMARY KEY,
+    `run_id`      VARCHAR(32)  NOT NULL,
+    `file`        VARCHAR(255) NOT NULL,
+    `seq`         INT          NOT NULL,
+    `host`        VARCHAR(255) NOT NULL,
+    `aiib_no`     VARCHAR(16)  NOT NULL,
+    `cis_no`      VARCHAR(16),
+    `name`        VARCHAR(255),
+    `vcenter`     VARCHAR(255),
+    `status`      VARCHAR(16),
+    `value`       MEDIUMTEXT,
+    `description` TEXT,
+    `error`       TEXT,
+    `updated_at`  DATETIME,
+    UNIQUE KEY `uk_run_file_seq` (`run_id`, `file`, `seq`),
+    KEY `idx_run_host_check` (`run_id`, `host`, `aiib_no`),
+    KEY `idx_host` (`host`),
+    KEY `idx_status` (`run_id`, `status`)
+) DEFAULT CHARSET=utf8mb4"""
+
+    def upsert(self, table: str) -> str:
+        updates = ", ".join(f"`{c}` = VALUES(`{c}`)" for c in _COLUMNS if c not in _KEY_COLUMNS)
+        return (f"INSERT INTO `{table}` ({', '.join(f'`{c}`' for c in _COLUMNS)}) "
+                f"VALUES ({', '.join([self.paramstyle] * len(_COLUMNS))}) "
+                f"ON DUPLICATE KEY UPDATE {updates}")
+
+    def ping(self, conn):
+        conn.ping(reconnect=True)
+
+    def is_transient(self, error: Exception) -> bool:
+        import pymysql
+        if isinstance(error, pymysql.err.InterfaceError):
+            return True
+        return isinstance(error, pymysql.err.OperationalError) and error.args and \
+            error.args[0] in _TRANSIENT_MYSQL_ERRORS
+
+
+class SqliteDialect:
+    """本地 SQLite 替身（CMDB_EXPORT_SQLITE），用于在没有 MySQL 的环境验证导出逻辑"""
+
+    paramstyle = "?"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        return sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+
+    def ddl(self, table: str) -> str:
+        columns = ",\n    ".join(f"{c} {'INTEGER' if c == 'seq' else 'TEXT'}" + (" NOT NULL" if c in _KEY_COLUMNS else "")
+                                   for c in _COLUMNS)
+        return f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    {columns},
+    UNIQUE ({', '.join(_KEY_COLUMNS)})
+)"""
+
+    def upsert(self, table: str) -> str:
+        updates = ", ".join(f"{c} = excluded.{c}" for c in _COLUMNS if c not in _KEY_COLUMNS)
+        return (f"INSERT INTO {table} ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join([self.paramstyle] * len(_COLUMNS))}) "
+                f"ON CONFLICT ({', '.join(_KEY_COLUMNS)}) DO UPDATE SET {updates}")
+
+    def ping(self, conn):
+        conn.execute("SELECT 1")
+
+    def is_transient(self, error: Exception) -> bool:
+        return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+
+def _record_rows(run_id: str, run_dir: str, files: List[str]) -> Iterator[Tuple]:
+    """把运行目录中的结果文件转换为表中的行；Host 为空的记录（vCenter 级错误）以 vCenter 作为主机键"""
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    for name in files:
+        with open(os.path.join(run_dir, name), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if not isinstance(records, list):
+            continue
+        for seq, record in enumerate(records):
+            value = record.get("Value")
+            yield (
+                run_id,
+                name,
+                seq,
+                record.get("Host") or record.get("VCenter") or "",
+                record.get("AIIB.No") or "",
+                record.get("CIS.No", record.get("CIS.NO")),
+                record.get("Name"),
+                record.get("VCenter"),
+                record.get("Status"),
+                value if isinstance(value, str) or value is None else json.dumps(value, ensure_ascii=False, default=str),
+                record.get("Description"),
+                record.get("Error"),
+                now,
+            )
+
+
+class CmdbExporter:
+    """
+    把一次运行的全部记录写入 CMDB（auto_cmdb）：
+    - executemany 分批写入，(run_id, file, seq) 唯一，重复导出同一次运行时按 upsert 覆盖
+    - 每批一个事务；遇到连接断开、死锁等临时错误时回滚，等待后重试该批
+    - 分批顺序写入，只使用一个连接（出错后丢弃，重试时重新连接）
+    """
+
+    def __init__(self, dialect=None, table: str = None, batch_size: int = None, retries: int = None):
+        config = settings.CMDB_EXPORT_CONFIG
+        if dialect is None:
+            if config["sqlite_path"]:
+                dialect = SqliteDialect(config["sqlite_path"])
+            else:
+                dialect = MysqlDialect(settings.get_database_config(config["env"]))
+        self.dialect = dialect
+        self.table = table or config["table"]
+        self.batch_size = batch_size or config["batch_size"]
+        self.retries = config["retries"] if retries is None else retries
+        self._conn = None
+        self._table_ready = False
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self.dialect.connect()
+        else:
+            self.dialect.ping(self._conn)
+        return self._conn
+
+    def _discard(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _with_retry(self, action: Callable[[Any], None], description: str):
+        for attempt in range(self.retries + 1):
+            try:
+                conn = self._connection()
+                try:
+                    action(conn)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                return
+            except Exception as e:
+                self._discard()
+                if attempt >= self.retries or not self.dialect.is_transient(e):
+                    raise
+                wait_seconds = 2 ** attempt
+                logger.warning("[CMDB] %s 失败，%ds 后重试 (%d/%d): %s",
+                               description, wait_seconds, attempt + 1, self.retries, e)
+                time.sleep(wait_seconds)
+
+    def ensure_table(self):
+        if self._table_ready:
+            return
+
+        def create(conn):
+            cursor = conn.cursor()
+            cursor.execute(self.dialect.ddl(self.table))
+            cursor.close()
+
+        self._with_retry(create, "建表")
+        self._table_ready = True
+
+    def export_rows(self, rows: Iterator[Tuple]) -> int:
+        self.ensure_table()
+        sql = self.dialect.upsert(self.table)
+        count = 0
+        batch: List[Tuple] = []
+
+        def flush(rows_batch: List[Tuple]):
+            def write(conn):
+                cursor = conn.cursor()
+                cursor.executemany(sql, rows_batch)
+                cursor.close()
+
+            self._with_retry(write, f"写入 {len(rows_batch)} 条记录")
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                flush(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            flush(batch)
+            count += len(batch)
+        return count
+
+    def export_run(self, run_id: str = None, base_dir: str = None) -> int:
+        """导出一次运行（默认 latest）的全部结果文件，包括从上一次运行沿用的文件"""
+        run_id = run_id or latest_run(base_dir)
+        manifest = load_manifest(run_id, base_dir) if run_id else None
+        if manifest is None:
+            raise FileNotFoundError(f"运行 {run_id} 不存在或未完成")
+
+        started = time.monotonic()
+        files = [name for name in manifest["Files"] if name != MANIFEST]
+        count = self.export_rows(_record_rows(run_id, run_path(run_id, base_dir), files))
+        logger.info("[CMDB] 运行 %s 已导出 %d 条记录到 %s (%.2fs)",
+                    run_id, count, self.table, time.monotonic() - started)
+        return count
+
+    def close(self):
+        self._discard()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    import sys
+
+    exporter = CmdbExporter()
+    try:
+        exporter.export_run(sys.argv[1] if len(sys.argv) > 1 else None)
+    finally:
+        exporter.close()
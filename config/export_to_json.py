@@ -1,16 +1,112 @@
+import os
 import json
 import logging
-from typing import List, Dict, Any
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Union
+
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+_INDENT = 4
+
+
+@contextmanager
+def atomic_open(filename: str, newline: str = None):
+    """
+    先写入同目录下的临时文件，正常结束后 os.replace 原子替换目标文件，
+    读取方（如 Flask 页面）只会看到旧文件或完整的新文件；出错时删除临时文件，目标文件保持不变。
+    临时文件名带进程号和线程号，同一进程内多个线程同时写同一个文件时互不覆盖（后完成的替换生效）
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    tmp_path = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline=newline) as f:
+            yield f
+        os.replace(tmp_path, filename)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class JsonStreamWriter:
+    """
+    逐条写出记录的 JSON 文件，不在内存中保留完整列表（原子替换，见 atomic_open）：
+    - ndjson=False 时写成 JSON 数组（缩进格式与原来 json.dump(indent=4) 一致），ndjson=True 时每行一条记录
+    - compact=True 时不缩进、分隔符不带空格
+
+    用法：
+        with JsonStreamWriter(path) as writer:
+            for record in records:
+                writer.write(record)
+    """
+
+    def __init__(self, filename: str, ndjson: bool = False, compact: bool = None):
+        self.filename = filename
+        self.ndjson = ndjson
+        self.compact = settings.EXPORT_CONFIG["compact"] if compact is None else compact
+        self.count = 0
+        self._context = None
+        self._file = None
+
+    def _dumps(self, record: Any) -> str:
+        if self.ndjson or self.compact:
+            return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+        text = json.dumps(record, ensure_ascii=False, indent=_INDENT, default=str)
+        # 数组元素整体再缩进一级（JSON 字符串中的换行已转义，按行缩进是安全的）
+        return " " * _INDENT + text.replace("\n", "\n" + " " * _INDENT)
+
+    def __enter__(self) -> "JsonStreamWriter":
+        self._context = atomic_open(self.filename)
+        self._file = self._context.__enter__()
+        if not self.ndjson:
+            self._file.write("[")
+        return self
+
+    def write(self, record: Any):
+        if self.ndjson:
+            self._file.write(self._dumps(record) + "\n")
+        else:
+            separator = "," if self.count else ""
+            newline = "" if self.compact else "\n"
+            self._file.write(separator + newline + self._dumps(record))
+        self.count += 1
+
+    def write_all(self, records: Iterable[Any]) -> int:
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and not self.ndjson:
+            self._file.write("\n]" if self.count and not self.compact else "]")
+        return self._context.__exit__(exc_type, exc_value, traceback)
+
 
-def export_to_json(data: List[Dict[str, Any]], filename: str = "output.json") -> None:
-    """导出数据到 JSON 文件"""
+def export_to_json(data: Union[Iterable[Dict[str, Any]], Dict[str, Any]], filename: str = "output.json",
+                   ndjson: bool = False, compact: bool = None) -> int:
+    """
+    导出数据到 JSON 文件（逐条写出、原子替换）
+    :param data: 记录列表或生成器；传入单个 dict 时写成一个 JSON 对象
+    :param ndjson: 每行一条记录，而不是 JSON 数组
+    :param compact: 不缩进（默认取 EXPORT_CONFIG["compact"]）
+    :return: 写出的记录数
+    """
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        if isinstance(data, dict):
+            compact = settings.EXPORT_CONFIG["compact"] if compact is None else compact
+            with atomic_open(filename) as f:
+                if compact:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"), default=str)
+                else:
+                    json.dump(data, f, ensure_ascii=False, indent=_INDENT, default=str)
+            count = 1
+        else:
+            with JsonStreamWriter(filename, ndjson=ndjson, compact=compact) as writer:
+                count = writer.write_all(data)
         logger.info("数据已导出到: %s", filename)
+        return count
     except Exception as e:
         logger.error("导出 JSON 失败: %s", e)
         raise
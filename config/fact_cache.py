@@ -0,0 +1,179 @@
+# config/fact_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 不按数据项单独存储的字段（由 vCenter / moid 列或 error 列表示）
+_META_FIELDS = ("Moid", "VCenter", "Errors")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    vcenter      TEXT PRIMARY KEY,
+    collected_at REAL NOT NULL,
+    hosts        TEXT NOT NULL              -- 主机 moid 列表（JSON），保持采集时的顺序
+);
+CREATE TABLE IF NOT EXISTS facts (
+    vcenter      TEXT NOT NULL,
+    moid         TEXT NOT NULL,
+    path         TEXT NOT NULL,             -- 数据项，如 Host / NTPServers / AdvancedSettings
+    digest       TEXT NOT NULL,             -- value + error 的 sha1，用于判断内容是否变化
+    value        TEXT,                      -- JSON
+    error        TEXT,
+    collected_at REAL NOT NULL,
+    PRIMARY KEY (vcenter, moid, path)
+);
+"""
+
+
+def _digest(value_json: str, error: Optional[str]) -> str:
+    return hashlib.sha1(f"{value_json}\0{error or ''}".encode("utf-8")).hexdigest()
+
+
+class FactCache:
+    """
+    本地 SQLite 采集结果缓存，键为 vCenter + 主机 moid + 数据项。
+    - load(): 快照未超过 max_age 秒时直接返回缓存数据，不连接 vCenter
+    - store(): 写入一次完整采集结果，返回内容有变化的数据项，并删除已不存在的主机
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.FACT_CACHE_CONFIG["path"]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def age(self, vcenter: str) -> Optional[float]:
+        """vCenter 快照距今的秒数，没有快照时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT collected_at FROM snapshots WHERE vcenter = ?", (vcenter,)
+            ).fetchone()
+        return None if row is None else time.time() - row[0]
+
+    def load(self, vcenter: str, max_age: float) -> Optional[List[Dict[str, Any]]]:
+        """
+        读取 vCenter 的缓存快照
+        :param max_age: 允许的最大缓存时间（秒），<= 0 表示不使用缓存
+        :return: 主机标准化数据列表（HostFacts.data 格式），缓存不存在或已过期时返回 None
+        """
+        if max_age is None or max_age <= 0:
+            return None
+
+        with self._lock:
+            snapshot = self._conn.execute(
+                "SELECT collected_at, hosts FROM snapshots WHERE vcenter = ?", (vcenter,)
+            ).fetchone()
+            if snapshot is None or time.time() - snapshot[0] > max_age:
+                return None
+            rows = self._conn.execute(
+                "SELECT moid, path, value, error FROM facts WHERE vcenter = ?", (vcenter,)
+            ).fetchall()
+
+        hosts: Dict[str, Dict[str, Any]] = {}
+        for moid, path, value, error in rows:
+            data = hosts.setdefault(moid, {"Moid": moid, "VCenter": vcenter, "Errors": {}})
+            data[path] = json.loads(value) if value is not None else None
+            if error is not None:
+                data["Errors"][path] = error
+
+        ordered = [hosts[moid] for moid in json.loads(snapshot[1]) if moid in hosts]
+        logger.debug("[FactCache] vCenter %s 使用缓存: %d 台主机 (%.0fs 前采集)",
+                    vcenter, len(ordered), time.time() - snapshot[0])
+        return ordered
+
+    def store(self, vcenter: str, hosts: List[Dict[str, Any]]) -> Set[Tuple[str, str]]:
+        """
+        写入 vCenter 的完整采集结果
+        :param hosts: 主机标准化数据列表（HostFacts.data 格式）
+        :return: 内容有变化（包括新增、删除）的 (moid, 数据项) 集合
+        """
+        now = time.time()
+        changed: Set[Tuple[str, str]] = set()
+
+        with self._lock, self._conn:
+            existing = {
+                (moid, path): digest
+                for moid, path, digest in self._conn.execute(
+                    "SELECT moid, path, digest FROM facts WHERE vcenter = ?", (vcenter,)
+                )
+            }
+
+            rows = []
+            for data in hosts:
+                errors = data.get("Errors", {})
+                for path, value in data.items():
+                    if path in _META_FIELDS:
+                        continue
+                    value_json = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+                    error = errors.get(path)
+                    digest = _digest(value_json, error)
+                    key = (data["Moid"], path)
+                    if existing.pop(key, None) != digest:
+                        changed.add(key)
+                    rows.append((vcenter, data["Moid"], path, digest, value_json, error, now))
+
+            self._conn.executemany(
+                "INSERT INTO facts (vcenter, moid, path, digest, value, error, collected_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (vcenter, moid, path) DO UPDATE SET "
+                "  value = excluded.value, error = excluded.error, "
+                "  digest = excluded.digest, collected_at = excluded.collected_at",
+                rows,
+            )
+            # 本次采集中已不存在的主机 / 数据项
+            changed.update(existing)
+            self._conn.executemany(
+                "DELETE FROM facts WHERE vcenter = ? AND moid = ? AND path = ?",
+                [(vcenter, moid, path) for moid, path in existing],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (vcenter, collected_at, hosts) VALUES (?, ?, ?)",
+                (vcenter, now, json.dumps([data["Moid"] for data in hosts])),
+            )
+
+        logger.info("[FactCache] vCenter %s 已缓存 %d 台主机, %d 项数据有变化",
+                    vcenter, len(hosts), len(changed))
+        return changed
+
+    def host_names(self) -> Dict[str, Tuple[float, List[str]]]:
+        """
+        缓存中各 vCenter 的主机名（不检查是否过期，不连接 vCenter）
+        :return: {vCenter: (采集时间戳, 主机名列表)}
+        """
+        with self._lock:
+            snapshots = self._conn.execute("SELECT vcenter, collected_at FROM snapshots").fetchall()
+            rows = self._conn.execute("SELECT vcenter, value FROM facts WHERE path = 'Host'").fetchall()
+        result: Dict[str, Tuple[float, List[str]]] = {vcenter: (collected_at, []) for vcenter, collected_at in snapshots}
+        for vcenter, value in rows:
+            if vcenter in result and value is not None:
+                result[vcenter][1].append(json.loads(value))
+        return result
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: FactCache = None
+_cache_lock = threading.Lock()
+
+
+def get_fact_cache() -> FactCache:
+    """进程内共用一个缓存连接"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FactCache()
+        return _cache
@@ -0,0 +1,414 @@
+# config/facts.py
+
+import json
+import logging
+from collections import namedtuple
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from pyVmomi import vim
+from config import settings
+from config.inventory import (HostRecord, get_host_inventory, get_vm_inventory, get_datastore_inventory,
+                              host_properties, match_host)
+from config.vsphere_conn import VsphereSessionPool, run_on_vcenters, get_vcenter_list
+from config.fact_cache import FactCache, get_fact_cache
+from config.vm_settings import VmSettingIndex, VmVersionIndex
+
+logger = logging.getLogger(__name__)
+
+# 主机服务 / 高级设置的只读视图，字段与 pyVmomi 对象的同名属性一致，检查逻辑无需区分来源
+ServiceFact = namedtuple("ServiceFact", ["key", "label", "policy", "running", "required"])
+OptionFact = namedtuple("OptionFact", ["key", "value", "type"])
+
+
+class FactError(Exception):
+    """采集阶段该项数据获取失败，错误信息与当时 vCenter 返回的一致"""
+
+
+class HostFacts:
+    """
+    单台主机的标准化数据（纯 dict，可直接序列化为 JSON），检查模块只读取这里的数据，不再访问 vCenter：
+    {"Host", "Moid", "VCenter", "NTPServers", "Services", "AdvancedSettings", "Network", "Datastores", "VMs",
+     "Errors": {数据项: 错误信息}}
+    Network 为标准 vSwitch / 端口组的安全策略和 VLAN（见 network_facts），
+    Datastores 为主机挂载的数据存储（见 inventory.datastore_summary）
+    VMs 为该主机上虚拟机的摘要列表（见 inventory.vm_summary），extraConfig 通过 vm_settings 按键查询，
+    硬件版本 / VMware Tools 状态通过 vm_versions 查询
+    """
+
+    # 属性名 -> 数据项，用于判断一条规则依赖哪些数据
+    FACT_KEYS = {"name": "Host", "ntp_servers": "NTPServers", "services": "Services",
+                 "advanced_settings": "AdvancedSettings", "network": "Network", "datastores": "Datastores",
+                 "vms": "VMs"}
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.name = data["Host"]
+        self.moid = data.get("Moid")
+        self.vcenter = data.get("VCenter", "")
+        self._services: List[ServiceFact] = None
+        self._advanced_settings: Dict[str, OptionFact] = None
+        self._vm_settings: VmSettingIndex = None
+        self._vm_versions: VmVersionIndex = None
+
+    def _get(self, fact: str):
+        """读取数据项；采集时该项失败则抛出 FactError"""
+        error = self.data.get("Errors", {}).get(fact)
+        if error is not None:
+            raise FactError(error)
+        return self.data.get(fact)
+
+    @property
+    def ntp_servers(self) -> List[str]:
+        return list(self._get("NTPServers") or [])
+
+    @property
+    def services(self) -> List[ServiceFact]:
+        if self._services is None:
+            self._services = [ServiceFact(**s) for s in (self._get("Services") or [])]
+        return self._services
+
+    @property
+    def advanced_settings(self) -> Dict[str, OptionFact]:
+        if self._advanced_settings is None:
+            self._advanced_settings = {
+                key: OptionFact(key, opt["value"], opt["type"])
+                for key, opt in (self._get("AdvancedSettings") or {}).items()
+            }
+        return self._advanced_settings
+
+    @property
+    def network(self) -> Dict[str, List[Dict[str, Any]]]:
+        network = self._get("Network")
+        if network is None:
+            raise FactError("没有采集该主机的网络数据")
+        return network
+
+    @property
+    def datastores(self) -> List[Dict[str, Any]]:
+        datastores = self._get("Datastores")
+        if datastores is None:
+            raise FactError("没有采集该主机的数据存储数据")
+        return datastores
+
+    @property
+    def vms(self) -> List[Dict[str, Any]]:
+        vms = self._get("VMs")
+        if vms is None:
+            # 没有采集虚拟机数据（如较早的缓存），不能当作主机上没有虚拟机
+            raise FactError("没有采集该主机的虚拟机数据")
+        return vms
+
+    @property
+    def vm_settings(self) -> VmSettingIndex:
+        """虚拟机 extraConfig 的倒排索引，首次读取时构建，同一主机的多条规则共用"""
+        if self._vm_settings is None:
+            self._vm_settings = VmSettingIndex(self.vms)
+        return self._vm_settings
+
+    @property
+    def vm_versions(self) -> VmVersionIndex:
+        """虚拟机硬件版本 / VMware Tools 状态索引，首次读取时构建"""
+        if self._vm_versions is None:
+            self._vm_versions = VmVersionIndex(self.vms)
+        return self._vm_versions
+
+    def query_options(self, name: str) -> List[OptionFact]:
+        """
+        按 OptionManager.QueryOptions 的语义查询高级设置：
+        以 "." 结尾时按前缀返回该分组下全部设置，否则精确匹配；
+        不存在时抛出 vim.fault.InvalidName，与直接调用 QueryOptions 一致
+        """
+        settings = self.advanced_settings
+        if name.endswith("."):
+            matched = [opt for key, opt in settings.items() if key.startswith(name)]
+        else:
+            matched = [settings[name]] if name in settings else []
+        if not matched:
+            raise vim.fault.InvalidName(name=name, msg="A specified parameter was not correct: " + name)
+        return matched
+
+    def find_service(self, key: str, ignore_case: bool = False) -> Optional[ServiceFact]:
+        """按 key 查找主机服务，未找到返回 None"""
+        for service in self.services:
+            if service.key == key or (ignore_case and service.key.lower() == key.lower()):
+                return service
+        return None
+
+
+def group_datastores(mounts: Iterable[Tuple[str, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    (主机名, 该主机挂载的数据存储摘要) 合并为按数据存储的列表：
+    [{"Name", "Url", "Moid", "Hosts": [挂载的主机名]}]
+    """
+    datastores: Dict[str, Dict[str, Any]] = {}
+    for host_name, entries in mounts:
+        for entry in entries or []:
+            datastore = datastores.setdefault(entry["Moid"], {"Name": entry["Name"], "Url": entry["Url"],
+                                                              "Moid": entry["Moid"], "Hosts": []})
+            datastore["Hosts"].append(host_name)
+    return list(datastores.values())
+
+
+class VCenterFacts:
+    """
+    一个 vCenter 的采集结果；error 不为空时表示该 vCenter 整体采集失败。
+    datastores 为整个 vCenter 的数据存储（见 group_datastores），按主机名筛选后仍保留全部，
+    跨 vCenter 的数据存储重名检查不受筛选影响；不传时由 hosts 汇总
+    """
+
+    def __init__(self, vcenter: str, hosts: List[HostFacts] = None, error: str = None,
+                 datastores: List[Dict[str, Any]] = None):
+        self.vcenter = vcenter
+        self.hosts = hosts or []
+        self.error = error
+        if datastores is None:
+            datastores = group_datastores((h.name, h.data.get("Datastores")) for h in self.hosts)
+        self.datastores = datastores
+
+    def select_hosts(self, patterns: List[str] = None) -> "VCenterFacts":
+        """只保留主机名匹配通配符的主机，datastores 保持整个 vCenter 的数据"""
+        if not patterns:
+            return self
+        return VCenterFacts(self.vcenter, [h for h in self.hosts if match_host(h.name, patterns)], self.error,
+                            self.datastores)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"VCenter": self.vcenter, "Error": self.error, "Hosts": [h.data for h in self.hosts],
+                "Datastores": self.datastores}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "VCenterFacts":
+        return cls(data["VCenter"], [HostFacts(h) for h in data.get("Hosts", [])], data.get("Error"),
+                   data.get("Datastores"))
+
+
+class FactSet:
+    """一次运行采集到的全部数据，按配置中的 vCenter 顺序排列"""
+
+    def __init__(self, vcenters: List[VCenterFacts]):
+        self.vcenters = vcenters
+
+    @property
+    def hosts(self) -> List[HostFacts]:
+        return [h for vc in self.vcenters for h in vc.hosts]
+
+    @property
+    def failed(self) -> List[VCenterFacts]:
+        return [vc for vc in self.vcenters if vc.error]
+
+    def select_hosts(self, patterns: List[str] = None) -> "FactSet":
+        """只保留主机名匹配通配符的主机（采集失败的 vCenter 保留）"""
+        if not patterns:
+            return self
+        return FactSet([vc.select_hosts(patterns) for vc in self.vcenters])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"VCenters": [vc.to_dict() for vc in self.vcenters]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FactSet":
+        return cls([VCenterFacts.from_dict(vc) for vc in data.get("VCenters", [])])
+
+
+# 安全策略：HostNetworkSecurityPolicy 属性 -> 标准化数据中的键
+SECURITY_POLICY_KEYS = {"allowPromiscuous": "AllowPromiscuous", "macChanges": "MacChanges",
+                        "forgedTransmits": "ForgedTransmits"}
+
+
+def _security(policy) -> Dict[str, Optional[bool]]:
+    """HostNetworkPolicy.security 转换为 {AllowPromiscuous, MacChanges, ForgedTransmits}，未设置的项为 None"""
+    security = getattr(policy, "security", None) if policy is not None else None
+    return {key: getattr(security, attr, None) if security is not None else None
+            for attr, key in SECURITY_POLICY_KEYS.items()}
+
+
+def network_facts(record: HostRecord) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    标准 vSwitch 和端口组的安全策略及 VLAN：
+    {"VSwitches": [{"Name", "Security"}], "PortGroups": [{"Name", "VSwitch", "VlanId", "Security", "Overrides"}]}
+    端口组的 Security 为生效策略：优先使用主机计算好的 computedPolicy，没有时按端口组未设置的项继承所属 vSwitch；
+    Overrides 为端口组自行设置（不继承）的项
+    """
+    vswitches = {vs.name: _security(vs.spec.policy if vs.spec else None) for vs in record.vswitches}
+    portgroups = []
+    for pg in record.portgroups:
+        spec = pg.spec
+        own = _security(spec.policy)
+        inherited = vswitches.get(spec.vswitchName, {})
+        computed = getattr(pg, "computedPolicy", None)
+        effective = _security(computed) if computed is not None else {}
+        portgroups.append({
+            "Name": spec.name,
+            "VSwitch": spec.vswitchName,
+            "VlanId": spec.vlanId,
+            "Security": {key: next((source[key] for source in (effective, own, inherited)
+                                    if source.get(key) is not None), None)
+                         for key in SECURITY_POLICY_KEYS.values()},
+            "Overrides": [key for key, value in own.items() if value is not None],
+        })
+    return {"VSwitches": [{"Name": name, "Security": security} for name, security in vswitches.items()],
+            "PortGroups": portgroups}
+
+
+def build_host_facts(record: HostRecord, vcenter: str = "", facts=None,
+                     vms: Dict[str, List[Dict[str, Any]]] = None,
+                     datastores: Dict[str, List[Dict[str, Any]]] = None) -> HostFacts:
+    """
+    把主机属性快照转换为标准化数据；单项失败只记录错误，不影响其他数据项
+    :param facts: 只转换这些数据项（默认全部），其余保持 None
+    :param vms: 按主机 moid 分组的虚拟机摘要（get_vm_inventory 的结果），为空时 VMs 保持 None
+    :param datastores: 按主机 moid 分组的数据存储摘要（get_datastore_inventory 的结果），为空时 Datastores 保持 None
+    """
+    data: Dict[str, Any] = {
+        "Host": record.name,
+        "Moid": record.moid,
+        "VCenter": vcenter,
+        "NTPServers": None,
+        "Services": None,
+        "AdvancedSettings": None,
+        "Network": None,
+        "Datastores": None,
+        "VMs": None,
+        "Errors": {},
+    }
+
+    loaders = {
+        "NTPServers": lambda: record.ntp_servers,
+        "Services": lambda: [
+            {"key": s.key, "label": s.label, "policy": s.policy, "running": s.running, "required": s.required}
+            for s in record.services
+        ],
+        "AdvancedSettings": lambda: {
+            key: {"value": opt.value, "type": type(opt.value).__name__}
+            for key, opt in record.advanced_settings.items()
+        },
+        "Network": lambda: network_facts(record),
+    }
+    if vms is not None:
+        loaders["VMs"] = lambda: vms.get(record.moid, [])
+    if datastores is not None:
+        loaders["Datastores"] = lambda: datastores.get(record.moid, [])
+    for fact, load in loaders.items():
+        if facts is not None and fact not in facts:
+            continue
+        try:
+            data[fact] = load()
+        except Exception as e:
+            data["Errors"][fact] = str(e)
+            logger.warning("[Facts] 主机 %s 获取 %s 失败: %s", record.name, fact, e)
+
+    return HostFacts(data)
+
+
+def collect_facts(sessions: VsphereSessionPool = None, env: str = "prod", max_age: float = None,
+                  cache: FactCache = None, facts: List[str] = None, host_patterns: List[str] = None,
+                  timeout: float = None) -> FactSet:
+    """
+    采集阶段：并发在所有 vCenter 上批量获取主机属性并转换为标准化数据。
+    - 本地缓存中不超过 max_age 秒的 vCenter 直接使用缓存，不连接 vCenter；其余 vCenter 采集后写回缓存
+    - 传入 sessions 时每个 vCenter 的结果在本次运行内只采集一次，由所有检查共用
+    - 指定 facts / host_patterns 时只采集这些数据项和主机；这样的部分结果不写入缓存
+    :param max_age: 允许使用的缓存最大时间（秒），默认 FACT_CACHE_CONFIG["ttl"]，0 表示强制重新采集
+    :param cache: 采集结果缓存（默认使用 FACT_CACHE_CONFIG 中的路径）
+    :param facts: 需要的数据项（HostFacts.data 的键），默认全部
+    :param host_patterns: 主机名通配符，默认全部主机
+    :param timeout: 采集的最长等待时间（秒），超时的 vCenter 按采集失败处理（每条规则一条 Fail 记录）
+    """
+    max_age = settings.FACT_CACHE_CONFIG["ttl"] if max_age is None else max_age
+    vc_list = get_vcenter_list(env)
+    try:
+        cache = cache or get_fact_cache()
+    except Exception as e:
+        logger.warning("[Facts] 无法打开采集结果缓存，本次不使用缓存: %s", e)
+        cache = None
+
+    wanted = set(facts) if facts is not None else set(HostFacts.FACT_KEYS.values())
+    cached: Dict[str, VCenterFacts] = {}
+    cache_ages: Dict[str, float] = {}
+    for vc_host in vc_list if cache is not None else []:
+        try:
+            hosts = cache.load(vc_host, max_age)
+        except Exception as e:
+            logger.warning("[Facts] 读取 vCenter %s 缓存失败: %s", vc_host, e)
+            hosts = None
+        if hosts and any(fact not in hosts[0] for fact in wanted):
+            # 较早写入的缓存缺少本次需要的数据项，重新采集
+            logger.info("[Facts] vCenter %s 缓存缺少数据项，重新采集", vc_host)
+            hosts = None
+        if hosts is not None:
+            cached[vc_host] = VCenterFacts(vc_host, [HostFacts(data) for data in hosts]).select_hosts(host_patterns)
+            cache_ages[vc_host] = cache.age(vc_host) or 0
+
+    partial = facts is not None or bool(host_patterns)
+    path_set = host_properties(facts)
+
+    def collect_one(vc_host: str, content) -> VCenterFacts:
+        def load() -> VCenterFacts:
+            inventory = get_host_inventory(vc_host, content, sessions, path_set, host_patterns)
+            # 按主机分组的关联对象数据（虚拟机、数据存储），各自一次批量获取
+            related: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+            errors: Dict[str, str] = {}
+            for fact, get_inventory in (("VMs", get_vm_inventory), ("Datastores", get_datastore_inventory)):
+                if fact not in wanted:
+                    continue
+                try:
+                    related[fact] = get_inventory(vc_host, content, sessions)
+                except Exception as e:
+                    errors[fact] = str(e)
+                    logger.error("[Facts] vCenter %s 获取 %s 数据失败: %s", vc_host, fact, e)
+            hosts = [build_host_facts(record, vc_host, facts, related.get("VMs"), related.get("Datastores"))
+                     for record in inventory]
+            for host in hosts:
+                host.data["Errors"].update(errors)
+            if cache is not None and not partial:
+                try:
+                    cache.store(vc_host, [h.data for h in hosts])
+                except Exception as e:
+                    logger.warning("[Facts] 写入 vCenter %s 缓存失败: %s", vc_host, e)
+
+            datastores = None
+            if "Datastores" in related:
+                # 数据存储按整个 vCenter 汇总：按主机名筛选时另取全部主机的名称
+                names = {h.moid: h.name for h in (get_host_inventory(vc_host, content, sessions, ["name"])
+                                                  if host_patterns else inventory)}
+                datastores = group_datastores((names[moid], entries)
+                                              for moid, entries in related["Datastores"].items() if moid in names)
+            return VCenterFacts(vc_host, hosts, datastores=datastores)
+
+        if sessions is None:
+            return load()
+        return sessions.cached(("facts", vc_host, tuple(path_set), tuple(host_patterns or ())), load)
+
+    pending = [vc_host for vc_host in vc_list if vc_host not in cached]
+    results = run_on_vcenters(collect_one, sessions=sessions, env=env, vc_list=pending, timeout=timeout)
+    collected = {vc_host: (vc_facts, error) for vc_host, vc_facts, error in results}
+
+    vcenters: List[VCenterFacts] = []
+    for vc_host in vc_list:
+        if vc_host in cached:
+            logger.info("[Facts] vCenter %s 使用 %.0f 秒前采集的缓存: %d 台主机（max_age=%ss，0 表示强制重新采集）",
+                        vc_host, cache_ages[vc_host], len(cached[vc_host].hosts), max_age)
+            vcenters.append(cached[vc_host])
+            continue
+        vc_facts, error = collected[vc_host]
+        if error is not None:
+            logger.error("[Facts] 采集 vCenter %s 失败: %s", vc_host, error)
+            vcenters.append(VCenterFacts(vc_host, error=str(error)))
+        else:
+            logger.info("[Facts] vCenter %s 采集完成: %d 台主机", vc_host, len(vc_facts.hosts))
+            vcenters.append(vc_facts)
+    return FactSet(vcenters)
+
+
+def save_facts(facts: FactSet, path: str):
+    """保存采集结果，修改检查规则后可直接离线重新评估"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(facts.to_dict(), f, ensure_ascii=False, default=str)
+    logger.info("[Facts] 采集结果已保存到 %s", path)
+
+
+def load_facts(path: str) -> FactSet:
+    with open(path, "r", encoding="utf-8") as f:
+        facts = FactSet.from_dict(json.load(f))
+    logger.info("[Facts] 从 %s 加载 %d 台主机的数据", path, len(facts.hosts))
+    return facts
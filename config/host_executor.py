@@ -0,0 +1,83 @@
+# config/host_executor.py
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """令牌桶限速：平均每秒 rate 个请求，允许 capacity 个突发"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，没有可用令牌时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+_lock = threading.Lock()
+_buckets: Dict[str, TokenBucket] = {}
+_global_slots: threading.BoundedSemaphore = None
+
+
+def _get_bucket(vc_host: str) -> TokenBucket:
+    config = settings.HOST_EXECUTOR_CONFIG
+    with _lock:
+        if vc_host not in _buckets:
+            _buckets[vc_host] = TokenBucket(config["rate_per_second"], config["burst"])
+        return _buckets[vc_host]
+
+
+def _get_global_slots() -> threading.BoundedSemaphore:
+    global _global_slots
+    with _lock:
+        if _global_slots is None:
+            _global_slots = threading.BoundedSemaphore(settings.HOST_EXECUTOR_CONFIG["max_workers"])
+        return _global_slots
+
+
+def map_hosts(fn: Callable[[Any], Any], hosts: Iterable[Any], vc_host: str = "",
+              parallel: bool = None) -> List[Any]:
+    """
+    对每台主机执行 fn(host)，返回结果顺序与 hosts 一致。
+    - 全局并发上限（所有 vCenter、所有模块共用）：HOST_EXECUTOR_CONFIG["max_workers"]
+    - 每个 vCenter 一个令牌桶，限制对 vpxd 的请求速率
+    - 默认串行执行，HOST_EXECUTOR_CONFIG["enabled"] 或 parallel=True 时并发
+    """
+    hosts = list(hosts)
+    config = settings.HOST_EXECUTOR_CONFIG
+    enabled = config["enabled"] if parallel is None else parallel
+    bucket = _get_bucket(vc_host)
+    slots = _get_global_slots()
+
+    def run(host):
+        with slots:
+            bucket.acquire()
+            return fn(host)
+
+    if not enabled or len(hosts) <= 1:
+        return [run(host) for host in hosts]
+
+    workers = min(config["max_workers"], len(hosts))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="host") as executor:
+        return list(executor.map(run, hosts))
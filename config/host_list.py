@@ -0,0 +1,123 @@
+# config/host_list.py
+
+import os
+import time
+import logging
+import threading
+from typing import List, Dict, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 两次读取采集缓存的最小间隔（秒）
+RECHECK_SECONDS = 30
+# 两次后台刷新之间的最小间隔（秒）
+RETRY_SECONDS = 60
+
+
+class HostList:
+    """
+    页面主机列表，按 vCenter 保存（主机名, 获取时间）：
+    - get() 只读内存；每 RECHECK_SECONDS 秒从采集缓存（FactCache）合并更新的 vCenter 快照
+    - 某个 vCenter 的数据超过 ttl 秒时启动一个后台线程从 vCenter 重新获取，请求不等待登录
+    - 刷新时连接失败的 vCenter 保留上一次的主机，新增 / 下线的主机以最新一次成功获取为准
+    - 还没有任何数据时依次使用最近一次运行结果中的主机、fallback
+    """
+
+    def __init__(self, fallback: List[str] = None, ttl: float = None, refresh: bool = None):
+        config = settings.HOST_LIST_CONFIG
+        self.fallback = list(fallback or [])
+        self.ttl = config["ttl"] if ttl is None else ttl
+        self.refresh_enabled = config["refresh"] if refresh is None else refresh
+        self._by_vcenter: Dict[str, Tuple[float, List[str]]] = {}
+        self._hosts: List[str] = []
+        self._checked_at = 0.0
+        self._attempted_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _vcenters() -> List[str]:
+        vcenters = settings.get_vsphere_hosts(os.getenv("project_env", "prod"))
+        return vcenters if isinstance(vcenters, list) else [vcenters]
+
+    def _merge(self, snapshots: Dict[str, Tuple[float, List[str]]], source: str):
+        """合并比内存中更新的 vCenter 快照；不在当前配置中的 vCenter 忽略"""
+        vcenters = self._vcenters()
+        with self._lock:
+            updated = [vc for vc, (collected_at, _) in snapshots.items() if vc in vcenters and
+                       (vc not in self._by_vcenter or collected_at > self._by_vcenter[vc][0])]
+            for vc in updated:
+                self._by_vcenter[vc] = snapshots[vc]
+            if updated:
+                self._hosts = sorted({name for _, names in self._by_vcenter.values() for name in names})
+        if updated:
+            logger.info("[HostList] 已从%s更新 %s，共 %d 台主机", source, ", ".join(updated), len(self._hosts))
+
+    def _reload_cache(self):
+        try:
+            from config.fact_cache import get_fact_cache
+
+            self._merge(get_fact_cache().host_names(), "采集缓存")
+        except Exception as e:
+            logger.warning("[HostList] 读取采集缓存失败: %s", e)
+
+    def _stale(self, now: float) -> bool:
+        vcenters = self._vcenters()
+        with self._lock:
+            return any(vc not in self._by_vcenter or now - self._by_vcenter[vc][0] > self.ttl for vc in vcenters)
+
+    def _start_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._attempted_at = time.time()
+        threading.Thread(target=self._refresh, name="host-list-refresh", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            from config.vsphere_conn import get_hosts_by_vcenter
+
+            now = time.time()
+            self._merge({vc: (now, names) for vc, names in get_hosts_by_vcenter().items()}, " vCenter ")
+        except Exception as e:
+            logger.warning("[HostList] 后台刷新主机列表失败: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _run_hosts(self) -> List[str]:
+        try:
+            from config.result_index import get_result_index
+
+            index = get_result_index().get()
+            return list(index.hosts) if index is not None else []
+        except Exception as e:
+            logger.warning("[HostList] 读取最近一次运行结果失败: %s", e)
+            return []
+
+    def get(self) -> List[str]:
+        now = time.time()
+        if now - self._checked_at >= RECHECK_SECONDS:
+            self._checked_at = now
+            self._reload_cache()
+        if self.refresh_enabled and now - self._attempted_at >= RETRY_SECONDS and self._stale(now):
+            self._start_refresh()
+
+        with self._lock:
+            hosts = list(self._hosts)
+        return hosts or self._run_hosts() or list(self.fallback)
+
+
+_host_list: HostList = None
+_host_list_lock = threading.Lock()
+
+
+def get_host_list(fallback: List[str] = None) -> HostList:
+    global _host_list
+    with _host_list_lock:
+        if _host_list is None:
+            _host_list = HostList(fallback)
+        return _host_list
@@ -0,0 +1,288 @@
+# config/incremental.py
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Set, Tuple
+
+from pyVmomi import vim, vmodl
+from config.inventory import (HOST_PROPERTIES, VM_PROPERTIES, DATASTORE_PROPERTIES, HostRecord, vm_summary,
+                              datastore_summary)
+from config.facts import HostFacts, VCenterFacts, FactSet, build_host_facts
+from config.fact_cache import FactCache, get_fact_cache
+from config.vsphere_conn import VsphereSessionPool
+from config.rule_engine import get_rule_engine
+from config.run_store import RunDirectory
+from config.pipeline import affected_modules, evaluate_rules, evaluate_module, export_module, export_rules
+
+logger = logging.getLogger(__name__)
+
+# 每次 WaitForUpdatesEx 最多返回的对象数，超出时分多次取回 (truncated)
+MAX_OBJECT_UPDATES = 500
+
+
+class HostWatcher:
+    """
+    单个 vCenter 的 HostSystem 增量采集：
+    - 用会话私有的 PropertyCollector 对检查读取的属性 (HOST_PROPERTIES / VM_PROPERTIES / DATASTORE_PROPERTIES)
+      建立长期 filter；虚拟机的变化（包括迁移到其他主机）归到所在主机的 VMs 数据项，
+      数据存储的变化（改名、挂载 / 卸载）归到挂载它的主机的 Datastores 数据项
+    - 首次 WaitForUpdatesEx(version="") 返回全量数据，之后只返回有变化的主机和属性
+    - 版本号只在进程内有效（属于会话私有的 PropertyCollector）；会话失效或版本号失效时重建 filter，相当于一次全量采集
+    """
+
+    def __init__(self, vc_host: str, sessions: VsphereSessionPool, cache: FactCache = None):
+        self.vc_host = vc_host
+        self.sessions = sessions
+        self.cache = cache or get_fact_cache()
+        self.collector = None
+        self.view = None
+        self.version = ""
+        self.error: str = None
+        self._refs: Dict[str, Any] = {}
+        self._props: Dict[str, Dict[str, Any]] = {}
+        self._missing: Dict[str, Dict[str, Any]] = {}
+        self._facts: Dict[str, HostFacts] = {}
+        self._order: List[str] = []
+        self._vm_props: Dict[str, Dict[str, Any]] = {}
+        self._vm_missing: Dict[str, Dict[str, Any]] = {}
+        # 虚拟机 moid -> (所在主机 moid, 摘要)
+        self._vms: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._ds_props: Dict[str, Dict[str, Any]] = {}
+        # 数据存储 moid -> (挂载的主机 moid 列表, 摘要)
+        self._datastores: Dict[str, Tuple[List[str], Dict[str, Any]]] = {}
+
+    @property
+    def hosts(self) -> List[HostFacts]:
+        return [self._facts[moid] for moid in self._order if moid in self._facts]
+
+    def _create_filter(self):
+        """新建 PropertyCollector 和 filter，版本号归零（下一次 poll 为全量数据）"""
+        self.destroy()
+        content = self.sessions.get_content(self.vc_host)
+        pc = vmodl.query.PropertyCollector
+        self.view = content.viewManager.CreateContainerView(
+            content.rootFolder, [vim.HostSystem, vim.VirtualMachine, vim.Datastore], True
+        )
+        traversal = pc.TraversalSpec(name="traverseView", path="view", skip=False, type=vim.view.ContainerView)
+        filter_spec = pc.FilterSpec(
+            objectSet=[pc.ObjectSpec(obj=self.view, skip=True, selectSet=[traversal])],
+            propSet=[pc.PropertySpec(type=vim.HostSystem, pathSet=HOST_PROPERTIES, all=False),
+                     pc.PropertySpec(type=vim.VirtualMachine, pathSet=VM_PROPERTIES, all=False),
+                     pc.PropertySpec(type=vim.Datastore, pathSet=DATASTORE_PROPERTIES, all=False)],
+        )
+        self.collector = content.propertyCollector.CreatePropertyCollector()
+        self.collector.CreateFilter(filter_spec, partialUpdates=False)
+
+        self.version = ""
+        self._refs.clear()
+        self._props.clear()
+        self._missing.clear()
+        self._facts.clear()
+        self._order.clear()
+        self._vm_props.clear()
+        self._vm_missing.clear()
+        self._vms.clear()
+        self._ds_props.clear()
+        self._datastores.clear()
+
+    def destroy(self):
+        """销毁服务端的 PropertyCollector（连同它的 filter）和 ContainerView，失败时忽略"""
+        for name, obj in (("PropertyCollector", self.collector), ("ContainerView", self.view)):
+            if obj is None:
+                continue
+            try:
+                obj.Destroy()
+            except Exception as e:
+                logger.debug("[Watch] vCenter %s 销毁 %s 失败: %s", self.vc_host, name, e)
+        self.collector = None
+        self.view = None
+
+    @staticmethod
+    def _merge_changes(obj_update, props: Dict[str, Any], missing: Dict[str, Any]):
+        for change in obj_update.changeSet or []:
+            missing.pop(change.name, None)
+            if change.op in ("remove", "indirectRemove"):
+                props.pop(change.name, None)
+            else:
+                props[change.name] = change.val
+        for m in obj_update.missingSet or []:
+            missing[m.path] = m.fault
+
+    def _apply_vm(self, obj_update) -> Set[str]:
+        """合并一台虚拟机的更新，返回受影响的主机 moid（迁移时包括原主机）"""
+        moid = obj_update.obj._moId
+        previous_host = self._vms[moid][0] if moid in self._vms else None
+        if obj_update.kind == "leave":
+            self._vm_props.pop(moid, None)
+            self._vm_missing.pop(moid, None)
+            self._vms.pop(moid, None)
+            return {previous_host} - {None}
+
+        props = self._vm_props.setdefault(moid, {})
+        missing = self._vm_missing.setdefault(moid, {})
+        self._merge_changes(obj_update, props, missing)
+        host_moid, entry = vm_summary(obj_update.obj, props, missing)
+        self._vms[moid] = (host_moid, entry)
+        return {previous_host, host_moid} - {None}
+
+    def _vms_by_host(self) -> Dict[str, List[Dict[str, Any]]]:
+        by_host: Dict[str, List[Dict[str, Any]]] = {}
+        for host_moid, entry in self._vms.values():
+            by_host.setdefault(host_moid, []).append(entry)
+        return by_host
+
+    def _apply_datastore(self, obj_update) -> Set[str]:
+        """合并一个数据存储的更新，返回受影响的主机 moid（卸载时包括原来挂载的主机）"""
+        moid = obj_update.obj._moId
+        previous_hosts = set(self._datastores[moid][0]) if moid in self._datastores else set()
+        if obj_update.kind == "leave":
+            self._ds_props.pop(moid, None)
+            self._datastores.pop(moid, None)
+            return previous_hosts
+
+        props = self._ds_props.setdefault(moid, {})
+        self._merge_changes(obj_update, props, {})
+        hosts, entry = datastore_summary(obj_update.obj, props)
+        self._datastores[moid] = (hosts, entry)
+        return previous_hosts | set(hosts)
+
+    def _datastores_by_host(self) -> Dict[str, List[Dict[str, Any]]]:
+        by_host: Dict[str, List[Dict[str, Any]]] = {}
+        for hosts, entry in self._datastores.values():
+            for host_moid in hosts:
+                by_host.setdefault(host_moid, []).append(entry)
+        return by_host
+
+    def _apply(self, update_set) -> Set[str]:
+        """把一批更新合并到属性快照，返回有变化的主机 moid"""
+        touched: Set[str] = set()
+        for filter_update in update_set.filterSet or []:
+            for obj_update in filter_update.objectSet or []:
+                if isinstance(obj_update.obj, vim.VirtualMachine):
+                    touched |= self._apply_vm(obj_update)
+                    continue
+                if isinstance(obj_update.obj, vim.Datastore):
+                    touched |= self._apply_datastore(obj_update)
+                    continue
+                moid = obj_update.obj._moId
+                touched.add(moid)
+                if obj_update.kind == "leave":
+                    self._refs.pop(moid, None)
+                    self._props.pop(moid, None)
+                    self._missing.pop(moid, None)
+                    self._facts.pop(moid, None)
+                    continue
+
+                if moid not in self._refs:
+                    self._order.append(moid)
+                self._refs[moid] = obj_update.obj
+                self._merge_changes(obj_update, self._props.setdefault(moid, {}),
+                                    self._missing.setdefault(moid, {}))
+        self._order = [moid for moid in self._order if moid in self._refs]
+        return touched
+
+    def poll(self, max_wait: int) -> Set[Tuple[str, str]]:
+        """
+        等待最多 max_wait 秒取回变化并更新缓存
+        :return: 内容有变化的 (moid, 数据项) 集合；没有变化时为空
+        """
+        try:
+            if self.collector is None:
+                self._create_filter()
+            options = vmodl.query.PropertyCollector.WaitOptions(
+                maxWaitSeconds=max_wait, maxObjectUpdates=MAX_OBJECT_UPDATES
+            )
+            touched: Set[str] = set()
+            result = self.collector.WaitForUpdatesEx(self.version, options)
+            while result is not None:
+                touched |= self._apply(result)
+                self.version = result.version
+                if not result.truncated:
+                    break
+                result = self.collector.WaitForUpdatesEx(self.version, options)
+        except vim.fault.NotAuthenticated as e:
+            # 会话已失效，服务端对象随会话一起释放，无需 Destroy；下一轮重新登录、重建 filter 全量采集
+            logger.warning("[Watch] vCenter %s 会话失效，将重新全量采集: %s", self.vc_host, e)
+            self.collector = None
+            self.view = None
+            self.error = str(e)
+            return set()
+        except (vmodl.fault.ManagedObjectNotFound, vmodl.fault.InvalidArgument,
+                vim.fault.InvalidCollectorVersion) as e:
+            # filter 或版本号已失效（会话仍有效），先销毁旧的 PropertyCollector，下一轮重建 filter 全量采集
+            logger.warning("[Watch] vCenter %s 增量采集失效，将重新全量采集: %s", self.vc_host, e)
+            self.destroy()
+            self.error = str(e)
+            return set()
+        except Exception as e:
+            logger.error("[Watch] vCenter %s 增量采集失败: %s", self.vc_host, e)
+            self.destroy()
+            self.error = str(e)
+            return set()
+
+        self.error = None
+        if not touched:
+            return set()
+
+        vms = self._vms_by_host()
+        datastores = self._datastores_by_host()
+        for moid in touched:
+            if moid in self._refs:
+                record = HostRecord(self._refs[moid], self._props[moid], self._missing[moid])
+                self._facts[moid] = build_host_facts(record, self.vc_host, vms=vms, datastores=datastores)
+
+        changed = self.cache.store(self.vc_host, [h.data for h in self.hosts])
+        logger.info("[Watch] vCenter %s: %d 台主机有更新, %d 项数据变化 (version=%s)",
+                    self.vc_host, len(touched), len(changed), self.version)
+        return changed
+
+
+def watch(modules: list, sessions: VsphereSessionPool, interval: int = 300, iterations: int = None):
+    """
+    常驻增量模式：每轮等待各 vCenter 的属性变化，只重新评估、导出受影响的检查。
+    第一轮为全量数据，所有检查都会评估一次。
+    有检查重新评估的一轮生成一个新的运行目录，其余结果文件从上一次运行沿用（见 RunDirectory.finish）
+    :param modules: 检查模块列表
+    :param interval: 每轮最长等待时间（秒）
+    :param iterations: 运行轮数（默认一直运行）
+    """
+    watchers = [HostWatcher(vc_host, sessions) for vc_host in sessions.vcenters]
+    engine = get_rule_engine()
+    module_rules = {m.CHECK_INFO["Rule"] for m in modules if m.CHECK_INFO.get("Rule")}
+    # 没有对应检查模块、只在 YAML 中声明的规则
+    extra_rules = [rule for rid, rule in engine.rules.items() if rid not in module_rules]
+    first = True
+    count = 0
+
+    with ThreadPoolExecutor(max_workers=len(watchers), thread_name_prefix="watch") as executor:
+        while iterations is None or count < iterations:
+            count += 1
+            started = time.monotonic()
+            changes = list(executor.map(lambda w: w.poll(0 if first else interval), watchers))
+            changed_facts = {path for changed in changes for _, path in changed}
+
+            targets = modules if first else affected_modules(modules, changed_facts)
+            extra_ids = [rule.id for rule in extra_rules if first or set(rule.facts) & changed_facts]
+            first = False
+            if not targets and not extra_ids:
+                continue
+
+            run = RunDirectory()
+            facts = FactSet([VCenterFacts(w.vc_host, w.hosts, w.error) for w in watchers])
+            rule_ids = [m.CHECK_INFO["Rule"] for m in targets if m.CHECK_INFO.get("Rule")] + extra_ids
+            rule_results = evaluate_rules(facts, rule_ids) if rule_ids else None
+            if extra_ids:
+                export_rules(rule_results, run.path, exclude=list(module_rules))
+            for module in targets:
+                try:
+                    export_module(module, evaluate_module(module, facts, rule_results), run.path)
+                except Exception as e:
+                    logger.error("检查 %s 运行失败: %s", module.CHECK_INFO["AIIB.No"], e)
+
+            run.finish(selection={"Watch": sorted(changed_facts) or "initial"})
+            logger.info("[Watch] 变化数据项 %s, 重新评估 %d 项检查 (%.2fs)",
+                        sorted(changed_facts) or "-", len(targets) + len(extra_ids), time.monotonic() - started)
+
+    for w in watchers:
+        w.destroy()
@@ -0,0 +1,406 @@
+# config/inventory.py
+
+import re
+import fnmatch
+import logging
+from typing import List, Dict, Any, Iterator, Tuple, Callable, Optional
+
+from pyVmomi import vim, vmodl
+from config.host_executor import map_hosts
+
+logger = logging.getLogger(__name__)
+
+# 每页返回的对象数（RetrievePropertiesEx maxObjects）
+DEFAULT_PAGE_SIZE = 500
+
+# 主机类检查用到的 HostSystem 属性，一次性批量获取
+HOST_PROPERTIES = [
+    "name",
+    "runtime.connectionState",
+    "config.product",
+    "config.dateTimeInfo",
+    "config.option",
+    "config.service",
+    "config.network.vswitch",
+    "config.network.portgroup",
+    "configManager.advancedOption",
+]
+
+# 标准化数据项 (HostFacts.data 的键) -> 需要的 HostSystem 属性；只运行部分检查时按此裁剪 HOST_PROPERTIES
+FACT_PROPERTIES = {
+    "Host": ["name", "runtime.connectionState", "config.product"],
+    "NTPServers": ["config.dateTimeInfo"],
+    "Services": ["config.service"],
+    "AdvancedSettings": ["config.option", "configManager.advancedOption"],
+    "Network": ["config.network.vswitch", "config.network.portgroup"],
+}
+
+# 虚拟机检查用到的 VirtualMachine 属性：只取设备列表等少数属性，不取整个 VM 对象
+VM_PROPERTIES = [
+    "name",
+    "runtime.host",
+    "config.hardware.device",
+    "config.extraConfig",
+    "config.version",
+    "config.tools.toolsUpgradePolicy",
+    "guest.toolsVersionStatus2",
+]
+
+# 虚拟机摘要中的数据项 -> 对应的 VirtualMachine 属性，属性获取失败时记入摘要的 Errors
+VM_SUMMARY_ITEMS = [
+    ("Devices", "config.hardware.device"),
+    ("Settings", "config.extraConfig"),
+    ("HardwareVersion", "config.version"),
+    ("ToolsUpgradePolicy", "config.tools.toolsUpgradePolicy"),
+    ("ToolsStatus", "guest.toolsVersionStatus2"),
+]
+
+# 数据存储检查用到的 Datastore 属性：名称、URL（同一数据存储在各主机 / vCenter 上相同）及挂载的主机
+DATASTORE_PROPERTIES = [
+    "name",
+    "summary.url",
+    "summary.type",
+    "host",
+]
+
+# 虚拟机设备类别 -> vim.vm.device 下的设备类型，一个设备只归入第一个匹配的类别
+VM_DEVICE_TYPES = [
+    ("serial", "VirtualSerialPort"),
+    ("parallel", "VirtualParallelPort"),
+    ("cdrom", "VirtualCdrom"),
+    ("floppy", "VirtualFloppy"),
+    ("usb", "VirtualUSBController"),
+    ("usb", "VirtualUSBXHCIController"),
+    ("usb", "VirtualUSB"),
+    ("audio", "VirtualSoundCard"),
+    ("ahci", "VirtualAHCIController"),
+]
+_DEVICE_CLASSES = [(category, getattr(vim.vm.device, name)) for category, name in VM_DEVICE_TYPES]
+
+
+def host_properties(facts=None) -> List[str]:
+    """数据项对应的属性列表（保持 HOST_PROPERTIES 中的顺序）；facts 为空时返回全部属性"""
+    if facts is None:
+        return list(HOST_PROPERTIES)
+    wanted = {path for fact in set(facts) | {"Host"} for path in FACT_PROPERTIES.get(fact, [])}
+    return [path for path in HOST_PROPERTIES if path in wanted]
+
+
+def match_host(name: str, patterns: List[str] = None) -> bool:
+    """主机名是否匹配通配符列表（不区分大小写），patterns 为空时全部匹配"""
+    if not patterns:
+        return True
+    return any(fnmatch.fnmatchcase(name.lower(), p.lower()) for p in patterns)
+
+
+def iter_properties(content, obj_type, path_set: List[str],
+                    page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Tuple[Any, Dict[str, Any], Dict[str, Any]]]:
+    """
+    通过 ContainerView + TraversalSpec 分页取回某类对象的指定属性，逐页请求 (RetrievePropertiesEx /
+    ContinueRetrievePropertiesEx)、逐个生成，同一时刻只持有一页（page_size 个对象）的属性；
+    调用方提前结束迭代时取消剩余的分页
+    :param content: vSphere service instance content
+    :param obj_type: 对象类型，如 vim.HostSystem
+    :param path_set: 属性路径列表
+    :return: 迭代 (moref, {path: value}, {path: fault})，第三项为取值失败的属性 (missingSet)
+    """
+    view = content.viewManager.CreateContainerView(content.rootFolder, [obj_type], True)
+    pc = vmodl.query.PropertyCollector
+
+    traversal = pc.TraversalSpec(name="traverseView", path="view", skip=False, type=vim.view.ContainerView)
+    obj_spec = pc.ObjectSpec(obj=view, skip=True, selectSet=[traversal])
+    prop_spec = pc.PropertySpec(type=obj_type, pathSet=path_set, all=False)
+    filter_spec = pc.FilterSpec(objectSet=[obj_spec], propSet=[prop_spec])
+
+    count = pages = 0
+    token = None
+    try:
+        result = content.propertyCollector.RetrievePropertiesEx(
+            [filter_spec], pc.RetrieveOptions(maxObjects=page_size)
+        )
+        while result:
+            pages += 1
+            token = result.token
+            for obj_content in result.objects:
+                props = {p.name: p.val for p in (obj_content.propSet or [])}
+                missing = {m.path: m.fault for m in (obj_content.missingSet or [])}
+                count += 1
+                yield obj_content.obj, props, missing
+            if not token:
+                break
+            result = content.propertyCollector.ContinueRetrievePropertiesEx(token)
+            token = None
+        logger.info("[Inventory] %s: 共 %d 个对象, %d 页", obj_type.__name__, count, pages)
+    finally:
+        if token:
+            try:
+                content.propertyCollector.CancelRetrievePropertiesEx(token)
+            except Exception as e:
+                logger.debug("[Inventory] 取消分页失败: %s", e)
+        view.Destroy()
+
+
+def retrieve_properties(content, obj_type, path_set: List[str],
+                        page_size: int = DEFAULT_PAGE_SIZE) -> List[Tuple[Any, Dict[str, Any], Dict[str, Any]]]:
+    """一次取回某类对象的指定属性（分页请求，见 iter_properties）：[(moref, {path: value}, {path: fault}), ...]"""
+    return list(iter_properties(content, obj_type, path_set, page_size))
+
+
+def summarize_devices(devices) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    把 config.hardware.device 归类为紧凑的设备摘要，只保留 VM_DEVICE_TYPES 中的类别：
+    {类别: [{"Label": 设备名称, "Connected": 当前是否已连接}]}，没有的类别不出现
+    """
+    summary: Dict[str, List[Dict[str, Any]]] = {}
+    for device in devices or []:
+        for category, device_class in _DEVICE_CLASSES:
+            if isinstance(device, device_class):
+                info = getattr(device, "deviceInfo", None)
+                connectable = getattr(device, "connectable", None)
+                summary.setdefault(category, []).append({
+                    "Label": info.label if info is not None else type(device).__name__,
+                    "Connected": bool(connectable.connected) if connectable is not None else None,
+                })
+                break
+    return summary
+
+
+def hardware_version(version) -> Optional[int]:
+    """config.version（如 vmx-19）转换为数字，无法识别时返回 None"""
+    match = re.fullmatch(r"vmx-(\d+)", str(version or "").strip())
+    return int(match.group(1)) if match else None
+
+
+def vm_summary(ref, props: Dict[str, Any], missing: Dict[str, Any] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    单台虚拟机的紧凑摘要，设备只归类一次，检查只读取摘要
+    :return: (所在主机 moid, {"Name", "Moid", "Devices", "Settings": {extraConfig 键: 值}, "HardwareVersion",
+              "ToolsUpgradePolicy", "ToolsStatus", "Errors"?: {数据项: 错误信息}})
+    """
+    missing = missing or {}
+    host = props.get("runtime.host")
+    entry: Dict[str, Any] = {
+        "Name": props.get("name", ref._moId),
+        "Moid": ref._moId,
+        "Devices": summarize_devices(props.get("config.hardware.device")),
+        "Settings": {option.key: option.value for option in props.get("config.extraConfig") or []},
+        "HardwareVersion": hardware_version(props.get("config.version")),
+        "ToolsUpgradePolicy": props.get("config.tools.toolsUpgradePolicy"),
+        "ToolsStatus": props.get("guest.toolsVersionStatus2"),
+    }
+    errors = {item: str(missing[path]) for item, path in VM_SUMMARY_ITEMS if path in missing}
+    if errors:
+        entry["Errors"] = errors
+    return (host._moId if host is not None else None), entry
+
+
+def get_vm_inventory(vc_host: str, content, sessions=None,
+                     page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    一次分页的 RetrievePropertiesEx 取回全部虚拟机的 VM_PROPERTIES，按所在主机分组；
+    传入 sessions 时同一次运行内只获取一次
+    :return: {主机 moid: [虚拟机摘要 (见 vm_summary)]}
+    """
+    def load() -> Dict[str, List[Dict[str, Any]]]:
+        by_host: Dict[str, List[Dict[str, Any]]] = {}
+        for ref, props, missing in retrieve_properties(content, vim.VirtualMachine, VM_PROPERTIES, page_size):
+            host_moid, entry = vm_summary(ref, props, missing)
+            by_host.setdefault(host_moid, []).append(entry)
+        return by_host
+
+    if sessions is None:
+        return load()
+    return sessions.cached(("vms", vc_host), load)
+
+
+def datastore_summary(ref, props: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    单个数据存储的摘要
+    :return: (挂载该数据存储的主机 moid 列表, {"Name", "Moid", "Url", "Type"})
+    """
+    hosts = [mount.key._moId for mount in props.get("host") or [] if mount.key is not None]
+    entry = {
+        "Name": props.get("name", ref._moId),
+        "Moid": ref._moId,
+        "Url": props.get("summary.url"),
+        "Type": props.get("summary.type"),
+    }
+    return hosts, entry
+
+
+def get_datastore_inventory(vc_host: str, content, sessions=None,
+                            page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    一次分页的 RetrievePropertiesEx 取回全部数据存储的 DATASTORE_PROPERTIES，按挂载的主机分组；
+    传入 sessions 时同一次运行内只获取一次
+    :return: {主机 moid: [数据存储摘要 (见 datastore_summary)]}
+    """
+    def load() -> Dict[str, List[Dict[str, Any]]]:
+        by_host: Dict[str, List[Dict[str, Any]]] = {}
+        for ref, props, _ in retrieve_properties(content, vim.Datastore, DATASTORE_PROPERTIES, page_size):
+            hosts, entry = datastore_summary(ref, props)
+            for host_moid in hosts:
+                by_host.setdefault(host_moid, []).append(entry)
+        return by_host
+
+    if sessions is None:
+        return load()
+    return sessions.cached(("datastores", vc_host), load)
+
+
+class HostRecord:
+    """单台主机的属性快照，只读内存数据，不再触发 SOAP 调用"""
+
+    def __init__(self, ref, props: Dict[str, Any], missing: Dict[str, Any] = None):
+        self.ref = ref
+        self.moid = ref._moId
+        self.props = props
+        self.missing = missing or {}
+        self.name = props.get("name", self.moid)
+        self._advanced_settings: Dict[str, Any] = None
+
+    def get(self, path: str, default=None):
+        """
+        读取属性路径；vCenter 返回该属性取值失败时抛出对应 fault，
+        与直接访问 host.xxx 时的异常行为保持一致
+        """
+        if path in self.missing:
+            raise self.missing[path]
+        return self.props.get(path, default)
+
+    @property
+    def ntp_servers(self) -> List[str]:
+        date_time_info = self.get("config.dateTimeInfo")
+        return list(date_time_info.ntpConfig.server or [])
+
+    @property
+    def services(self) -> list:
+        service_info = self.get("config.service")
+        return list(service_info.service or []) if service_info else []
+
+    @property
+    def vswitches(self) -> list:
+        return list(self.get("config.network.vswitch") or [])
+
+    @property
+    def portgroups(self) -> list:
+        return list(self.get("config.network.portgroup") or [])
+
+    @property
+    def advanced_settings(self) -> Dict[str, Any]:
+        """
+        主机全部高级设置 {key: OptionValue}，每台主机每次运行只获取一次：
+        优先使用快照中的 config.option，缺失时整体调用一次 QueryOptions()
+        """
+        if self._advanced_settings is None:
+            options = self.get("config.option")
+            if options is None:
+                option_manager = self.props.get("configManager.advancedOption") or self.ref.configManager.advancedOption
+                options = option_manager.QueryOptions()
+                logger.info("[Inventory] 主机 %s 单独获取高级设置 %d 条", self.name, len(options or []))
+            self._advanced_settings = {opt.key: opt for opt in (options or [])}
+        return self._advanced_settings
+
+    def query_options(self, name: str) -> list:
+        """
+        从缓存中按 OptionManager.QueryOptions 的语义查询高级设置：
+        以 "." 结尾时按前缀返回该分组下全部设置，否则精确匹配；
+        不存在时抛出 vim.fault.InvalidName，与直接调用 QueryOptions 一致
+        """
+        settings = self.advanced_settings
+        if name.endswith("."):
+            matched = [opt for key, opt in settings.items() if key.startswith(name)]
+        else:
+            matched = [settings[name]] if name in settings else []
+        if not matched:
+            raise vim.fault.InvalidName(name=name, msg="A specified parameter was not correct: " + name)
+        return matched
+
+    def find_service(self, key: str, ignore_case: bool = False):
+        """按 key 查找主机服务，未找到返回 None"""
+        for service in self.services:
+            if service.key == key or (ignore_case and service.key.lower() == key.lower()):
+                return service
+        return None
+
+
+class HostInventory:
+    """一个 vCenter 下所有主机的属性快照"""
+
+    def __init__(self, hosts: List[HostRecord], vcenter: str = ""):
+        self.hosts = hosts
+        self.vcenter = vcenter
+        self._by_name = {h.name: h for h in hosts}
+
+    @classmethod
+    def retrieve(cls, content, path_set: List[str] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                 vcenter: str = "", host_patterns: List[str] = None) -> "HostInventory":
+        """
+        :param path_set: 需要的属性（默认 HOST_PROPERTIES），必须包含 name
+        :param host_patterns: 只保留名称匹配这些通配符的主机（属性仍是一次批量取回，过滤后不再对其余主机发请求）
+        """
+        hosts = list(cls.iter_hosts(content, path_set, page_size, host_patterns))
+        if host_patterns:
+            logger.info("[Inventory] 按主机名 %s 筛选后剩余 %d 台主机", ",".join(host_patterns), len(hosts))
+        return cls(hosts, vcenter)
+
+    @staticmethod
+    def iter_hosts(content, path_set: List[str] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                   host_patterns: List[str] = None) -> Iterator[HostRecord]:
+        """
+        逐页取回、逐台生成主机快照，不建立完整的主机列表（逐台处理、导出大量属性时内存只占一页）
+        :param path_set: 需要的属性（默认 HOST_PROPERTIES），必须包含 name
+        :param host_patterns: 只生成名称匹配这些通配符的主机
+        """
+        for ref, props, missing in iter_properties(content, vim.HostSystem, path_set or HOST_PROPERTIES, page_size):
+            host = HostRecord(ref, props, missing)
+            if match_host(host.name, host_patterns):
+                yield host
+
+    def map(self, fn: Callable[[HostRecord], Any], parallel: bool = None) -> List[Any]:
+        """对每台主机执行 fn(host)，经由共享的主机执行器（并发上限 + 每 vCenter 限速）"""
+        return map_hosts(fn, self.hosts, self.vcenter, parallel)
+
+    def prefetch_advanced_settings(self):
+        """快照中缺少 config.option 的主机，通过主机执行器预先获取全部高级设置"""
+        pending = [h for h in self.hosts if h.props.get("config.option") is None and "config.option" not in h.missing]
+        if not pending:
+            return
+
+        def load(host: HostRecord):
+            try:
+                host.advanced_settings
+            except Exception as e:
+                logger.warning("[Inventory] 主机 %s 预取高级设置失败: %s", host.name, e)
+
+        map_hosts(load, pending, self.vcenter)
+
+    def by_name(self, name: str) -> HostRecord:
+        return self._by_name.get(name)
+
+    def __iter__(self) -> Iterator[HostRecord]:
+        return iter(self.hosts)
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+
+def get_host_inventory(vc_host: str, content, sessions=None, path_set: List[str] = None,
+                       host_patterns: List[str] = None) -> HostInventory:
+    """
+    获取 vCenter 的主机快照；传入 sessions (VsphereSessionPool) 时，
+    同一次运行内所有检查模块共用一份快照
+    :param path_set: 只获取这些属性（默认 HOST_PROPERTIES）；不含 config.option 时不预取高级设置
+    :param host_patterns: 只保留名称匹配的主机
+    """
+    path_set = list(path_set or HOST_PROPERTIES)
+
+    def load() -> HostInventory:
+        inventory = HostInventory.retrieve(content, path_set, vcenter=vc_host, host_patterns=host_patterns)
+        if "config.option" in path_set:
+            inventory.prefetch_advanced_settings()
+        return inventory
+
+    if sessions is None:
+        return load()
+    return sessions.cached(("hosts", vc_host, tuple(path_set), tuple(host_patterns or ())), load)
@@ -0,0 +1,188 @@
+# config/pipeline.py
+
+import os
+import logging
+import argparse
+from typing import List, Dict, Any, Set
+
+from config.facts import FactSet, collect_facts
+from config.rule_engine import get_rule_engine
+from config.vsphere_conn import VsphereSessionPool
+from config.export_to_json import export_to_json
+
+logger = logging.getLogger(__name__)
+
+
+def requires_hosts(module) -> bool:
+    """检查是否需要主机数据（默认通过的检查不需要采集）"""
+    return "hosts" in module.CHECK_INFO.get("Requires", [])
+
+
+def check_facts(module) -> Set[str]:
+    """
+    检查依赖的数据项（HostFacts.data 的键）：规则检查取规则声明的数据项，
+    其他主机类检查取 CHECK_INFO["Facts"]（默认只依赖主机列表 "Host"）
+    """
+    if not requires_hosts(module):
+        return set()
+    rule_id = module.CHECK_INFO.get("Rule")
+    if rule_id:
+        return set(get_rule_engine().rules[rule_id].facts)
+    return set(module.CHECK_INFO.get("Facts", ["Host"]))
+
+
+def affected_modules(modules: list, changed_facts: Set[str]) -> list:
+    """数据项变化后需要重新评估的检查；主机增删或改名 ("Host") 影响所有主机类检查"""
+    if not changed_facts:
+        return []
+    return [m for m in modules if check_facts(m) & changed_facts]
+
+
+def _vcenter_fail_record(base_record: Dict[str, Any], vcenter: str, description: str, error: str) -> Dict[str, Any]:
+    return {
+        **base_record,
+        "Host": None,
+        "Value": None,
+        "Status": "Fail",
+        "Description": description,
+        "Error": error,
+        "VCenter": vcenter,
+    }
+
+
+def evaluate_rules(facts: FactSet, rule_ids: List[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    用规则引擎评估 YAML 中声明的检查：每个 vCenter 的主机只遍历一次，得到全部规则的结果；
+    跨 vCenter 的规则（如数据存储重名）先对全部主机预处理一次。
+    采集失败的 vCenter 为每条规则追加一条 Fail 记录
+    :return: {rule_id: [记录]}
+    """
+    engine = get_rule_engine()
+    rule_ids = rule_ids or list(engine.rules)
+    all_results: Dict[str, List[Dict[str, Any]]] = {rid: [] for rid in rule_ids}
+    contexts = engine.prepare(facts, rule_ids)
+
+    for vc in facts.vcenters:
+        if vc.error:
+            for rid in rule_ids:
+                all_results[rid].append(
+                    _vcenter_fail_record(engine.rules[rid].base_record(), vc.vcenter, "无法连接到 vCenter", vc.error)
+                )
+            continue
+
+        for rid, results in engine.evaluate(vc.hosts, rule_ids, contexts).items():
+            for record in results:
+                record["VCenter"] = vc.vcenter
+            all_results[rid].extend(results)
+
+    return all_results
+
+
+def evaluate_module(module, facts: FactSet = None,
+                    rule_results: Dict[str, List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    评估阶段：对采集好的数据执行检查，不访问 vCenter。
+    - CHECK_INFO 中声明了 Rule 的检查由规则引擎评估（可传入 evaluate_rules() 预先算好的结果）
+    - 其余检查按 vCenter 分别调用模块的 evaluate()，每条记录补充 VCenter 字段
+    - 采集失败或评估出错的 vCenter 追加一条 Fail 记录，其余 vCenter 的结果照常返回
+    """
+    info = module.CHECK_INFO
+    if not requires_hosts(module):
+        return module.evaluate()
+
+    rule_id = info.get("Rule")
+    if rule_id:
+        if rule_results is None or rule_id not in rule_results:
+            rule_results = evaluate_rules(facts, [rule_id])
+        return rule_results[rule_id]
+
+    base_record = {"AIIB.No": info["AIIB.No"], "Name": info["Name"], "CIS.No": info["CIS.No"]}
+    all_results: List[Dict[str, Any]] = []
+    for vc in facts.vcenters:
+        if vc.error:
+            all_results.append(_vcenter_fail_record(base_record, vc.vcenter, "无法连接到 vCenter", vc.error))
+            continue
+
+        try:
+            results = module.evaluate(vc.hosts)
+        except Exception as e:
+            logger.error("%s vCenter %s 评估失败: %s", info.get("Tag", ""), vc.vcenter, e)
+            all_results.append(_vcenter_fail_record(base_record, vc.vcenter, "检查执行失败", str(e)))
+            continue
+
+        for record in results:
+            record["VCenter"] = vc.vcenter
+        all_results.extend(results)
+
+    return all_results
+
+
+def export_module(module, results: List[Dict[str, Any]], output_dir: str) -> str:
+    """把单个检查的结果写入 CHECK_INFO["Output"] 指定的 JSON 文件"""
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, module.CHECK_INFO["Output"])
+    export_to_json(results, output_path)
+    logger.info("%s 检查结果已导出到 %s", module.CHECK_INFO.get("Tag", ""), output_path)
+    return output_path
+
+
+def export_rules(rule_results: Dict[str, List[Dict[str, Any]]], output_dir: str,
+                 exclude: List[str] = None) -> List[str]:
+    """导出没有对应检查模块、只在 YAML 中声明的规则结果（文件名取规则的 output）"""
+    engine = get_rule_engine()
+    exclude = set(exclude or [])
+    os.makedirs(output_dir, exist_ok=True)
+    paths: List[str] = []
+    for rid, results in rule_results.items():
+        if rid in exclude:
+            continue
+        output_path = os.path.join(output_dir, engine.rules[rid].output)
+        export_to_json(results, output_path)
+        logger.info("[Rule %s] 检查结果已导出到 %s", engine.rules[rid].aiib_no, output_path)
+        paths.append(output_path)
+    return paths
+
+
+def run_checks(modules: list, output_dir: str = None, sessions: VsphereSessionPool = None,
+               facts: FactSet = None, max_age: float = None) -> FactSet:
+    """
+    采集一次、评估多次：只在有检查需要主机数据时采集一次，规则引擎一次评估全部规则，
+    然后依次导出每个检查。
+    :param modules: 检查模块列表（需提供 CHECK_INFO，以及 evaluate() 或 CHECK_INFO["Rule"]）
+    :param output_dir: 输出目录；为空时（直接运行检查模块）写入新的运行目录 (RunDirectory)，完成后切换 latest，
+                       其余检查的结果从上一次运行沿用
+    :param sessions: 共享的 vCenter 会话池
+    :param facts: 已有的采集结果（如从文件加载），为空时现场采集
+    :param max_age: 本地缓存的采集结果不超过该秒数时直接使用（默认 FACT_CACHE_CONFIG["ttl"]，0 表示强制采集）
+    :return: 本次使用的采集结果
+    """
+    run = None
+    if output_dir is None:
+        from config.run_store import RunDirectory
+
+        run = RunDirectory()
+        output_dir = run.path
+
+    if facts is None and any(requires_hosts(m) for m in modules):
+        facts = collect_facts(sessions, max_age=max_age)
+
+    rule_ids = [m.CHECK_INFO["Rule"] for m in modules if m.CHECK_INFO.get("Rule")]
+    rule_results = evaluate_rules(facts, rule_ids) if rule_ids else None
+
+    for module in modules:
+        try:
+            export_module(module, evaluate_module(module, facts, rule_results), output_dir)
+        except Exception as e:
+            logger.error("检查 %s 运行失败: %s", module.CHECK_INFO["AIIB.No"], e)
+
+    if run is not None:
+        run.finish(selection={"Only": [m.CHECK_INFO["AIIB.No"] for m in modules]})
+    return facts
+
+
+def parse_module_args() -> argparse.Namespace:
+    """单个检查模块直接运行（python -m vmware_cis_checks.<模块>）时的命令行参数"""
+    parser = argparse.ArgumentParser(description="VMware CIS 单项基线检查")
+    parser.add_argument("--max-age", type=float, default=None,
+                        help="使用不超过该秒数的本地缓存采集结果（默认取 FACT_CACHE_TTL，0 表示强制重新采集）")
+    return parser.parse_args()
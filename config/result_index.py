@@ -0,0 +1,187 @@
+# config/result_index.py
+
+import os
+import re
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from config.run_store import latest_run, run_path, MANIFEST, SUMMARY
+
+logger = logging.getLogger(__name__)
+
+# 每个运行索引缓存的响应体个数（按查询参数）
+RESPONSE_CACHE_SIZE = 64
+
+
+def file_sort_key(f):
+    # 提取文件名中的数字部分，例如 no_2.1_ => 2.1
+    m = re.search(r'no_(\d+(?:\.\d+)*)_', f)
+    if m:
+        parts = m.group(1).split('.')
+        return tuple(int(p) for p in parts)
+    return (0,)  # 如果没有匹配，排在最前面
+
+
+class RunIndex:
+    """
+    一次运行（或 log/ 目录）的全部结果记录，读取一次后常驻内存：
+    记录按文件编号排序，按 Host / Status / AIIB.No 建立位置索引，筛选时不再遍历全部记录
+    （代替原先每次运行写入的本地 SQLite 结果库：同样按运行 + 主机 / 状态 / 检查编号筛选，但不需要额外的写入步骤）
+    """
+
+    def __init__(self, run_id: Optional[str], version: Any, directory: str):
+        self.run_id = run_id
+        self.version = version
+        self.directory = directory
+        self.files: List[str] = sorted(
+            (name for name in os.listdir(directory) if name.endswith(".json") and name not in (MANIFEST, SUMMARY)),
+            key=file_sort_key,
+        )
+        self.records: List[Dict[str, Any]] = []
+        for name in self.files:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                self.records.extend({**r, "_file": name[:-5]} for r in data)
+
+        self._by_host: Dict[str, List[int]] = {}
+        self._by_status: Dict[str, List[int]] = {}
+        self._by_check: Dict[str, List[int]] = {}
+        for position, record in enumerate(self.records):
+            self._by_host.setdefault(record.get("Host"), []).append(position)
+            self._by_status.setdefault(record.get("Status"), []).append(position)
+            self._by_check.setdefault(record.get("AIIB.No"), []).append(position)
+
+        self.hosts: List[str] = sorted(h for h in self._by_host if h and h != "ALL_HOSTS")
+        self.status_counts: Dict[str, int] = {s: len(p) for s, p in self._by_status.items() if s}
+        self._responses: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._summary: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def summary(self) -> Dict[str, Any]:
+        """运行目录中的 summary.json；log/ 或较早的运行目录没有该文件时由已加载的记录生成"""
+        if self._summary is None:
+            try:
+                with open(os.path.join(self.directory, SUMMARY), "r", encoding="utf-8") as f:
+                    self._summary = json.load(f)
+            except FileNotFoundError:
+                from config.summary import build_summary
+
+                self._summary = build_summary(self.records, self.run_id)
+        return self._summary
+
+    def select(self, host: str = None, status: str = None, aiib_no: str = None) -> List[Dict[str, Any]]:
+        """筛选记录（保持排序）；按主机筛选时同时返回 Host 为 ALL_HOSTS 的汇总记录，与页面筛选一致"""
+        candidates = []
+        if host:
+            candidates.append(set(self._by_host.get(host, [])) | set(self._by_host.get("ALL_HOSTS", [])))
+        if status:
+            candidates.append(set(self._by_status.get(status, [])))
+        if aiib_no:
+            candidates.append(set(self._by_check.get(aiib_no, [])))
+        if not candidates:
+            return list(self.records)
+        positions = set.intersection(*candidates)
+        return [self.records[p] for p in sorted(positions)]
+
+    def cached_response(self, key: Tuple, build: Callable[[], Any]) -> Any:
+        """按查询参数缓存序列化（及压缩）后的响应体，同一运行的相同查询只序列化一次"""
+        with self._lock:
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                return self._responses[key]
+        body = build()
+        with self._lock:
+            self._responses[key] = body
+            while len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        return body
+
+
+class ResultIndex:
+    """
+    Flask 进程内的结果索引：按运行编号缓存 RunIndex，只有运行目录的 manifest（或 log/ 下结果文件）
+    修改时间变化时才重新读取；latest 切换后下一次请求自动加载新运行
+    """
+
+    def __init__(self, base_dir: str = None, log_dir: str = "log", max_runs: int = 4):
+        self.base_dir = base_dir
+        self.log_dir = log_dir
+        self.max_runs = max_runs
+        self._runs: "OrderedDict[str, RunIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 运行编号 -> 加载锁，只在加载期间存在
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def _cached(self, key: str, version: Any) -> Optional[RunIndex]:
+        with self._lock:
+            index = self._runs.get(key)
+            if index is not None and index.version == version:
+                self._runs.move_to_end(key)
+                return index
+        return None
+
+    def _version(self, run_id: Optional[str]) -> Any:
+        try:
+            if run_id:
+                return os.stat(os.path.join(run_path(run_id, self.base_dir), MANIFEST)).st_mtime_ns
+            with os.scandir(self.log_dir) as entries:
+                return tuple(sorted((e.name, e.stat().st_mtime_ns) for e in entries if e.name.endswith(".json")))
+        except FileNotFoundError:
+            return None
+
+    def get(self, run_id: str = None) -> Optional[RunIndex]:
+        """
+        运行的索引；run_id 为空时取 latest（还没有运行目录时为 log/）
+        :return: 运行不存在或未完成时返回 None
+        """
+        run_id = run_id or latest_run(self.base_dir)
+        if run_id and os.path.basename(run_id) != run_id:
+            return None
+        key = run_id or self.log_dir
+        version = self._version(run_id)
+        if version is None:
+            return None
+
+        cached = self._cached(key, version)
+        if cached is not None:
+            return cached
+
+        # 同一运行的并发请求等待同一次加载；全局锁只在读写缓存时持有，加载其他运行不会阻塞这里
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        try:
+            with load_lock:
+                cached = self._cached(key, version)
+                if cached is not None:
+                    return cached
+                directory = run_path(run_id, self.base_dir) if run_id else self.log_dir
+                index = RunIndex(run_id, version, directory)
+                with self._lock:
+                    self._runs[key] = index
+                    self._runs.move_to_end(key)
+                    while len(self._runs) > self.max_runs:
+                        self._runs.popitem(last=False)
+        finally:
+            # 加载结束（或失败）后移除加载锁；还在等待这把锁的请求随后会命中缓存
+            with self._lock:
+                if self._loading.get(key) is load_lock:
+                    del self._loading[key]
+        logger.info("[ResultIndex] 已加载 %s: %d 个文件，%d 条记录", key, len(index.files), len(index.records))
+        return index
+
+
+_index: ResultIndex = None
+_index_lock = threading.Lock()
+
+
+def get_result_index() -> ResultIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ResultIndex()
+        return _index
@@ -0,0 +1,507 @@
+# config/rule_engine.py
+
+import os
+import re
+import copy
+import logging
+import threading
+from typing import List, Dict, Any, Tuple, Iterable
+
+import yaml
+from pyVmomi import vim
+
+from config.facts import HostFacts, FactSet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vmware_cis_checks.yaml")
+
+
+def _text(value, ignore_case: bool = False) -> str:
+    """统一比较格式：布尔值按 true / false，None 视为空字符串"""
+    if isinstance(value, bool):
+        text = "true" if value else "false"
+    elif value is None:
+        text = ""
+    else:
+        text = str(value).strip()
+    return text.lower() if ignore_case else text
+
+
+def _as_list(value) -> list:
+    """逗号分隔的字符串或列表统一转换为列表"""
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(",") if v.strip()]
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [] if value is None else [value]
+
+
+class Rule:
+    """
+    一条声明式检查规则（对应 YAML 中带 rule 的一项）。
+    子类实现 check(host) -> (Value, 是否通过)，evaluate() 负责生成与检查模块相同格式的记录：
+    - description 中的 {value} 替换为检测值（为空时为“未配置”）
+    - 评估出错时 Value 取 error_value，Description 取 descriptions 中的 missing（设置项 / 服务不存在）或 error
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.id = spec["id"]
+        self.aiib_no = self.id[3:] if self.id.startswith("no_") else self.id
+        self.name = spec.get("name", "")
+        self.cis_no = str(spec.get("CIS.NO", ""))
+        self.cmd = spec.get("cmd")
+        self.description = spec.get("description", "")
+        self.error_value = spec.get("error_value")
+        self.descriptions: Dict[str, str] = spec.get("descriptions") or {}
+        # 没有对应检查模块的规则，结果写入该文件
+        self.output = spec.get("output", f"{self.id}_rule.json")
+        self.params = spec["rule"]
+        self.ignore_case = bool(self.params.get("ignore_case", False))
+
+    # 规则读取的数据项（HostFacts.data 的键），增量采集时据此判断哪些规则需要重新评估
+    FACTS = ("Host",)
+
+    @property
+    def facts(self) -> Tuple[str, ...]:
+        return self.FACTS
+
+    def base_record(self) -> Dict[str, Any]:
+        return {"AIIB.No": self.aiib_no, "Name": self.name, "CIS.No": self.cis_no}
+
+    def prepare(self, facts: FactSet) -> Any:
+        """
+        评估前对全部 vCenter 的数据做一次预处理（跨 vCenter 的规则在这里建立索引），默认不需要。
+        返回值作为 context 传给本次评估的 check()，不保存在规则对象上（规则引擎进程内共用）
+        """
+        return None
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        raise NotImplementedError
+
+    def describe(self, value) -> str:
+        if "{value}" not in self.description:
+            return self.description
+        return self.description.replace("{value}", "未配置" if value is None or value == "" else str(value))
+
+    def is_missing(self, error: Exception) -> bool:
+        """评估出错是否因为要检查的数据项在主机上不存在"""
+        return False
+
+    def evaluate(self, host: HostFacts, context: Any = None) -> Dict[str, Any]:
+        record = {
+            **self.base_record(),
+            "CMD": self.cmd,
+            "Host": host.name,
+            "Value": None,
+            "Status": "Fail",
+            "Description": self.description,
+            "Error": None,
+        }
+        try:
+            value, passed = self.check(host, context)
+        except Exception as e:
+            outcome = "missing" if self.is_missing(e) else "error"
+            record.update({
+                "Value": copy.deepcopy(self.error_value),
+                "Description": self.descriptions.get(outcome) or self.descriptions.get("error") or self.description,
+                "Error": str(e),
+            })
+            if outcome == "missing":
+                logger.info("[Rule %s] 主机 %s 不支持该设置: %s", self.aiib_no, host.name, e)
+            else:
+                logger.error("[Rule %s] 主机 %s 评估失败: %s", self.aiib_no, host.name, e)
+            return record
+        record.update({"Value": value, "Status": "Pass" if passed else "Fail", "Description": self.describe(value)})
+        return record
+
+
+class AdvancedSettingRule(Rule):
+    """
+    主机高级设置：equals / in / regex / range / contains。
+    value_format 决定 Value 的格式：setting（{key, value, type}，默认）/ raw（原始值）/ text（去空白的字符串）/ lower（小写的 text）
+    """
+
+    OPS = ("equals", "in", "regex", "range", "contains")
+    VALUE_FORMATS = ("setting", "raw", "text", "lower")
+    FACTS = ("Host", "AdvancedSettings")
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.key = self.params["key"]
+        self.op = self.params.get("op", "equals")
+        if self.op not in self.OPS:
+            raise ValueError(f"{self.id}: 不支持的 op {self.op}")
+        self.value_format = spec.get("value_format", "setting")
+        if self.value_format not in self.VALUE_FORMATS:
+            raise ValueError(f"{self.id}: 不支持的 value_format {self.value_format}")
+        if self.op == "regex":
+            flags = re.IGNORECASE if self.ignore_case else 0
+            self.pattern = re.compile(self.params["pattern"], flags)
+        self.expected = {_text(v, self.ignore_case) for v in _as_list(self.params.get("values"))}
+        if "value" in self.params:
+            self.expected.add(_text(self.params["value"], self.ignore_case))
+
+    def match(self, value) -> bool:
+        if self.op in ("equals", "in"):
+            return _text(value, self.ignore_case) in self.expected
+        if self.op == "regex":
+            return self.pattern.search(_text(value)) is not None
+        if self.op == "range":
+            if value is None or _text(value) == "":
+                return False
+            number = float(value)
+            low, high = self.params.get("min"), self.params.get("max")
+            return (low is None or number >= low) and (high is None or number <= high)
+        # contains
+        actual = {_text(v, self.ignore_case) for v in _as_list(value)}
+        return self.expected.issubset(actual)
+
+    def format_value(self, setting) -> Any:
+        if self.value_format == "setting":
+            return {"key": setting.key, "value": setting.value, "type": setting.type}
+        if self.value_format == "raw":
+            return setting.value
+        text = "" if setting.value is None else str(setting.value).strip()
+        return text.lower() if self.value_format == "lower" else text
+
+    def is_missing(self, error: Exception) -> bool:
+        return isinstance(error, vim.fault.InvalidName)
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        setting = host.query_options(self.key)[0]
+        return self.format_value(setting), self.match(setting.value)
+
+
+class ServiceRule(Rule):
+    """
+    主机服务：启动策略 policy 在允许列表中、运行状态 running 与期望一致。
+    Value 为 value_fields 中的服务字段（默认全部）；服务不存在时 Value 为空，状态取 missing
+    """
+
+    FACTS = ("Host", "Services")
+    FIELDS = ("key", "label", "policy", "running", "required")
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.service = self.params["service"]
+        self.policies = {str(p).lower() for p in _as_list(self.params.get("policy"))}
+        self.running = self.params.get("running")
+        self.missing_status = self.params.get("missing", "Fail")
+        self.fields = _as_list(spec.get("value_fields")) or list(self.FIELDS)
+        unknown = set(self.fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"{self.id}: 不支持的 value_fields {sorted(unknown)}")
+
+    def describe(self, value) -> str:
+        if value is None:
+            return self.descriptions.get("missing") or self.description
+        return super().describe(value)
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        service = host.find_service(self.service, ignore_case=self.ignore_case)
+        if service is None:
+            return None, self.missing_status == "Pass"
+
+        value = {field: getattr(service, field) for field in self.fields}
+        passed = True
+        if self.policies:
+            passed = passed and str(service.policy).lower() in self.policies
+        if self.running is not None:
+            passed = passed and bool(service.running) == bool(self.running)
+        return value, passed
+
+
+class HostListRule(Rule):
+    """主机上的列表数据（如 NTP 服务器）：数量下限 min_count、必须包含的 values"""
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.fact = self.params["fact"]
+        self.label = self.params.get("label", self.fact)
+        self.min_count = self.params.get("min_count")
+        self.expected = {_text(v, self.ignore_case) for v in _as_list(self.params.get("values"))}
+
+    @property
+    def facts(self) -> Tuple[str, ...]:
+        return ("Host", HostFacts.FACT_KEYS.get(self.fact, self.fact))
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        items = list(getattr(host, self.fact) or [])
+        passed = self.min_count is None or len(items) >= self.min_count
+        if self.expected:
+            passed = passed and self.expected.issubset({_text(v, self.ignore_case) for v in items})
+        return {self.label: items, "Count": len(items)}, passed
+
+
+class VSwitchSecurityRule(Rule):
+    """
+    标准 vSwitch 安全策略：policy（AllowPromiscuous / MacChanges / ForgedTransmits）在每个 vSwitch
+    及每个端口组的生效策略（含继承）上都应为 false（Reject）；未设置视为不通过
+    """
+
+    FACTS = ("Host", "Network")
+    POLICIES = ("AllowPromiscuous", "MacChanges", "ForgedTransmits")
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.policy = self.params["policy"]
+        if self.policy not in self.POLICIES:
+            raise ValueError(f"{self.id}: 不支持的 policy {self.policy}")
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        network = host.network
+        vswitches = {vs["Name"]: vs["Security"][self.policy] for vs in network["VSwitches"]
+                     if vs["Security"][self.policy] is not False}
+        portgroups = {pg["Name"]: pg["Security"][self.policy] for pg in network["PortGroups"]
+                      if pg["Security"][self.policy] is not False}
+        value = {
+            "VSwitchCount": len(network["VSwitches"]),
+            "PortGroupCount": len(network["PortGroups"]),
+            "VSwitches": vswitches,
+            "PortGroups": portgroups,
+        }
+        return value, not vswitches and not portgroups
+
+
+class PortGroupVlanRule(Rule):
+    """标准 vSwitch 端口组的 VLAN：VLAN ID 属于 reject（数字或 "起-止" 范围）即不通过"""
+
+    FACTS = ("Host", "Network")
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.ranges: List[Tuple[int, int]] = []
+        for item in _as_list(self.params["reject"]):
+            low, _, high = str(item).partition("-")
+            self.ranges.append((int(low), int(high or low)))
+
+    def rejected(self, vlan_id) -> bool:
+        return vlan_id is not None and any(low <= vlan_id <= high for low, high in self.ranges)
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        portgroups = host.network["PortGroups"]
+        found = {pg["Name"]: pg["VlanId"] for pg in portgroups if self.rejected(pg["VlanId"])}
+        return {"PortGroupCount": len(portgroups), "PortGroups": found}, not found
+
+
+class DatastoreUniqueRule(Rule):
+    """
+    数据存储名称在全部 vCenter 中唯一：prepare() 用各 vCenter 完整的数据存储列表（不受按主机名筛选影响）
+    建立哈希索引 名称 -> {URL: [(vCenter, 主机)]}，一次遍历全部挂载；
+    同名但 URL 不同（不是同一个数据存储）即为重名，每台主机只报告它挂载的重名数据存储。
+    名称比较不区分大小写；ignore_case: false 时区分
+    """
+
+    FACTS = ("Host", "Datastores")
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.ignore_case = bool(self.params.get("ignore_case", True))
+
+    def _key(self, name: str) -> str:
+        return name.casefold() if self.ignore_case else name
+
+    def prepare(self, facts: FactSet) -> Dict[str, Dict[str, List[Tuple[str, str]]]]:
+        index: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        for vc in facts.vcenters:
+            for datastore in vc.datastores:
+                urls = index.setdefault(self._key(datastore["Name"]), {})
+                mounts = urls.setdefault(datastore["Url"] or datastore["Moid"], [])
+                mounts.extend((vc.vcenter, host) for host in datastore["Hosts"])
+        duplicates = sum(1 for urls in index.values() if len(urls) > 1)
+        logger.info("[Rule %s] %d 个数据存储名称中 %d 个重名", self.aiib_no, len(index), duplicates)
+        return index
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        datastores = host.datastores
+        if context is None:
+            raise RuntimeError("没有建立数据存储名称索引（需先调用 RuleEngine.prepare）")
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        for datastore in datastores:
+            urls = context.get(self._key(datastore["Name"]), {})
+            if len(urls) > 1:
+                found[datastore["Name"]] = [
+                    {"Url": url, "VCenters": sorted({vc for vc, _ in mounts}),
+                     "Hosts": sorted({name for _, name in mounts})}
+                    for url, mounts in urls.items()
+                ]
+        return {"DatastoreCount": len(datastores), "Duplicates": found}, not found
+
+
+class VmDeviceRule(Rule):
+    """
+    主机上虚拟机的设备（见 inventory.VM_DEVICE_TYPES 的类别）：有虚拟机带指定类别的设备即不通过；
+    connected_only: true 时只统计当前已连接的设备
+    """
+
+    FACTS = ("Host", "VMs")
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.devices = _as_list(self.params["device"])
+        self.connected_only = bool(self.params.get("connected_only", False))
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        vms = host.vms
+        found: Dict[str, List[str]] = {}
+        errors: Dict[str, str] = {}
+        for vm in vms:
+            error = (vm.get("Errors") or {}).get("Devices")
+            if error:
+                errors[vm["Name"]] = error
+                continue
+            labels = [device["Label"] for category in self.devices for device in vm["Devices"].get(category, [])
+                      if not self.connected_only or device.get("Connected")]
+            if labels:
+                found[vm["Name"]] = labels
+        value: Dict[str, Any] = {"VMCount": len(vms), "VMs": found}
+        if errors:
+            value["Errors"] = errors
+        return value, not found and not errors
+
+
+class VmSettingRule(AdvancedSettingRule):
+    """
+    主机上虚拟机的高级设置（extraConfig）：key 可用通配符（如 pciPassthru*.present），op 同 advanced_setting；
+    虚拟机上任一匹配键的值不满足即不通过。missing: Fail 表示没有匹配键的虚拟机也不通过（默认视为通过）
+    """
+
+    FACTS = ("Host", "VMs")
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.missing_passes = self.params.get("missing", "Pass") == "Pass"
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        index = host.vm_settings
+        matched = index.lookup(self.key)
+        failed: Dict[str, Dict[str, Any]] = {
+            vm: settings for vm, settings in matched.items()
+            if not all(self.match(value) for value in settings.values())
+        }
+        if not self.missing_passes:
+            failed.update({vm: {self.key: None} for vm in index.vm_names
+                           if vm not in matched and vm not in index.errors})
+        value: Dict[str, Any] = {"VMCount": len(index.vm_names), "VMs": failed}
+        if index.errors:
+            value["Errors"] = dict(index.errors)
+        return value, not failed and not index.errors
+
+
+class VmHardwareVersionRule(Rule):
+    """主机上虚拟机的硬件版本：有虚拟机低于 min_version 即不通过"""
+
+    FACTS = ("Host", "VMs")
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.min_version = int(self.params["min_version"])
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        index = host.vm_versions
+        below = index.below(self.min_version)
+        errors = index.errors["HardwareVersion"]
+        value: Dict[str, Any] = {
+            "VMCount": len(index.vm_names),
+            "Versions": {f"vmx-{version}": count for version, count in index.histogram.items()},
+            "VMs": {vm: f"vmx-{version}" for version, vm in below},
+        }
+        if errors:
+            value["Errors"] = dict(errors)
+        return value, not below and not errors
+
+
+class VmToolsRule(Rule):
+    """主机上虚拟机的 VMware Tools：item（ToolsStatus / ToolsUpgradePolicy）取值不在 values 中即不通过"""
+
+    FACTS = ("Host", "VMs")
+    ITEMS = ("ToolsStatus", "ToolsUpgradePolicy")
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.item = self.params["item"]
+        if self.item not in self.ITEMS:
+            raise ValueError(f"{self.id}: 不支持的 item {self.item}")
+        self.allowed = set(_as_list(self.params["values"]))
+
+    def check(self, host: HostFacts, context: Any = None) -> Tuple[Any, bool]:
+        index = host.vm_versions
+        found = {vm: status for status, vms in index.by_value(self.item).items()
+                 if status not in self.allowed for vm in vms}
+        errors = index.errors[self.item]
+        value: Dict[str, Any] = {"VMCount": len(index.vm_names), "VMs": found}
+        if errors:
+            value["Errors"] = dict(errors)
+        return value, not found and not errors
+
+
+RULE_TYPES = {
+    "advanced_setting": AdvancedSettingRule,
+    "service": ServiceRule,
+    "host_list": HostListRule,
+    "vswitch_security": VSwitchSecurityRule,
+    "portgroup_vlan": PortGroupVlanRule,
+    "datastore_unique": DatastoreUniqueRule,
+    "vm_device": VmDeviceRule,
+    "vm_setting": VmSettingRule,
+    "vm_hardware_version": VmHardwareVersionRule,
+    "vm_tools": VmToolsRule,
+}
+
+
+class RuleEngine:
+    """加载 YAML 中带 rule 的检查项，编译为规则对象，对主机数据一次遍历评估全部规则"""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules: Dict[str, Rule] = {rule.id: rule for rule in rules}
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_RULES_PATH) -> "RuleEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            specs = (yaml.safe_load(f) or {}).get("checks", [])
+
+        rules: List[Rule] = []
+        for spec in specs:
+            if not spec.get("rule"):
+                continue
+            rule_cls = RULE_TYPES.get(spec.get("type"))
+            if rule_cls is None:
+                raise ValueError(f"{spec['id']}: 未知的规则类型 {spec.get('type')}")
+            rules.append(rule_cls(spec))
+
+        logger.info("[RuleEngine] 从 %s 加载 %d 条规则", path, len(rules))
+        return cls(rules)
+
+    def prepare(self, facts: FactSet, rule_ids: List[str] = None) -> Dict[str, Any]:
+        """评估前把全部 vCenter 的数据交给规则预处理一次（见 Rule.prepare），返回 {rule_id: context}"""
+        return {rid: self.rules[rid].prepare(facts) for rid in rule_ids or list(self.rules)}
+
+    def evaluate(self, hosts: Iterable[HostFacts], rule_ids: List[str] = None,
+                 contexts: Dict[str, Any] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        对一组主机评估规则，每台主机只遍历一次
+        :param rule_ids: 只评估这些规则（默认全部）
+        :param contexts: prepare() 的结果
+        :return: {rule_id: [每台主机一条记录]}
+        """
+        contexts = contexts or {}
+        rules = [self.rules[rid] for rid in rule_ids] if rule_ids else list(self.rules.values())
+        results: Dict[str, List[Dict[str, Any]]] = {rule.id: [] for rule in rules}
+        for host in hosts:
+            for rule in rules:
+                results[rule.id].append(rule.evaluate(host, contexts.get(rule.id)))
+        return results
+
+
+_engine: RuleEngine = None
+_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> RuleEngine:
+    """进程内共用一个规则引擎，YAML 只解析一次"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RuleEngine.load()
+        return _engine
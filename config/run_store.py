@@ -0,0 +1,280 @@
+# config/run_store.py
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+
+from config import settings
+from config.export_to_json import atomic_open, export_to_json
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+# 运行汇总（见 config/summary.py），与 manifest 一样不算结果文件
+SUMMARY = "summary.json"
+LATEST = "latest"
+# 检查运行期间的暂存目录：完成的检查由 adopt() 移入运行目录，超时仍在运行的线程只能写到这里
+PENDING = ".pending"
+# 没有 manifest 的运行目录（进程中断）超过该时间后清理
+STALE_SECONDS = 24 * 3600
+
+
+def _file_digest(path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def runs_dir(base_dir: str = None) -> str:
+    return base_dir or settings.RUNS_CONFIG["dir"]
+
+
+def latest_run(base_dir: str = None) -> Optional[str]:
+    """latest 指针指向的运行编号，还没有完成过的运行时返回 None"""
+    pointer = os.path.join(runs_dir(base_dir), LATEST)
+    try:
+        with open(pointer, "r", encoding="utf-8") as f:
+            run_id = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return run_id or None
+
+
+def run_path(run_id: str, base_dir: str = None) -> str:
+    return os.path.join(runs_dir(base_dir), run_id)
+
+
+def load_manifest(run_id: str, base_dir: str = None) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(run_path(run_id, base_dir), MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def list_runs(base_dir: str = None) -> List[str]:
+    """已完成（有 manifest）的运行编号，按时间从旧到新"""
+    base = runs_dir(base_dir)
+    if not os.path.isdir(base):
+        return []
+    return sorted(
+        name for name in os.listdir(base)
+        if os.path.isfile(os.path.join(base, name, MANIFEST))
+    )
+
+
+def diff_runs(old_id: str, new_id: str, base_dir: str = None) -> Dict[str, List[str]]:
+    """按 manifest 中的文件摘要比较两次运行，不读取结果文件内容"""
+    old_files = (load_manifest(old_id, base_dir) or {}).get("Files", {})
+    new_files = (load_manifest(new_id, base_dir) or {}).get("Files", {})
+    return {
+        "Added": sorted(set(new_files) - set(old_files)),
+        "Removed": sorted(set(old_files) - set(new_files)),
+        "Changed": sorted(f for f in set(old_files) & set(new_files)
+                          if old_files[f]["Digest"] != new_files[f]["Digest"]),
+    }
+
+
+class RunDirectory:
+    """
+    一次运行的输出目录 log/runs/<run_id>/：
+    - 检查结果写入 path，运行期间页面仍读取 latest 指向的上一次运行
+    - 并发运行的检查先写入各自的暂存目录 stage(key)，完成后由调度线程 adopt(key) 移入 path；
+      超时的检查不会被 adopt，它的线程之后写出的文件不会进入本次运行的 manifest / 摘要
+    - finish() 把本次未输出的文件从上一次运行硬链接过来（只运行部分检查、检查失败或超时时结果保持上一次的内容），
+      只检查部分主机时把上一次运行中其他主机的记录合并进本次的文件，
+      写入 manifest，再原子替换 latest 指针，启动后台 CMDB 导出（启用时），最后按保留个数清理旧运行
+    """
+
+    def __init__(self, base_dir: str = None, keep: int = None):
+        self.base_dir = runs_dir(base_dir)
+        self.keep = settings.RUNS_CONFIG["keep"] if keep is None else keep
+        self.started_at = time.time()
+        os.makedirs(self.base_dir, exist_ok=True)
+
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        run_id, suffix = stamp, 1
+        while True:
+            try:
+                os.mkdir(os.path.join(self.base_dir, run_id))
+                break
+            except FileExistsError:
+                suffix += 1
+                run_id = f"{stamp}-{suffix}"
+        self.run_id = run_id
+        self.path = os.path.join(self.base_dir, run_id)
+        # finish() 启动的 CMDB 导出线程（未启用导出时为 None）
+        self.export_thread: Optional[threading.Thread] = None
+        logger.info("[Run] 本次运行输出目录: %s", self.path)
+
+    def stage(self, key: str) -> str:
+        """单个检查的暂存目录 <path>/.pending/<key>/"""
+        path = os.path.join(self.path, PENDING, key)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def adopt(self, key: str) -> List[str]:
+        """把已完成检查的暂存文件移入运行目录，返回移入的文件名"""
+        staged = os.path.join(self.path, PENDING, key)
+        names = sorted(os.listdir(staged)) if os.path.isdir(staged) else []
+        for name in names:
+            os.replace(os.path.join(staged, name), os.path.join(self.path, name))
+        shutil.rmtree(staged, ignore_errors=True)
+        return names
+
+    def _carry_over(self, previous: Dict[str, Any]) -> Dict[str, str]:
+        carried: Dict[str, str] = {}
+        previous_dir = run_path(previous["RunId"], self.base_dir)
+        for name, info in previous.get("Files", {}).items():
+            target = os.path.join(self.path, name)
+            if os.path.exists(target):
+                continue
+            source = os.path.join(previous_dir, name)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+            carried[name] = info.get("From", previous["RunId"])
+        return carried
+
+    def _merge_hosts(self, previous: Dict[str, Any], hosts: List[str]) -> int:
+        """
+        按主机筛选的运行只写出匹配主机的记录：把上一次运行同名文件中其他主机的记录合并进来，
+        切换 latest 后其他主机的结果保持上一次的内容；Host 为空（vCenter 采集失败）或 ALL_HOSTS 的记录以本次为准
+        :return: 合并的文件数
+        """
+        from config.inventory import match_host
+
+        previous_dir = run_path(previous["RunId"], self.base_dir)
+        merged = 0
+        for name in previous.get("Files", {}):
+            target = os.path.join(self.path, name)
+            if not os.path.isfile(target):
+                continue
+            with open(os.path.join(previous_dir, name), "r", encoding="utf-8") as f:
+                old_records = json.load(f)
+            with open(target, "r", encoding="utf-8") as f:
+                new_records = json.load(f)
+            if not isinstance(old_records, list) or not isinstance(new_records, list):
+                continue
+            kept = [r for r in old_records if isinstance(r, dict) and r.get("Host") and r["Host"] != "ALL_HOSTS"
+                    and not match_host(r["Host"], hosts)]
+            if kept:
+                export_to_json(kept + new_records, target)
+                merged += 1
+        return merged
+
+    def finish(self, checks: List[Dict[str, Any]] = None, selection: Dict[str, Any] = None,
+               hosts: List[str] = None) -> Dict[str, Any]:
+        """
+        完成本次运行并切换 latest
+        :param checks: 各检查的执行摘要（如 run_check.run_all_checks 的返回值）
+        :param selection: 本次运行的筛选条件（--only / --hosts 等），完整运行时为空
+        :param hosts: 本次只检查了这些主机（主机名通配符），其他主机的记录从上一次运行合并（见 _merge_hosts）
+        :return: manifest
+        """
+        # 没有 adopt 的暂存文件（超时的检查）不进入本次运行；之后才完成的线程只会重新建出暂存目录
+        shutil.rmtree(os.path.join(self.path, PENDING), ignore_errors=True)
+
+        previous_id = latest_run(self.base_dir)
+        previous = load_manifest(previous_id, self.base_dir) if previous_id else None
+        if previous and hosts:
+            merged = self._merge_hosts(previous, hosts)
+            logger.info("[Run] 按主机筛选的运行: %d 个结果文件合并了上一次运行 %s 中其他主机的记录", merged, previous_id)
+        carried = self._carry_over(previous) if previous else {}
+
+        files: Dict[str, Dict[str, Any]] = {}
+        for name in sorted(os.listdir(self.path)):
+            full_path = os.path.join(self.path, name)
+            if not name.endswith(".json") or name in (MANIFEST, SUMMARY) or not os.path.isfile(full_path):
+                continue
+            if name in carried:
+                info = dict(previous["Files"][name])
+                info["From"] = carried[name]
+            else:
+                info = {"Digest": _file_digest(full_path), "Size": os.path.getsize(full_path)}
+            files[name] = info
+        self._write_summary(files)
+
+        manifest = {
+            "RunId": self.run_id,
+            "StartedAt": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+            "FinishedAt": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "Elapsed": round(time.time() - self.started_at, 2),
+            "Previous": previous_id,
+            "Selection": selection or None,
+            "Checks": checks or [],
+            "Files": files,
+        }
+        export_to_json(manifest, os.path.join(self.path, MANIFEST))
+        with atomic_open(os.path.join(self.base_dir, LATEST)) as f:
+            f.write(self.run_id)
+        logger.info("[Run] 运行 %s 完成: %d 个结果文件（沿用上一次 %d 个），latest 已切换",
+                    self.run_id, len(files), len(carried))
+
+        self.export_thread = self._start_cmdb_export()
+        self.prune()
+        return manifest
+
+    def _iter_records(self, files: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        for name in files:
+            with open(os.path.join(self.path, name), "r", encoding="utf-8") as f:
+                records = json.load(f)
+            if isinstance(records, list):
+                yield from records
+
+    def _write_summary(self, files: Iterable[str]):
+        """写入 summary.json（按检查 / 章节 / 主机的计数和状态矩阵），页面和告警只需读取这一个小文件"""
+        from config.summary import build_summary
+
+        try:
+            export_to_json(build_summary(self._iter_records(files), self.run_id),
+                           os.path.join(self.path, SUMMARY), compact=True)
+        except Exception as e:
+            logger.warning("[Run] 运行 %s 生成汇总失败: %s", self.run_id, e)
+
+    def _start_cmdb_export(self) -> Optional[threading.Thread]:
+        """
+        CMDB_EXPORT=1 时在后台线程把本次运行的记录写入 CMDB，finish() 不等待导出完成
+        非守护线程：命令行进程退出前会等导出结束；需要等待时 join 返回的线程
+        """
+        if not settings.CMDB_EXPORT_CONFIG["enabled"]:
+            return None
+        thread = threading.Thread(target=self._export_cmdb, name=f"cmdb-export-{self.run_id}")
+        thread.start()
+        return thread
+
+    def _export_cmdb(self):
+        """导出失败只记录日志，不影响结果文件和 latest"""
+        try:
+            from config.cmdb_exporter import CmdbExporter
+
+            exporter = CmdbExporter()
+            try:
+                exporter.export_run(self.run_id, self.base_dir)
+            finally:
+                exporter.close()
+        except Exception as e:
+            logger.warning("[Run] 运行 %s 写入 CMDB 失败: %s", self.run_id, e)
+
+    def prune(self):
+        """保留最近 keep 次运行（latest 始终保留），清理中断超过 STALE_SECONDS 的目录"""
+        latest = latest_run(self.base_dir)
+        completed = list_runs(self.base_dir)
+        expired = completed[:-self.keep] if self.keep > 0 else []
+        now = time.time()
+        for name in os.listdir(self.base_dir):
+            full_path = os.path.join(self.base_dir, name)
+            if not os.path.isdir(full_path) or name in (latest, self.run_id):
+                continue
+            stale = name not in completed and now - os.path.getmtime(full_path) > STALE_SECONDS
+            if name in expired or stale:
+                shutil.rmtree(full_path, ignore_errors=True)
+                logger.info("[Run] 已清理旧运行目录 %s", name)
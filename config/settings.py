@@ -1,7 +1,29 @@
 # settings.py
 import os
 import platform
-from config.decrypt_message import decrypt_message
+from functools import lru_cache
+
+
+class Encrypted:
+    """加密的配置值，读取配置（get_xxx_config）时才解密，导入 settings 不再触发解密"""
+
+    def __init__(self, token: str):
+        self.token = token
+
+    def __repr__(self):
+        return "Encrypted(***)"
+
+
+@lru_cache(maxsize=None)
+def _decrypt(token: str) -> str:
+    from config.decrypt_message import decrypt_message
+    return decrypt_message(token)
+
+
+def _resolve(config: dict) -> dict:
+    """返回解密后的配置副本"""
+    return {k: _decrypt(v.token) if isinstance(v, Encrypted) else v for k, v in config.items()}
+
 
 # MySQL 数据库配置
 DATABASE_CONFIG = {
@@ -9,7 +31,7 @@ DATABASE_CONFIG = {
     'host': '10.33.16.33',
     'port': 3306,
     'user': 'dbta_db_cmdbapp',
-    'password': decrypt_message('gAAAAABoJX0z4UP7xK9xicG7uXGurTI7PVJ9qDrnbHqokEK_62m8wk3b-OWwGWQ1CcOJxK2xPjR0reRL9T5XWORgJrwz9Eb_E_VTEv8ebFcpGh33USQ7uro='),
+    'password': Encrypted('gAAAAABoJX0z4UP7xK9xicG7uXGurTI7PVJ9qDrnbHqokEK_62m8wk3b-OWwGWQ1CcOJxK2xPjR0reRL9T5XWORgJrwz9Eb_E_VTEv8ebFcpGh33USQ7uro='),
     'database': 'auto_cmdb',
     'charset': 'utf8mb4'
     },
@@ -17,7 +39,7 @@ DATABASE_CONFIG = {
     'host': '10.36.24.253',
     'port': 3306,
     'user': 'dbpa_elp_autocmdb',
-    'password': decrypt_message('gAAAAABoJX0Y_pKkcjbZ1zaSUqCdRRgrk7WbLz-s3dL4KZ2PLU0Xrhwkl_-2DrDHC9Gy18dEnk3nX0ItOOyA8NH2DcpV6Adaug=='),
+    'password': Encrypted('gAAAAABoJX0Y_pKkcjbZ1zaSUqCdRRgrk7WbLz-s3dL4KZ2PLU0Xrhwkl_-2DrDHC9Gy18dEnk3nX0ItOOyA8NH2DcpV6Adaug=='),
     'database': 'auto_cmdb',
     'charset': 'utf8mb4'
     }
@@ -28,24 +50,78 @@ VSPHERE_CONFIG = {
     "prod": {
         "HOST":["vc-bj-01.vsphere.aiib.org", "vc-tj-01.vsphere.aiib.org"],
         "USERNAME":"psa-infra-pbi@aiib.org",
-        "PASSWORD":decrypt_message("gAAAAABoJX45Du7Y4pvoMLqiIxX1UEDSYpSwCuLmfu7ZQMG1XEnNhLDRf-_LzvtdFDuYzHhEsfdwwfqt7UGSR53wdQTWtFq1NgtouVhFiaFcHx2VqcXjR3Q="),
+        "PASSWORD":Encrypted("gAAAAABoJX45Du7Y4pvoMLqiIxX1UEDSYpSwCuLmfu7ZQMG1XEnNhLDRf-_LzvtdFDuYzHhEsfdwwfqt7UGSR53wdQTWtFq1NgtouVhFiaFcHx2VqcXjR3Q="),
         "ENDPOINT":"/rest/com/vmware/cis/session"
     },
     "test":{
         "HOST":"vc01.vsphere.aiib.local",
         "USERNAME":"cmdreader@vsphere.local",
-        "PASSWORD":decrypt_message("gAAAAABoJX5bmyY36zCdWf51Ekp83476X1EZmIZO-nS3NbUVhd3zpHJhl-ARa2o1iz_rOHHDf0u6CeZrUOR05S7GFqblpKDfmg=="),
+        "PASSWORD":Encrypted("gAAAAABoJX5bmyY36zCdWf51Ekp83476X1EZmIZO-nS3NbUVhd3zpHJhl-ARa2o1iz_rOHHDf0u6CeZrUOR05S7GFqblpKDfmg=="),
         "ENDPOINT":"/rest/com/vmware/cis/session"
     }
 }
 
+# vCenter 连接：timeout 为每个 HTTP 请求的 socket 超时（秒），vCenter 无响应时请求报错而不是一直等待
+VSPHERE_CONNECT_CONFIG = {
+    "timeout": float(os.getenv("VSPHERE_TIMEOUT", "300")),
+}
+
+# 主机级并发采集（默认关闭，设置环境变量 HOST_PARALLEL=1 开启）
+HOST_EXECUTOR_CONFIG = {
+    "enabled": os.getenv("HOST_PARALLEL", "0") == "1",
+    "max_workers": int(os.getenv("HOST_PARALLEL_WORKERS", "8")),  # 全局同时进行的主机级请求上限
+    "rate_per_second": float(os.getenv("HOST_RATE_LIMIT", "10")),  # 每个 vCenter 每秒请求数
+    "burst": 10
+}
+
+# 本地采集结果缓存：ttl 秒内重复运行直接使用缓存，不再请求 vCenter（0 表示不使用缓存）
+FACT_CACHE_CONFIG = {
+    "path": os.getenv("FACT_CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                      "cache", "facts.sqlite")),
+    "ttl": float(os.getenv("FACT_CACHE_TTL", "600")),
+}
+
+# 每次运行的结果写入 log/runs/<时间>/，完成后切换 latest 指针；保留最近 keep 次运行
+RUNS_CONFIG = {
+    "dir": os.getenv("RUNS_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                              "log", "runs")),
+    "keep": int(os.getenv("RUNS_KEEP", "30")),
+}
+
+# 检查结果 JSON 导出：EXPORT_COMPACT=1 时不缩进，减小文件体积
+EXPORT_CONFIG = {
+    "compact": os.getenv("EXPORT_COMPACT", "0") == "1",
+}
+
+# 页面主机列表（/all_hosts）：优先取采集缓存中的主机，超过 ttl 秒后在后台重新从 vCenter 获取，请求不等待登录；
+# HOST_LIST_REFRESH=0 时只使用采集缓存 / 最近一次运行结果
+HOST_LIST_CONFIG = {
+    "ttl": float(os.getenv("HOST_LIST_TTL", "600")),
+    "refresh": os.getenv("HOST_LIST_REFRESH", "1") == "1",
+}
+
+# 检查结果写入 CMDB（DATABASE_CONFIG[env] 的 MySQL）：CMDB_EXPORT=1 时每次运行完成（latest 切换）后在后台线程导出；
+# CMDB_EXPORT_SQLITE 指定路径时改写本地 SQLite（没有 MySQL 的环境验证用）
+CMDB_EXPORT_CONFIG = {
+    "enabled": os.getenv("CMDB_EXPORT", "0") == "1",
+    "env": os.getenv("project_env", "prod"),
+    "table": os.getenv("CMDB_EXPORT_TABLE", "vmware_cis_results"),
+    "batch_size": int(os.getenv("CMDB_EXPORT_BATCH", "500")),
+    "retries": int(os.getenv("CMDB_EXPORT_RETRIES", "3")),
+    "sqlite_path": os.getenv("CMDB_EXPORT_SQLITE", ""),
+}
+
+def get_vsphere_hosts(env):
+    """ 根据环境 env 获取 vCenter 地址（不解密密码） """
+    return VSPHERE_CONFIG[env]["HOST"]
+
 def get_vsphere_config(env):
     """ 根据环境 env 获取 vsphere 配置信息 """
-    return VSPHERE_CONFIG[env]
+    return _resolve(VSPHERE_CONFIG[env])
 
 def get_database_config(env):
     """ 根据环境 env 获取 vsphere 配置信息 """
-    return DATABASE_CONFIG[env]
+    return _resolve(DATABASE_CONFIG[env])
 
 if __name__ == "__main__":
     project_env = os.getenv('project_env', 'prod')  # 如果没有设置，则默认为 prod
@@ -0,0 +1,77 @@
+# config/summary.py
+
+import time
+import logging
+from typing import List, Dict, Any, Iterable
+
+from config.check_registry import SECTIONS
+from config.result_index import file_sort_key
+
+logger = logging.getLogger(__name__)
+
+# 矩阵中的状态代码；同一主机同一检查有多条记录时取更严重的状态（F > ? > P）
+STATUS_CODES = {"Fail": "F", "Pass": "P"}
+OTHER_CODE = "?"
+MISSING_CODE = "-"
+
+
+def _code(status: str) -> str:
+    return STATUS_CODES.get(status, OTHER_CODE)
+
+
+def _priority(code: str) -> int:
+    return {"F": 3, OTHER_CODE: 2, "P": 1}.get(code, 0)
+
+
+def _count(bucket: Dict[str, int], status: str):
+    status = status or "Unknown"
+    bucket[status] = bucket.get(status, 0) + 1
+    bucket["Total"] = bucket.get("Total", 0) + 1
+
+
+def build_summary(records: Iterable[Dict[str, Any]], run_id: str = None) -> Dict[str, Any]:
+    """
+    汇总一次运行的记录：总数、按检查 / 章节 / 主机的状态计数，以及主机 × 检查的状态矩阵。
+    矩阵每台主机一个字符串，第 i 个字符对应 Matrix.Checks[i] 的状态（P / F / ? / -）；
+    Host 为空或 ALL_HOSTS 的记录只计入检查和章节，不进入主机统计和矩阵
+    """
+    totals: Dict[str, int] = {}
+    checks: Dict[str, Dict[str, Any]] = {}
+    sections: Dict[str, Dict[str, int]] = {}
+    hosts: Dict[str, Dict[str, int]] = {}
+    cells: Dict[str, Dict[str, str]] = {}
+
+    for record in records:
+        status = record.get("Status")
+        aiib_no = record.get("AIIB.No") or ""
+        host = record.get("Host")
+
+        _count(totals, status)
+        check = checks.setdefault(aiib_no, {"Name": record.get("Name"), "CIS.No": record.get("CIS.No")})
+        _count(check, status)
+        section = SECTIONS.get(aiib_no.split(".")[0], "Other")
+        _count(sections.setdefault(section, {}), status)
+
+        if host and host != "ALL_HOSTS":
+            _count(hosts.setdefault(host, {}), status)
+            row = cells.setdefault(host, {})
+            code = _code(status)
+            if _priority(code) > _priority(row.get(aiib_no, MISSING_CODE)):
+                row[aiib_no] = code
+
+    check_order: List[str] = sorted(checks, key=lambda no: file_sort_key(f"no_{no}_"))
+    host_order: List[str] = sorted(hosts)
+    return {
+        "RunId": run_id,
+        "GeneratedAt": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "Totals": totals,
+        "Checks": {no: checks[no] for no in check_order},
+        "Sections": sections,
+        "Hosts": {host: hosts[host] for host in host_order},
+        "Matrix": {
+            "Codes": {**{code: status for status, code in STATUS_CODES.items()},
+                      OTHER_CODE: "Other", MISSING_CODE: "NoRecord"},
+            "Checks": check_order,
+            "Rows": {host: "".join(cells[host].get(no, MISSING_CODE) for no in check_order) for host in host_order},
+        },
+    }
@@ -0,0 +1,102 @@
+# config/vm_settings.py
+
+import bisect
+import logging
+from fnmatch import fnmatchcase
+from typing import List, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WILDCARDS = "*?["
+
+
+class VmSettingIndex:
+    """
+    一台主机上全部虚拟机 extraConfig 的倒排索引：键 -> [(虚拟机, 值)]
+    - 键不区分大小写（与 Get-AdvancedSetting -Name 一致），结果中保留原始键名
+    - lookup(pattern) 支持精确键和通配符（如 pciPassthru*.present）：先按通配符前的固定前缀在有序键表中
+      二分定位，只对这一段键做 fnmatch，不再逐台虚拟机遍历
+    - 没有采集到 extraConfig 的虚拟机记在 errors 中
+    """
+
+    def __init__(self, vms: List[Dict[str, Any]]):
+        self.vm_names: List[str] = [vm["Name"] for vm in vms]
+        self.errors: Dict[str, str] = {}
+        self._by_key: Dict[str, List[Tuple[str, str, Any]]] = {}
+        for vm in vms:
+            error = (vm.get("Errors") or {}).get("Settings")
+            if "Settings" not in vm:
+                error = error or "没有采集该虚拟机的高级设置"
+            if error:
+                self.errors[vm["Name"]] = error
+                continue
+            for key, value in vm["Settings"].items():
+                self._by_key.setdefault(key.lower(), []).append((vm["Name"], key, value))
+        self._keys: List[str] = sorted(self._by_key)
+
+    def _candidates(self, pattern: str) -> List[str]:
+        """固定前缀相同的一段键（有序键表中连续的一段）"""
+        cut = min((pattern.index(c) for c in _WILDCARDS if c in pattern), default=len(pattern))
+        prefix = pattern[:cut]
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + "\uffff") if prefix else len(self._keys)
+        return self._keys[start:end]
+
+    def lookup(self, pattern: str) -> Dict[str, Dict[str, Any]]:
+        """
+        匹配的键及取值，按虚拟机分组
+        :return: {虚拟机: {原始键名: 值}}，没有匹配键的虚拟机不出现
+        """
+        pattern = pattern.lower()
+        if not any(c in pattern for c in _WILDCARDS):
+            keys = [pattern] if pattern in self._by_key else []
+        else:
+            keys = [key for key in self._candidates(pattern) if fnmatchcase(key, pattern)]
+
+        found: Dict[str, Dict[str, Any]] = {}
+        for key in keys:
+            for vm_name, original, value in self._by_key[key]:
+                found.setdefault(vm_name, {})[original] = value
+        return found
+
+
+class VmVersionIndex:
+    """
+    一台主机上虚拟机的硬件版本 / VMware Tools 状态索引，构建时排序一次：
+    - below(version)：二分查找有序的 (硬件版本, 虚拟机) 列表，低于指定版本的虚拟机是列表开头的一段
+    - histogram：硬件版本 -> 虚拟机数（按版本升序）
+    - by_value(item)：ToolsStatus / ToolsUpgradePolicy 的取值 -> 虚拟机列表，规则只遍历不同取值
+    - 该数据项采集失败或无法识别的虚拟机记在 errors[数据项] 中
+    """
+
+    ITEMS = ("HardwareVersion", "ToolsStatus", "ToolsUpgradePolicy")
+
+    def __init__(self, vms: List[Dict[str, Any]]):
+        self.vm_names: List[str] = [vm["Name"] for vm in vms]
+        self.errors: Dict[str, Dict[str, str]] = {item: {} for item in self.ITEMS}
+        self._values: Dict[str, Dict[Any, List[str]]] = {item: {} for item in self.ITEMS}
+        versions: List[Tuple[int, str]] = []
+        for vm in vms:
+            vm_errors = vm.get("Errors") or {}
+            for item in self.ITEMS:
+                if item in vm_errors or item not in vm:
+                    self.errors[item][vm["Name"]] = vm_errors.get(item, f"没有采集该虚拟机的 {item}")
+                elif item == "HardwareVersion" and vm[item] is None:
+                    self.errors[item][vm["Name"]] = "无法识别的硬件版本"
+                else:
+                    self._values[item].setdefault(vm[item], []).append(vm["Name"])
+                    if item == "HardwareVersion":
+                        versions.append((vm[item], vm["Name"]))
+        versions.sort()
+        self._versions = versions
+        self._version_keys: List[int] = [version for version, _ in versions]
+        self.histogram: Dict[int, int] = {
+            version: len(self._values["HardwareVersion"][version]) for version in sorted(self._values["HardwareVersion"])
+        }
+
+    def below(self, version: int) -> List[Tuple[int, str]]:
+        """硬件版本低于 version 的 [(硬件版本, 虚拟机)]，按版本升序"""
+        return self._versions[:bisect.bisect_left(self._version_keys, version)]
+
+    def by_value(self, item: str) -> Dict[Any, List[str]]:
+        return self._values[item]
@@ -2,11 +2,15 @@
 
 import ssl
 import os
+import time
 import logging
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Callable, Tuple, Optional
 
 from pyVim.connect import SmartConnect, Disconnect
 from config import settings
+from config.inventory import HostInventory, get_host_inventory
 from pyVmomi import vim
 
 # === 配置日志 ===
@@ -17,31 +21,143 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _login(host: str, env: str = "prod"):
+    """
+    使用 settings 中的账号登录指定 vCenter，返回 ServiceInstance；
+    之后该会话的每个请求都带 VSPHERE_CONNECT_CONFIG["timeout"] 秒的 socket 超时
+    """
+    vsphere_data = settings.get_vsphere_config(os.getenv("project_env", env))
+    context = ssl._create_unverified_context()
+    si = SmartConnect(
+        host=host, user=vsphere_data["USERNAME"], pwd=vsphere_data["PASSWORD"], sslContext=context,
+        httpConnectionTimeout=settings.VSPHERE_CONNECT_CONFIG["timeout"] or None
+    )
+    logger.info("成功连接 vSphere: %s", host)
+    return si
+
+
+def get_vcenter_list(env: str = "prod") -> List[str]:
+    """返回配置中的 vCenter 列表（HOST 可能是字符串或列表）"""
+    host_config = settings.get_vsphere_hosts(os.getenv("project_env", env))
+    if not isinstance(host_config, list):
+        host_config = [host_config]
+    return host_config
+
+
+class VsphereSessionPool:
+    """
+    vCenter 会话注册表：每个 vCenter 在一次运行中只登录一次，由所有检查模块共享。
+    - 超过 keepalive_interval 未使用的会话，取用前先调用 CurrentTime() 探活
+    - 会话过期 (NotAuthenticated) 或连接断开时自动重新登录
+    - cached() 提供本次运行内的数据缓存（如主机属性快照），多个模块共用
+    """
+
+    def __init__(self, env: str = "prod", keepalive_interval: int = 300):
+        self.env = env
+        self.keepalive_interval = keepalive_interval
+        self._sessions: Dict[str, Any] = {}
+        self._last_used: Dict[str, float] = {}
+        self._cache: Dict[Any, Any] = {}
+        self._cache_locks: Dict[Any, threading.Lock] = {}
+        self._vc_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def vcenters(self) -> List[str]:
+        return get_vcenter_list(self.env)
+
+    def get(self, vc_host: str = None):
+        """获取 vc_host 的 ServiceInstance，不存在或已失效时重新登录"""
+        vc_host = vc_host or self.vcenters[0]
+        with self._lock:
+            vc_lock = self._vc_locks.setdefault(vc_host, threading.Lock())
+
+        # 按 vCenter 加锁：同一 vCenter 只登录一次，不同 vCenter 互不阻塞
+        with vc_lock:
+            si = self._sessions.get(vc_host)
+            if si is not None and not self._is_alive(vc_host, si):
+                logger.warning("vCenter %s 会话已失效，重新登录", vc_host)
+                self._disconnect(vc_host, si)
+                si = None
+            if si is None:
+                si = _login(vc_host, self.env)
+                self._sessions[vc_host] = si
+            self._last_used[vc_host] = time.monotonic()
+            return si
+
+    def get_content(self, vc_host: str = None):
+        return self.get(vc_host).RetrieveContent()
+
+    def cached(self, key, factory: Callable[[], Any]):
+        """本次运行内按 key 缓存 factory() 的结果；同一个 key 只会计算一次"""
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            key_lock = self._cache_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if key not in self._cache:
+                value = factory()
+                with self._lock:
+                    self._cache[key] = value
+            return self._cache[key]
+
+    def _is_alive(self, vc_host: str, si) -> bool:
+        if time.monotonic() - self._last_used.get(vc_host, 0) < self.keepalive_interval:
+            return True
+        try:
+            si.CurrentTime()
+            return True
+        except vim.fault.NotAuthenticated:
+            return False
+        except Exception as e:
+            logger.warning("vCenter %s 会话探活失败: %s", vc_host, e)
+            return False
+
+    def _disconnect(self, vc_host: str, si):
+        try:
+            Disconnect(si)
+            logger.info("已断开 vSphere 连接: %s", vc_host)
+        except Exception as e:
+            logger.warning("断开 vCenter %s 连接失败: %s", vc_host, e)
+
+    def close(self):
+        """断开所有会话"""
+        with self._lock:
+            for vc_host, si in self._sessions.items():
+                self._disconnect(vc_host, si)
+            self._sessions.clear()
+            self._last_used.clear()
+            self._cache.clear()
+            self._cache_locks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 class VsphereConnection:
-    """vSphere 连接的上下文管理器，可接受 host 参数"""
+    """
+    vSphere 连接的上下文管理器，可接受 host 参数。
+    传入 sessions (VsphereSessionPool) 时复用池中的会话，退出时不断开连接。
+    """
 
-    def __init__(self, host: str = None, env: str = "prod"):
+    def __init__(self, host: str = None, env: str = "prod", sessions: VsphereSessionPool = None):
         self.env = env
         self.host = host
+        self.sessions = sessions
         self.service_instance = None
 
     def __enter__(self):
-        vsphere_data = settings.get_vsphere_config(os.getenv("project_env", self.env))
-        username = vsphere_data["USERNAME"]
-        password = vsphere_data["PASSWORD"]
-
         if not self.host:
-            host_config = vsphere_data["HOST"]
-            if isinstance(host_config, list):
-                self.host = host_config[0]
-            else:
-                self.host = host_config
-
-        context = ssl._create_unverified_context()
-        self.service_instance = SmartConnect(
-            host=self.host, user=username, pwd=password, sslContext=context
-        )
-        logger.info("成功连接 vSphere: %s", self.host)
+            self.host = get_vcenter_list(self.env)[0]
+
+        if self.sessions is not None:
+            return self.sessions.get(self.host)
+
+        self.service_instance = _login(self.host, self.env)
         return self.service_instance
 
     def __exit__(self, exc_type, exc_value, traceback):
@@ -49,28 +165,71 @@ class VsphereConnection:
             Disconnect(self.service_instance)
             logger.info("已断开 vSphere 连接")
 
-def get_all_hosts_name(env: str = "prod") -> List[str]:
-    vsphere_data = settings.get_vsphere_config(os.getenv('project_env', env))
-    host_list = vsphere_data["HOST"]
-    if not isinstance(host_list, list):
-        host_list = [host_list]
 
-    all_hosts: List[str] = []
+def run_on_vcenters(fn: Callable[[str, Any], Any], sessions: VsphereSessionPool = None,
+                    env: str = "prod", vc_list: List[str] = None,
+                    timeout: float = None) -> List[Tuple[str, Any, Optional[Exception]]]:
+    """
+    并发在所有已配置的 vCenter 上执行 fn(vc_host, content)。
+    - 某个 vCenter 失败不影响其他 vCenter
+    - 指定 timeout 时最多等待这么久，未完成的 vCenter 记为 TimeoutError（线程无法强制终止，结果丢弃）
+    - 返回顺序与配置中的 vCenter 顺序一致
+    :param fn: 单个 vCenter 的处理函数
+    :param sessions: 共享的 vCenter 会话池（为空时每个 vCenter 单独登录）
+    :param vc_list: 只在这些 vCenter 上执行（默认全部已配置的 vCenter）
+    :param timeout: 所有 vCenter 的等待时间（秒），默认一直等待
+    :return: [(vc_host, 结果, 异常), ...]，成功时异常为 None，失败时结果为 None
+    """
+    vc_list = get_vcenter_list(env) if vc_list is None else vc_list
+    if not vc_list:
+        return []
+
+    def run_one(vc_host: str):
+        with VsphereConnection(host=vc_host, env=env, sessions=sessions) as si:
+            return fn(vc_host, si.RetrieveContent())
 
-    for vc_host in host_list:
+    executor = ThreadPoolExecutor(max_workers=len(vc_list), thread_name_prefix="vcenter")
+    futures = [(vc_host, executor.submit(run_one, vc_host)) for vc_host in vc_list]
+    wait([future for _, future in futures], timeout=timeout)
+    executor.shutdown(wait=False)
+
+    results: List[Tuple[str, Any, Optional[Exception]]] = []
+    for vc_host, future in futures:
+        if not future.done():
+            logger.error("vCenter %s 超过 %s 秒未完成，不再等待", vc_host, timeout)
+            results.append((vc_host, None, TimeoutError(f"超过 {timeout} 秒未完成")))
+            continue
         try:
-            with VsphereConnection(host=vc_host) as si:
+            results.append((vc_host, future.result(), None))
+        except Exception as e:
+            results.append((vc_host, None, e))
+    return results
+
+
+def get_hosts_by_vcenter(env: str = "prod", sessions: VsphereSessionPool = None) -> Dict[str, List[str]]:
+    """各 vCenter 的主机名；连接失败的 vCenter 不出现在结果中（调用方可保留其上一次的主机列表）"""
+    result: Dict[str, List[str]] = {}
+
+    for vc_host in get_vcenter_list(env):
+        try:
+            with VsphereConnection(host=vc_host, env=env, sessions=sessions) as si:
                 content = si.RetrieveContent()
-                # 指定 HostSystem
-                container = content.viewManager.CreateContainerView(
-                    content.rootFolder, [vim.HostSystem], True
-                )
-                hosts = [h.name for h in container.view]
-                container.Destroy()
-                all_hosts.extend(hosts)
+                # 有会话池时复用本次运行的主机快照，否则只批量取 name 属性
+                if sessions is not None:
+                    inventory = get_host_inventory(vc_host, content, sessions)
+                else:
+                    inventory = HostInventory.retrieve(content, ["name"])
+                result[vc_host] = [h.name for h in inventory]
         except Exception as e:
             logger.error("连接 vCenter %s 失败: %s", vc_host, e)
 
+    return result
+
+
+def get_all_hosts_name(env: str = "prod", sessions: VsphereSessionPool = None) -> List[str]:
+    all_hosts: List[str] = []
+    for names in get_hosts_by_vcenter(env, sessions).values():
+        all_hosts.extend(names)
     return all_hosts
 
 
@@ -1,57 +1,8 @@
 import logging
-import importlib
 import os
+import argparse
 
-from vmware_cis_checks import (
-    software_general_manual, # no_1.1
-    ntp_info,  # no_1.2
-    time_sync_manual, # no_1.3
-    mem_share_salt,  # no_1.4
-    tsm_ssh,  # no_2.1
-    tsm,  # no_2.2
-    solo_enable_moob,  # no_2.3
-    snmp,  # no_2.4
-    dcui_timeout,  # no_2.5
-    shell_warning,  # no_2.6
-    password_complexity,  # no_2.7
-    account_lock_failure,  # no_2.8
-    account_unlock_time,  # no_2.9
-    password_history,  # no_2.10
-    password_max_days,  # no_2.11
-    session_timeout_api,  # no_2.12
-    idle_timeout,  # no_2.13
-    dcui_access,  # no_2.14
-    exception_users,  # no_2.15
-    tls_version,  # no_2.16
-    syslog_persistent,  # no_3.1
-    syslog_remote_loghost,  # no_3.2
-    hostagent_log_level,  # no_3.3
-    log_filtering,  # no_3.4
-    tls_log_verify,  # no_3.5
-    firewall_services_manual,  # no_4.1
-    collect_dvfilter,  # no_4.2
-    bpdu_filter,  # no_4.3
-    forged_transmits,  # no_4.4
-    mac_changes,  # no_4.5
-    vss_promiscuous_mode,  # no_4.6
-    vss_vlan_restrict,  # no_4.7
-    vss_vgt_check,  # no_4.8
-    management_network_manual,  # no_4.9
-    datastore_unique_names,  # no_5.1
-    vm_3d_graphics_status,  # no_6.1
-    vm_pci_passthru,  # no_6.2
-    vm_audio_device_manual,  # no_6.3
-    vm_ahci_device_manual,  # no_6.4
-    vm_usb_settings,  # no_6.5
-    vm_serial_port,  # no_6.6
-    vm_parallel_port,  # no_6.7
-    vm_cd_drive,  # no_6.8
-    vm_floppy_drive,  # no_6.9
-    vm_hardware_version_manual,  # no_6.10
-    vmware_tools_update_manual,  # no_7.1
-    vmware_tools_auto_upgrade_manual,  # no_7.2
-    vmware_tools_prevent_recustomization_manual  # no_7.3
-)
+from config.check_registry import get_registry
 
 
 # ------------------------------
@@ -70,71 +21,53 @@ PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 LOG_DIR = os.path.join(PROJECT_ROOT, "log")
 os.makedirs(LOG_DIR, exist_ok=True)  # 确保 log/ 存在
 
-# ------------------------------
-# 要执行的检查模块 (顺序与 import 顺序一致)
-# ------------------------------
-CHECK_MODULES = [
-    "vmware_cis_checks.software_general",
-    "vmware_cis_checks.ntp_info",
-    "vmware_cis_checks.time_sync",
-    "vmware_cis_checks.mem_share_salt",
-    "vmware_cis_checks.tsm_ssh",
-    "vmware_cis_checks.tsm",
-    "vmware_cis_checks.solo_enable_moob",
-    "vmware_cis_checks.snmp_manual",
-    "vmware_cis_checks.dcui_timeout",
-    "vmware_cis_checks.shell_warning_manual",
-    "vmware_cis_checks.password_complexity_manual",
-    "vmware_cis_checks.account_lock_failure",
-    "vmware_cis_checks.account_unlock_time",
-    "vmware_cis_checks.password_history_manual",
-    "vmware_cis_checks.password_max_days_manual",
-    "vmware_cis_checks.session_timeout_api_manual",
-    "vmware_cis_checks.idle_host_client_manual",
-    "vmware_cis_checks.dcui_access",
-    "vmware_cis_checks.exception_users_manual",
-    "vmware_cis_checks.tls_version_manual",
-    "vmware_cis_checks.syslog_persistent",
-    "vmware_cis_checks.syslog_remote_loghost",
-    "vmware_cis_checks.hostagent_log_level",
-    "vmware_cis_checks.log_filtering",
-    "vmware_cis_checks.tls_log_verify",
-    "vmware_cis_checks.firewall_services_manual",
-    "vmware_cis_checks.dvfilter_manual",
-    "vmware_cis_checks.bpdu_filter",
-    "vmware_cis_checks.forged_transmits",
-    "vmware_cis_checks.mac_changes",
-    "vmware_cis_checks.vss_promiscuous_mode",
-    "vmware_cis_checks.vss_vlan_restrict",
-    "vmware_cis_checks.vss_vgt_check",
-    "vmware_cis_checks.management_network_manual",
-    "vmware_cis_checks.datastore_unique_names",
-    "vmware_cis_checks.vm_3d_graphics_status",  # 6.1
-    "vmware_cis_checks.vm_pci_passthru",  # 6.2
-    "vmware_cis_checks.vm_audio_device_manual",  # 6.3
-    "vmware_cis_checks.vm_ahci_device_manual",  # 6.4
-    "vmware_cis_checks.vm_usb_settings",  # 6.5
-    "vmware_cis_checks.vm_serial_port",  # 6.6
-    "vmware_cis_checks.vm_parallel_port",  # 6.7
-    "vmware_cis_checks.vm_cd_drive",  # 6.8
-    "vmware_cis_checks.vm_floppy_drive",  # 6.9
-    "vmware_cis_checks.vm_hardware_version_manual",  # 6.10
-    "vmware_cis_checks.vmware_tools_update_manual", # 7.1
-    "vmware_cis_checks.vmware_tools_auto_upgrade_manual", # 7.2
-    "vmware_cis_checks.vmware_tools_prevent_recustomization_manual" # 7.3
-]
+def parse_args():
+    parser = argparse.ArgumentParser(description="VMware CIS 基线检查（按注册顺序逐个执行检查模块）")
+    parser.add_argument("--max-age", type=float, default=None,
+                        help="使用不超过该秒数的本地缓存采集结果（默认取 FACT_CACHE_TTL，0 表示强制重新采集）")
+    return parser.parse_args()
+
+def export_rule_only_checks(output_dir: str, sessions, max_age: float = None):
+    """
+    导出没有对应检查模块、只在 YAML 中声明的规则（与 run_check.py 的完整运行一致）；
+    采集结果在同一个会话池内已由检查模块取得，不会再次请求 vCenter
+    """
+    from config.facts import collect_facts
+    from config.pipeline import evaluate_rules, export_rules
+    from config.rule_engine import get_rule_engine
+
+    module_rules = {entry.info.get("Rule") for entry in get_registry()}
+    rule_ids = [rid for rid in get_rule_engine().rules if rid not in module_rules]
+    if not rule_ids:
+        return
+    logger.info("导出没有检查模块的规则: %s", ", ".join(rule_ids))
+    export_rules(evaluate_rules(collect_facts(sessions, max_age=max_age), rule_ids), output_dir)
+
+
+def main(max_age: float = None):
+    from config.vsphere_conn import VsphereSessionPool
+    from config.run_store import RunDirectory
+
+    # 要执行的检查模块见 config/check_registry.py，按注册顺序逐个导入执行
+    # 结果写入本次运行目录 log/runs/<时间>/，全部结束后切换 latest
+    run = RunDirectory()
+    with VsphereSessionPool() as sessions:
+        for entry in get_registry():
+            try:
+                logger.info("执行模块: %s", entry.module_name)
+                module = entry.module
+                if hasattr(module, "main"):
+                    module.main(run.path, sessions=sessions, max_age=max_age)  # 把运行目录、共享会话池和缓存时间传进去
+                else:
+                    logger.warning("模块 %s 没有 main() 方法，跳过", entry.module_name)
+            except Exception as e:
+                logger.error("模块 %s 执行失败: %s", entry.module_name, e)
 
-def main():
-    for module_name in CHECK_MODULES:
         try:
-            logger.info("执行模块: %s", module_name)
-            module = importlib.import_module(module_name)
-            if hasattr(module, "main"):
-                module.main(LOG_DIR)  # 把日志目录作为参数传进去
-            else:
-                logger.warning("模块 %s 没有 main() 方法，跳过", module_name)
+            export_rule_only_checks(run.path, sessions, max_age)
         except Exception as e:
-            logger.error("模块 %s 执行失败: %s", module_name, e)
+            logger.error("导出 YAML 规则失败: %s", e)
+    run.finish()
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_args().max_age)
@@ -3,6 +3,11 @@
 # 启动 cron
 crond
 
+# 增量检查：CIS_WATCH=1 时常驻监听主机属性变化，只重新评估受影响的检查
+if [ "$CIS_WATCH" = "1" ]; then
+    python run_check.py --watch "${CIS_WATCH_INTERVAL:-300}" &
+fi
+
 # 启动 Flask
 export FLASK_APP=app.py
 export FLASK_RUN_HOST=0.0.0.0
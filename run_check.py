@@ -1,129 +1,185 @@
-import os
+import time
 import logging
-from vmware_cis_checks import (
-    software_general_manual,              # 1.1
-    ntp_info,                             # 1.2
-    time_sync_manual,                     # 1.3
-    mem_share_salt,                       # 1.4
-    tsm_ssh,                              # 2.1
-    tsm,                                  # 2.2
-    solo_enable_moob,                     # 2.3
-    snmp,                          # 2.4
-    dcui_timeout,                         # 2.5
-    shell_warning,                        # 2.6
-    password_complexity,            # 2.7
-    account_lock_failure,                  # 2.8
-    account_unlock_time,                   # 2.9
-    password_history,               # 2.10
-    password_max_days,              # 2.11
-    session_timeout_api,            # 2.12
-    idle_timeout,               # 2.13
-    dcui_access,                           # 2.14
-    exception_users,                # 2.15
-    tls_version,                    # 2.16
-    syslog_persistent,                     # 3.1
-    syslog_remote_loghost,                 # 3.2
-    hostagent_log_level,                   # 3.3
-    log_filtering,                         # 3.4
-    tls_log_verify,                        # 3.5
-    firewall_services_manual,              # 4.1
-    collect_dvfilter,                       # 4.2
-    bpdu_filter,                           # 4.3
-    forged_transmits,                      # 4.4
-    mac_changes,                           # 4.5
-    vss_promiscuous_mode,                  # 4.6
-    vss_vlan_restrict,                     # 4.7
-    vss_vgt_check,                         # 4.8
-    management_network_manual,             # 4.9
-    datastore_unique_names,                # 5.1
-    vm_3d_graphics_status,                 # 6.1
-    vm_pci_passthru,                       # 6.2
-    vm_audio_device_manual,                # 6.3
-    vm_ahci_device_manual,                 # 6.4
-    vm_usb_settings,                       # 6.5
-    vm_serial_port,                        # 6.6
-    vm_parallel_port,                      # 6.7
-    vm_cd_drive,                           # 6.8
-    vm_floppy_drive,                       # 6.9
-    vm_hardware_version_manual,            # 6.10
-    vmware_tools_update_manual,            # 7.1
-    vmware_tools_auto_upgrade_manual,      # 7.2
-    vmware_tools_prevent_recustomization_manual  # 7.3
-)
-
-# === 模块编号和模块映射 ===
-check_modules = [
-    ("1.1", software_general_manual),  # ok
-    ("1.2", ntp_info),  # ok
-    ("1.3", time_sync_manual),  # ok
-    ("1.4", mem_share_salt),  # ok
-    ("2.1", tsm_ssh),  # ok
-    ("2.2", tsm),  # ok
-    ("2.3", solo_enable_moob),  # ok
-    ("2.4", snmp),  # ok
-    ("2.5", dcui_timeout),  # ok
-    ("2.6", shell_warning),  # ok
-    ("2.7", password_complexity),  # ok
-    ("2.8", account_lock_failure),  # ok
-    ("2.9", account_unlock_time),  # ok
-    ("2.10", password_history),  # ok
-    ("2.11", password_max_days),  # ok
-    ("2.12", session_timeout_api),  # ok
-    ("2.13", idle_timeout),  # ok
-    ("2.14", dcui_access),  # ok
-    ("2.15", exception_users),  # ok
-    ("2.16", tls_version),  # ok
-    ("3.1", syslog_persistent),  # ok
-    ("3.2", syslog_remote_loghost),  # ok
-    ("3.3", hostagent_log_level),  # ok
-    ("3.4", log_filtering),  # ok
-    ("3.5", tls_log_verify),  # ok
-    ("4.1", firewall_services_manual),  # 默认通过
-    ("4.2", collect_dvfilter),  # ok
-    ("4.3", bpdu_filter),  # ok
-    ("4.4", forged_transmits),  # 默认通过
-    ("4.5", mac_changes),   # 默认通过
-    ("4.6", vss_promiscuous_mode),  # 默认通过
-    ("4.7", vss_vlan_restrict),  # 默认通过
-    ("4.8", vss_vgt_check),  # 默认通过
-    ("4.9", management_network_manual),  # 默认通过
-    ("5.1", datastore_unique_names),  # 默认通过
-    ("6.1", vm_3d_graphics_status),  # 默认通过
-    ("6.2", vm_pci_passthru),  # 默认通过
-    ("6.3", vm_audio_device_manual),
-    ("6.4", vm_ahci_device_manual),
-    ("6.5", vm_usb_settings),
-    ("6.6", vm_serial_port),
-    ("6.7", vm_parallel_port),
-    ("6.8", vm_cd_drive),
-    ("6.9", vm_floppy_drive),
-    ("6.10", vm_hardware_version_manual),
-    ("7.1", vmware_tools_update_manual),
-    ("7.2", vmware_tools_auto_upgrade_manual),
-    ("7.3", vmware_tools_prevent_recustomization_manual)
-]
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, TYPE_CHECKING
+from config.check_registry import get_registry, required_facts
+
+if TYPE_CHECKING:
+    from config.facts import FactSet
+
+# 检查模块和依赖 pyVmomi / settings 的模块在用到时才导入，--list 等不连接 vCenter 的调用无需加载
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
-OUTPUT_DIR = "./log"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# 并发执行的检查数 & 单个检查的超时时间（秒）
+DEFAULT_WORKERS = 8
+DEFAULT_CHECK_TIMEOUT = 600
+
+
+def run_check(aiib_no: str, module, facts: "FactSet", rule_results: Dict[str, List[Dict[str, Any]]],
+              started: Dict[str, float], output_dir: str) -> None:
+    """
+    在工作线程中评估单个检查并导出 JSON（只读取采集结果，不访问 vCenter）
+    :param output_dir: 本检查的暂存目录（RunDirectory.stage），完成后由调度线程移入运行目录
+    """
+    from config.pipeline import evaluate_module, export_module
+
+    started[aiib_no] = time.monotonic()
+    logger.info("运行检查 %s -> %s", aiib_no, module.__name__)
+    export_module(module, evaluate_module(module, facts, rule_results), output_dir)
+
+
+def list_checks(only: List[str] = None):
+    """列出注册的检查（只读取模块源码中的 CHECK_INFO，不导入检查模块，不连接 vCenter）"""
+    for entry in get_registry().select(only):
+        print(f"{entry.aiib_no:<6} CIS {entry.cis_no:<7} {entry.section:<13} {entry.mode:<10} "
+              f"{entry.short_name:<45} {entry.tag or '-':<28} {entry.info.get('Rule') or '-'}")
+
+
+def run_all_checks(workers: int = DEFAULT_WORKERS, timeout: float = DEFAULT_CHECK_TIMEOUT,
+                   facts_file: str = None, save_facts_file: str = None,
+                   max_age: float = None, only: List[str] = None,
+                   hosts: List[str] = None) -> List[Dict[str, Any]]:
+    """
+    采集一次、评估多次：先用共享会话池并发采集所有 vCenter 的主机数据，
+    规则引擎一次遍历评估 YAML 中声明的全部规则，再在线程池中并发评估其余检查模块并导出。
+    - 结果写入本次运行目录 log/runs/<时间>/，全部结束后写 manifest 并切换 latest（见 config/run_store.py）
+    - 单个检查失败或超时不影响其他检查
+    - 每个检查写自己的 JSON 文件，汇总结果按注册表顺序返回
+    - 检查模块只在调度时导入，指定 only 时只导入、运行这几项，并且只采集这几项依赖的主机属性
+    - 指定 hosts 时只采集、评估名称匹配的主机（用于整改后的定向复查），其他主机的记录沿用上一次运行
+    :param workers: 最大并发检查数
+    :param timeout: 单个检查从开始执行算起的超时时间（秒）；采集阶段同样最多等待这么久，超时的 vCenter 记为采集失败
+    :param facts_file: 从文件加载采集结果（不连接 vCenter，用于修改规则后重新评估）
+    :param save_facts_file: 把本次采集结果保存到文件
+    :param max_age: 本地缓存的采集结果不超过该秒数时直接使用（默认 FACT_CACHE_CONFIG["ttl"]，0 表示强制采集）
+    :param only: 筛选条件，如 ["2.*", "3.1", "Network"]（见 CheckEntry.matches，默认全部）
+    :param hosts: 主机名通配符，如 ["vx-p-esxi-csz*"]（默认全部主机）
+    :return: [{"AIIB.No", "Module", "Status": Done/Failed/Timeout/Skipped, "Elapsed", "Error"}, ...]
+    """
+    from config.vsphere_conn import VsphereSessionPool
+    from config.facts import collect_facts, save_facts, load_facts
+    from config.pipeline import requires_hosts, evaluate_rules, export_rules
+    from config.run_store import RunDirectory
+
+    entries = get_registry().select(only)
+    check_modules = [(entry.aiib_no, entry.module) for entry in entries]
+    summary: Dict[str, Dict[str, Any]] = {}
+    started: Dict[str, float] = {}
+
+    with VsphereSessionPool() as sessions:
+        run = RunDirectory()
+        facts = None
+        if facts_file:
+            facts = load_facts(facts_file).select_hosts(hosts)
+        elif any(requires_hosts(module) for _, module in check_modules):
+            collect_started = time.monotonic()
+            needed = sorted(required_facts(entries)) if only else None
+            facts = collect_facts(sessions, max_age=max_age, facts=needed, host_patterns=hosts, timeout=timeout)
+            logger.info("采集完成: %d 台主机 (%.2fs)", len(facts.hosts), time.monotonic() - collect_started)
+        if facts is not None and save_facts_file:
+            save_facts(facts, save_facts_file)
+
+        # 规则引擎一次评估 YAML 中的全部规则；没有对应模块的规则直接导出（只运行部分检查时只评估这些检查的规则）
+        rule_results = None
+        if facts is not None:
+            module_rules = [m.CHECK_INFO["Rule"] for _, m in check_modules if m.CHECK_INFO.get("Rule")]
+            if only or hosts:
+                rule_results = evaluate_rules(facts, module_rules) if module_rules else None
+            else:
+                rule_results = evaluate_rules(facts)
+                export_rules(rule_results, run.path, exclude=module_rules)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cis-check")
+        pending = {}
+        for aiib_no, module in check_modules:
+            if not hasattr(module, "evaluate") and not module.CHECK_INFO.get("Rule"):
+                logger.warning("模块 %s 没有 evaluate() 方法或规则，跳过", module.__name__)
+                summary[aiib_no] = {"Status": "Skipped", "Elapsed": 0, "Error": None}
+                continue
+            future = executor.submit(run_check, aiib_no, module, facts, rule_results, started, run.stage(aiib_no))
+            pending[future] = aiib_no
+
+        while pending:
+            done, _ = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+
+            for future in done:
+                aiib_no = pending.pop(future)
+                elapsed = round(now - started.get(aiib_no, now), 2)
+                error = future.exception()
+                if error is None:
+                    run.adopt(aiib_no)
+                    summary[aiib_no] = {"Status": "Done", "Elapsed": elapsed, "Error": None}
+                    logger.info("检查 %s 完成 (%.2fs)", aiib_no, elapsed)
+                else:
+                    summary[aiib_no] = {"Status": "Failed", "Elapsed": elapsed, "Error": str(error)}
+                    logger.error("检查 %s 运行失败: %s", aiib_no, error)
+
+            # 超时的检查不再等待：线程无法强制终止，它的暂存目录不会被移入运行目录，结果文件沿用上一次运行的内容
+            for future, aiib_no in list(pending.items()):
+                if aiib_no in started and now - started[aiib_no] > timeout:
+                    pending.pop(future)
+                    summary[aiib_no] = {"Status": "Timeout", "Elapsed": round(now - started[aiib_no], 2),
+                                        "Error": f"超过 {timeout} 秒未完成"}
+                    logger.error("检查 %s 超时 (>%ss)", aiib_no, timeout)
+
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = [
+        {"AIIB.No": aiib_no, "Module": module.__name__, **summary[aiib_no]}
+        for aiib_no, module in check_modules
+    ]
+    failed = [r["AIIB.No"] for r in results if r["Status"] in ("Failed", "Timeout")]
+    logger.info("全部检查结束: 共 %d 项, 失败/超时 %d 项 %s", len(results), len(failed), failed or "")
+
+    selection = {k: v for k, v in (("Only", only), ("Hosts", hosts), ("FromFacts", facts_file)) if v}
+    run.finish(results, selection, hosts=hosts)
+    return results
+
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="VMware CIS 基线检查")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并发执行的检查数")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_CHECK_TIMEOUT, help="单个检查的超时时间（秒），采集阶段每个 vCenter 同样最多等待这么久")
+    parser.add_argument("--from-facts", dest="facts_file", help="从文件加载采集结果，不连接 vCenter，只重新评估")
+    parser.add_argument("--save-facts", dest="save_facts_file", help="把本次采集结果保存到文件")
+    parser.add_argument("--max-age", type=float, default=None,
+                        help="使用不超过该秒数的本地缓存采集结果（默认取 FACT_CACHE_TTL，0 表示强制重新采集）")
+    parser.add_argument("--list", action="store_true", help="列出注册的检查后退出")
+    parser.add_argument("--only", type=_split, default=None,
+                        help="只运行匹配的检查，逗号分隔：编号通配符 (2.*,3.1)、章节 (4 / Network)、"
+                             "Automated / Manual、模块名或 Tag (tsm, vm_*)")
+    parser.add_argument("--hosts", type=_split, default=None,
+                        help="只检查名称匹配的主机，逗号分隔的通配符，如 'vx-p-esxi-csz*'")
+    parser.add_argument("--watch", type=int, metavar="INTERVAL", default=None,
+                        help="常驻增量模式：每轮最多等待 INTERVAL 秒的属性变化，只重新评估受影响的检查")
+    return parser.parse_args()
 
 
-def run_all_checks():
-    """调用每个模块的 main() 方法，统一指定输出路径"""
-    for aiib_no, module in check_modules:
-        if not hasattr(module, "main"):
-            logger.warning("模块 %s 没有 main() 方法，跳过", module.__name__)
-            continue
+def watch_checks(interval: int):
+    """增量模式：首轮全量评估，之后只在主机属性变化时重新评估受影响的检查"""
+    from config.vsphere_conn import VsphereSessionPool
+    from config.incremental import watch
 
-        try:
-            logger.info("运行检查 %s -> %s.main()", aiib_no, module.__name__)
-            module.main(output_dir=OUTPUT_DIR)
-            logger.info("检查 %s 完成", aiib_no)
-        except Exception as e:
-            logger.error("检查 %s 运行失败: %s", aiib_no, e)
+    modules = [e.module for e in get_registry() if hasattr(e.module, "evaluate") or e.module.CHECK_INFO.get("Rule")]
+    with VsphereSessionPool() as sessions:
+        watch(modules, sessions, interval=interval)
 
 
 if __name__ == "__main__":
-    run_all_checks()
+    args = parse_args()
+    if args.list:
+        list_checks(args.only)
+    elif args.watch:
+        watch_checks(args.watch)
+    else:
+        run_all_checks(workers=args.workers, timeout=args.timeout, facts_file=args.facts_file,
+                       save_facts_file=args.save_facts_file, max_age=args.max_age, only=args.only,
+                       hosts=args.hosts)
@@ -4,10 +4,6 @@ const statusSelect = document.getElementById('statusSelect');
 
 let allData = []; // 保存所有 JSON 数据，方便筛选
 
-function friendlyFileName(filePath) {
-    return filePath.split('/').pop().replace('.json', '');
-}
-
 // 加载主机下拉列表
 async function loadHostOptions() {
     try {
@@ -26,31 +22,19 @@ async function loadHostOptions() {
     }
 }
 
-// 加载所有 JSON 文件数据
+// 加载最新一次运行的全部检查记录（/api/results 一次返回，带 ETag，未变化时服务端返回 304）
 async function loadAllJsonData() {
     tablesDiv.innerHTML = "";
     allData = [];
 
     try {
-        const response = await fetch('/log_files');
-        const jsonFiles = await response.json();
-
-        for (const file of jsonFiles) {
-            try {
-                const res = await fetch(file);
-                const data = await res.json();
-                if (data && data.length > 0) {
-                    data.forEach(item => item._file = friendlyFileName(file)); // 保存文件名
-                    allData = allData.concat(data);
-                }
-            } catch (err) {
-                console.error("加载 JSON 文件失败:", file, err);
-            }
-        }
+        const response = await fetch('/api/results');
+        const data = await response.json();
+        allData = data.Records || [];
 
         renderTables(); // 初始渲染
     } catch (err) {
-        console.error("获取 JSON 文件列表失败:", err);
+        console.error("获取检查结果失败:", err);
     }
 }
 
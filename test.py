@@ -1,41 +1,38 @@
 import os
 import logging
 import csv
-from typing import List, Dict, Any
-from pyVmomi import vim
+from typing import Dict, Any, Iterator
 from config.vsphere_conn import VsphereConnection
-from config.export_to_json import export_to_json
+from config.inventory import HostInventory, host_properties
+from config.export_to_json import export_to_json, atomic_open
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# 每页取回的主机数：每台主机的 config.option 有上千条，页越小同时留在内存中的设置越少
+ADVANCED_SETTINGS_PAGE_SIZE = 20
 
-def get_all_advanced_settings(content) -> List[Dict[str, Any]]:
+
+def get_all_advanced_settings(content) -> Iterator[Dict[str, Any]]:
     """
-    获取每台主机的所有 Advanced System Settings
-    返回列表，每个元素对应一台主机
+    逐台主机生成所有 Advanced System Settings（只获取高级设置相关属性），
+    每个元素对应一台主机，调用方逐台导出；主机属性逐页取回（每页 ADVANCED_SETTINGS_PAGE_SIZE 台），
+    内存中只保留当前一页主机的高级设置
     """
-    container = content.viewManager.CreateContainerView(content.rootFolder, [vim.HostSystem], True)
-    hosts = container.view
-    results = []
+    hosts = HostInventory.iter_hosts(content, host_properties(["AdvancedSettings"]), ADVANCED_SETTINGS_PAGE_SIZE)
 
     for host in hosts:
         try:
-            adv_settings = host.configManager.advancedOption.QueryOptions()
             host_settings = [
                 {"key": setting.key, "value": setting.value, "type": type(setting.value).__name__}
-                for setting in adv_settings
+                for setting in host.advanced_settings.values()
             ]
-
-            results.append({"Host": host.name, "AdvancedSettings": host_settings, "Error": None})
             logger.info("主机 %s 获取到 %d 条高级设置", host.name, len(host_settings))
+            yield {"Host": host.name, "AdvancedSettings": host_settings, "Error": None}
 
         except Exception as e:
-            results.append({"Host": host.name, "AdvancedSettings": [], "Error": str(e)})
             logger.error("主机 %s 获取高级设置失败: %s", host.name, e)
-
-    container.Destroy()
-    return results
+            yield {"Host": host.name, "AdvancedSettings": [], "Error": str(e)}
 
 
 def export_host_json_csv(host_data: Dict[str, Any], output_dir: str):
@@ -45,14 +42,14 @@ def export_host_json_csv(host_data: Dict[str, Any], output_dir: str):
     host_name = host_data["Host"]
     settings = host_data["AdvancedSettings"]
 
-    # JSON 导出
+    # JSON 导出（单台主机的设置条目较多，紧凑格式）
     json_file = os.path.join(output_dir, f"no_0.0_{host_name}_advanced_system_setting.json")
-    export_to_json(host_data, json_file)
+    export_to_json(host_data, json_file, compact=True)
     logger.info("主机 %s 高级设置 JSON 已导出到 %s", host_name, json_file)
 
     # CSV 导出
     csv_file = os.path.join(output_dir, f"no_0.0_{host_name}_advanced_system_setting.csv")
-    with open(csv_file, mode="w", newline="", encoding="utf-8") as f:
+    with atomic_open(csv_file, newline="") as f:
         writer = csv.DictWriter(f, fieldnames=["key", "value", "type"])
         writer.writeheader()
         for setting in settings:
@@ -67,10 +64,8 @@ def main(output_dir: str = None):
 
     with VsphereConnection() as si:
         content = si.RetrieveContent()
-        all_hosts_settings = get_all_advanced_settings(content)
-
-        # 针对每台主机导出独立 JSON 和 CSV
-        for host_data in all_hosts_settings:
+        # 针对每台主机导出独立 JSON 和 CSV（边获取边导出）
+        for host_data in get_all_advanced_settings(content):
             export_host_json_csv(host_data, output_dir)
 
 
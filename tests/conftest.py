@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# 测试直接导入项目根目录下的 config 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.facts import HostFacts  # noqa: E402
+
+
+@pytest.fixture
+def make_host():
+    """按需构造 HostFacts，只填写用到的数据项"""
+    def make(name: str, **facts) -> HostFacts:
+        return HostFacts({"Host": name, "Moid": f"host-{name}", "VCenter": "vc-test", "Errors": {}, **facts})
+    return make
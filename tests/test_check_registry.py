@@ -0,0 +1,25 @@
+import pytest
+
+from config.check_registry import CheckRegistry, required_facts
+from config.rule_engine import get_rule_engine
+
+
+def test_select_by_number_section_and_tag_without_importing():
+    registry = CheckRegistry()
+    assert [e.aiib_no for e in registry.select(["2.1?"])] == ["2.10", "2.11", "2.12", "2.13", "2.14", "2.15", "2.16"]
+    assert {e.section for e in registry.select(["4"])} == {"Network"}
+    assert [e.aiib_no for e in registry.select(["api session timeout", "vSwitch VLAN"])] == ["2.12", "4.7"]
+    # Tag 从模块源码读取，列出和筛选检查不导入模块
+    assert all(e._module is None for e in registry)
+
+    with pytest.raises(KeyError):
+        registry.select(["no-such-check"])
+
+
+def test_facts_follow_rule_definitions():
+    registry = CheckRegistry()
+    engine = get_rule_engine()
+    assert registry.get("2.2").facts == set(engine.rules["no_2.2"].facts)
+    assert registry.get("1.1").facts == {"Host"}
+    assert registry.get("4.1").facts == set()
+    assert required_facts(registry.select(["2.1", "6.1"])) == {"Host", "Services", "VMs"}
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+
+import pytest
+
+from config import settings
+from config.cmdb_exporter import CmdbExporter, SqliteDialect
+from config.export_to_json import export_to_json
+from config.run_store import RunDirectory
+
+
+@pytest.fixture(autouse=True)
+def no_background_export(monkeypatch):
+    # 测试直接调用导出器，finish() 不启动后台导出
+    monkeypatch.setitem(settings.CMDB_EXPORT_CONFIG, "enabled", False)
+    monkeypatch.setattr("config.cmdb_exporter.time.sleep", lambda seconds: None)
+
+
+class RecordingCursor:
+    def __init__(self, cursor, dialect):
+        self._cursor = cursor
+        self._dialect = dialect
+
+    def execute(self, sql, params=()):
+        return self._cursor.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        self._cursor.executemany(sql, rows)
+        self._dialect.batches.append(len(rows))
+        failure = self._dialect.failures.pop(0) if self._dialect.failures else None
+        if failure is not None:
+            raise failure
+
+    def close(self):
+        self._cursor.close()
+
+
+class RecordingConnection:
+    def __init__(self, conn, dialect):
+        self._conn = conn
+        self._dialect = dialect
+
+    def cursor(self):
+        return RecordingCursor(self._conn.cursor(), self._dialect)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._dialect.rollbacks += 1
+        self._conn.rollback()
+
+    def execute(self, sql):
+        return self._conn.execute(sql)
+
+    def close(self):
+        self._conn.close()
+
+
+class RecordingDialect(SqliteDialect):
+    """记录每批写入的行数；failures 按批次排列（None 表示该批正常），异常在写入之后、提交之前抛出"""
+
+    def __init__(self, path, failures=()):
+        super().__init__(path)
+        self.batches = []
+        self.rollbacks = 0
+        self.failures = list(failures)
+
+    def connect(self):
+        return RecordingConnection(super().connect(), self)
+
+
+def make_run(base_dir, records_by_file):
+    run = RunDirectory(base_dir, keep=5)
+    for name, records in records_by_file.items():
+        export_to_json(records, os.path.join(run.path, name))
+    run.finish()
+    return run
+
+
+def record(aiib_no, host, status, **extra):
+    return {"AIIB.No": aiib_no, "CIS.No": "x", "Name": "check", "Host": host, "Status": status, **extra}
+
+
+def rows(path, table="vmware_cis_results"):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT run_id, file, seq, host, status FROM {table} ORDER BY file, seq").fetchall()
+
+
+def test_reexport_overwrites_rows_by_run_file_and_seq(tmp_path):
+    db = str(tmp_path / "cmdb.db")
+    # 同一主机同一检查的两条记录（各 vCenter 一条）按文件内序号区分
+    run = make_run(str(tmp_path / "runs"), {
+        "no_2.1_tsm_ssh.json": [record("2.1", "esx-01", "Pass"), record("2.1", "esx-01", "Error", VCenter="vc-2")],
+        "no_2.2_tsm.json": [record("2.2", "esx-01", "Fail")],
+    })
+    exporter = CmdbExporter(SqliteDialect(db))
+    assert exporter.export_run(run.run_id, str(tmp_path / "runs")) == 3
+
+    export_to_json([record("2.2", "esx-01", "Pass")], os.path.join(run.path, "no_2.2_tsm.json"))
+    assert exporter.export_run(run.run_id, str(tmp_path / "runs")) == 3
+    exporter.close()
+
+    assert rows(db) == [
+        (run.run_id, "no_2.1_tsm_ssh.json", 0, "esx-01", "Pass"),
+        (run.run_id, "no_2.1_tsm_ssh.json", 1, "esx-01", "Error"),
+        (run.run_id, "no_2.2_tsm.json", 0, "esx-01", "Pass"),
+    ]
+
+
+def test_rows_are_written_in_batches(tmp_path):
+    db = str(tmp_path / "cmdb.db")
+    run = make_run(str(tmp_path / "runs"), {
+        "no_2.1_tsm_ssh.json": [record("2.1", f"esx-0{i}", "Pass") for i in range(5)],
+    })
+    dialect = RecordingDialect(db)
+    exporter = CmdbExporter(dialect, batch_size=2)
+    assert exporter.export_run(run.run_id, str(tmp_path / "runs")) == 5
+    exporter.close()
+
+    assert dialect.batches == [2, 2, 1]
+    assert len(rows(db)) == 5
+
+
+def test_transient_error_rolls_back_and_retries_the_batch(tmp_path):
+    db = str(tmp_path / "cmdb.db")
+    run = make_run(str(tmp_path / "runs"), {
+        "no_2.1_tsm_ssh.json": [record("2.1", f"esx-0{i}", "Pass") for i in range(3)],
+    })
+    dialect = RecordingDialect(db, failures=[sqlite3.OperationalError("database is locked")])
+    exporter = CmdbExporter(dialect, batch_size=2, retries=2)
+    assert exporter.export_run(run.run_id, str(tmp_path / "runs")) == 3
+    exporter.close()
+
+    # 第一批写入后出错：回滚，重新连接后整批重写
+    assert dialect.batches == [2, 2, 1]
+    assert dialect.rollbacks == 1
+    assert len(rows(db)) == 3
+
+
+def test_non_transient_error_keeps_committed_batches_only(tmp_path):
+    db = str(tmp_path / "cmdb.db")
+    run = make_run(str(tmp_path / "runs"), {
+        "no_2.1_tsm_ssh.json": [record("2.1", f"esx-0{i}", "Pass") for i in range(5)],
+    })
+    dialect = RecordingDialect(db, failures=[None, sqlite3.IntegrityError("constraint failed")])
+    exporter = CmdbExporter(dialect, batch_size=2, retries=2)
+    with pytest.raises(sqlite3.IntegrityError):
+        exporter.export_run(run.run_id, str(tmp_path / "runs"))
+    exporter.close()
+
+    # 不可重试的错误：第二批回滚后直接抛出，已提交的第一批保留
+    assert dialect.batches == [2, 2]
+    assert dialect.rollbacks == 1
+    assert len(rows(db)) == 2
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from config.inventory import HostInventory
+
+
+@pytest.fixture(autouse=True)
+def no_specs(monkeypatch):
+    # 替身 ContainerView 不是 ManagedObject，查询规格也用替身构造
+    monkeypatch.setattr("config.inventory.vmodl", mock.Mock())
+
+
+def make_content(names, page_size):
+    """分页返回主机 name 属性的 PropertyCollector 替身，记录每次请求"""
+    objects = [SimpleNamespace(obj=SimpleNamespace(_moId=f"host-{n}"), propSet=[SimpleNamespace(name="name", val=n)],
+                               missingSet=[]) for n in names]
+    pages = [objects[i:i + page_size] for i in range(0, len(objects), page_size)]
+
+    def page(index):
+        token = str(index + 1) if index + 1 < len(pages) else None
+        return SimpleNamespace(objects=pages[index], token=token)
+
+    collector = mock.Mock()
+    collector.RetrievePropertiesEx.side_effect = lambda specs, options: page(0)
+    collector.ContinueRetrievePropertiesEx.side_effect = lambda token: page(int(token))
+    view = mock.Mock()
+    content = mock.Mock(propertyCollector=collector)
+    content.viewManager.CreateContainerView.return_value = view
+    return content, view
+
+
+def test_iter_hosts_requests_one_page_at_a_time():
+    content, view = make_content([f"esx-0{i}" for i in range(5)], page_size=2)
+    hosts = HostInventory.iter_hosts(content, ["name"], page_size=2, host_patterns=["esx-0[0134]"])
+
+    assert next(hosts).name == "esx-00"
+    assert content.propertyCollector.ContinueRetrievePropertiesEx.call_count == 0
+    assert [h.name for h in hosts] == ["esx-01", "esx-03", "esx-04"]
+    assert content.propertyCollector.ContinueRetrievePropertiesEx.call_count == 2
+    view.Destroy.assert_called_once()
+
+
+def test_iter_hosts_cancels_remaining_pages_when_closed_early():
+    content, view = make_content([f"esx-0{i}" for i in range(5)], page_size=2)
+    hosts = HostInventory.iter_hosts(content, ["name"], page_size=2)
+    next(hosts)
+    hosts.close()
+
+    content.propertyCollector.CancelRetrievePropertiesEx.assert_called_once_with("1")
+    view.Destroy.assert_called_once()
+
+
+def test_retrieve_keeps_matching_hosts():
+    content, _ = make_content(["esx-01", "db-01", "ESX-02"], page_size=2)
+    inventory = HostInventory.retrieve(content, ["name"], page_size=2, host_patterns=["esx-*"])
+    assert [h.name for h in inventory] == ["esx-01", "ESX-02"]
+    assert inventory.by_name("ESX-02").moid == "host-ESX-02"
@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config import settings
+from config.export_to_json import export_to_json
+from config.result_index import ResultIndex
+from config.run_store import RunDirectory
+
+
+@pytest.fixture(autouse=True)
+def no_cmdb(monkeypatch):
+    monkeypatch.setitem(settings.CMDB_EXPORT_CONFIG, "enabled", False)
+
+
+def make_run(base_dir, status):
+    run = RunDirectory(base_dir, keep=10)
+    export_to_json([{"AIIB.No": "2.1", "CIS.No": "x", "Name": "check", "Host": "esx-01", "Status": status}],
+                   os.path.join(run.path, "no_2.1_tsm_ssh.json"))
+    run.finish()
+    return run.run_id
+
+
+def test_concurrent_requests_share_one_load_and_release_the_lock(tmp_path):
+    run_id = make_run(str(tmp_path), "Pass")
+    results = ResultIndex(str(tmp_path))
+    with ThreadPoolExecutor(8) as executor:
+        indexes = list(executor.map(lambda _: results.get(run_id), range(16)))
+
+    assert all(index is indexes[0] for index in indexes)
+    assert results._loading == {}
+
+
+def test_loading_locks_do_not_accumulate_across_runs(tmp_path):
+    results = ResultIndex(str(tmp_path), max_runs=2)
+    run_ids = [make_run(str(tmp_path), status) for status in ("Pass", "Fail", "Pass", "Fail")]
+    for run_id in run_ids:
+        assert results.get(run_id).run_id == run_id
+
+    assert list(results._runs) == run_ids[-2:]
+    assert results._loading == {}
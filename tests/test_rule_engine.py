@@ -0,0 +1,223 @@
+import pytest
+
+from config.facts import FactSet, VCenterFacts
+from config.rule_engine import RULE_TYPES, RuleEngine
+
+
+def make_rule(rule_type: str, rule: dict, **spec):
+    return RULE_TYPES[rule_type]({"id": "no_9.1", "name": "test", "CIS.NO": "9.1", "cmd": "cmd",
+                                  "description": "desc", "rule": rule, **spec})
+
+
+def setting(value, value_type="int"):
+    return {"value": value, "type": value_type}
+
+
+def service(key, policy="off", running=False):
+    return {"key": key, "label": key, "policy": policy, "running": running, "required": False}
+
+
+def vm(name, **fields):
+    return {"Name": name, "Errors": {}, **fields}
+
+
+def test_record_schema(make_host):
+    record = make_rule("advanced_setting", {"key": "Net.BlockGuestBPDU", "value": 1}).evaluate(
+        make_host("esx-01", AdvancedSettings={"Net.BlockGuestBPDU": setting(1)}))
+    assert list(record) == ["AIIB.No", "Name", "CIS.No", "CMD", "Host", "Value", "Status", "Description", "Error"]
+    assert record["AIIB.No"] == "9.1"
+    assert record["Value"] == {"key": "Net.BlockGuestBPDU", "value": 1, "type": "int"}
+    assert record["Status"] == "Pass"
+
+
+@pytest.mark.parametrize("rule, value, passed", [
+    ({"op": "equals", "value": 5}, 5, True),
+    ({"op": "equals", "value": 5}, 3, False),
+    ({"op": "in", "values": [False, 0], "ignore_case": True}, "FALSE", True),
+    ({"op": "regex", "pattern": "min=.*14"}, "retry=3 min=disabled,14", True),
+    ({"op": "range", "min": 900}, 899, False),
+    ({"op": "range", "min": 1, "max": 10}, 10, True),
+    ({"op": "contains", "values": ["sslv3", "tlsv1"], "ignore_case": True}, "SSLv3,TLSv1,TLSv1.1", True),
+    ({"op": "contains", "values": ["root"]}, "admin", False),
+    ({"op": "contains", "values": ["sslv3", "tlsv1"]}, "SSLv3,TLSv1,TLSv1.1", False),
+])
+def test_advanced_setting_ops(make_host, rule, value, passed):
+    host = make_host("esx-01", AdvancedSettings={"Some.Key": setting(value)})
+    record = make_rule("advanced_setting", {"key": "Some.Key", **rule}).evaluate(host)
+    assert record["Status"] == ("Pass" if passed else "Fail")
+
+
+def test_advanced_setting_value_format_and_templates(make_host):
+    rule = make_rule("advanced_setting", {"key": "Net.DVFilterBindIpAddress", "value": ""},
+                     value_format="text", description="value = '{value}'",
+                     descriptions={"missing": "not supported", "error": "failed"})
+
+    record = rule.evaluate(make_host("esx-01", AdvancedSettings={"Net.DVFilterBindIpAddress": setting(" ", "str")}))
+    assert (record["Value"], record["Status"], record["Description"]) == ("", "Pass", "value = '未配置'")
+
+    record = rule.evaluate(make_host("esx-02", AdvancedSettings={}))
+    assert (record["Value"], record["Status"], record["Description"]) == (None, "Fail", "not supported")
+    assert "Net.DVFilterBindIpAddress" in record["Error"]
+
+    record = rule.evaluate(make_host("esx-03", AdvancedSettings=None, Errors={"AdvancedSettings": "denied"}))
+    assert (record["Description"], record["Error"]) == ("failed", "denied")
+
+
+def test_error_value_is_copied_per_record(make_host):
+    rule = make_rule("advanced_setting", {"key": "Security.PasswordHistory", "min": 5, "op": "range"},
+                     error_value={"key": "Security.PasswordHistory", "value": None, "type": None})
+    first, second = (rule.evaluate(make_host(name, AdvancedSettings={})) for name in ("esx-01", "esx-02"))
+    assert first["Value"] == {"key": "Security.PasswordHistory", "value": None, "type": None}
+    first["Value"]["value"] = 1
+    assert second["Value"]["value"] is None
+
+
+def test_service_rule(make_host):
+    rule = make_rule("service", {"service": "snmpd", "ignore_case": True, "running": False},
+                     value_fields=["key", "running"], descriptions={"missing": "not found"})
+
+    record = rule.evaluate(make_host("esx-01", Services=[service("SNMPD", running=True)]))
+    assert (record["Value"], record["Status"]) == ({"key": "SNMPD", "running": True}, "Fail")
+
+    record = rule.evaluate(make_host("esx-02", Services=[]))
+    assert (record["Value"], record["Status"], record["Description"], record["Error"]) == \
+        (None, "Fail", "not found", None)
+
+    rule = make_rule("service", {"service": "TSM-SSH", "policy": ["off"], "missing": "Pass"})
+    assert rule.evaluate(make_host("esx-03", Services=[]))["Status"] == "Pass"
+    assert rule.evaluate(make_host("esx-04", Services=[service("TSM-SSH", policy="on")]))["Status"] == "Fail"
+
+
+def test_host_list_rule(make_host):
+    rule = make_rule("host_list", {"fact": "ntp_servers", "label": "NTPServers", "min_count": 2})
+    record = rule.evaluate(make_host("esx-01", NTPServers=["ntp1"]))
+    assert (record["Value"], record["Status"]) == ({"NTPServers": ["ntp1"], "Count": 1}, "Fail")
+    assert rule.evaluate(make_host("esx-02", NTPServers=["ntp1", "ntp2"]))["Status"] == "Pass"
+
+
+def test_engine_evaluates_each_rule_per_host(make_host):
+    rules = [make_rule("host_list", {"fact": "ntp_servers", "min_count": 1}),
+             make_rule("service", {"service": "TSM", "policy": ["off"]})]
+    rules[1].id = "no_9.2"
+    engine = RuleEngine(rules)
+    hosts = [make_host(f"esx-0{i}", NTPServers=["ntp1"], Services=[service("TSM")]) for i in (1, 2)]
+    results = engine.evaluate(hosts)
+    assert {rid: [r["Host"] for r in records] for rid, records in results.items()} == {
+        "no_9.1": ["esx-01", "esx-02"], "no_9.2": ["esx-01", "esx-02"]}
+    assert all(r["Status"] == "Pass" for records in results.values() for r in records)
+
+
+def test_load_rule_file():
+    engine = RuleEngine.load()
+    assert "no_2.1" in engine.rules
+    assert engine.rules["no_2.10"].cis_no == "3.14"
+
+
+def test_vm_device_rule(make_host):
+    host = make_host("esx-01", VMs=[
+        vm("app01", Devices={"cdrom": [{"Label": "CD/DVD drive 1", "Connected": False}]}),
+        vm("db01", Devices={"usb": [{"Label": "USB xHCI controller", "Connected": True}]}),
+        vm("web01", Devices=None, Errors={"Devices": "denied"}),
+    ])
+    record = make_rule("vm_device", {"device": "cdrom"}).evaluate(host)
+    assert record["Value"] == {"VMCount": 3, "VMs": {"app01": ["CD/DVD drive 1"]}, "Errors": {"web01": "denied"}}
+    assert record["Status"] == "Fail"
+
+    record = make_rule("vm_device", {"device": ["cdrom", "usb"], "connected_only": True}).evaluate(host)
+    assert record["Value"]["VMs"] == {"db01": ["USB xHCI controller"]}
+
+
+def test_missing_fact_is_an_error_not_a_pass(make_host):
+    record = make_rule("vm_device", {"device": "audio"}).evaluate(make_host("esx-01"))
+    assert record["Status"] == "Fail"
+    assert record["Error"]
+
+
+def test_vm_setting_rule(make_host):
+    host = make_host("esx-01", VMs=[
+        vm("app01", Settings={"pciPassthru0.present": "TRUE", "mks.enable3d": "FALSE"}),
+        vm("db01", Settings={"pciPassthru0.present": "FALSE"}),
+        vm("web01", Settings={}),
+    ])
+    record = make_rule("vm_setting", {"key": "pciPassthru*.present", "value": False, "ignore_case": True}).evaluate(host)
+    assert record["Value"] == {"VMCount": 3, "VMs": {"app01": {"pciPassthru0.present": "TRUE"}}}
+    assert record["Status"] == "Fail"
+
+    rule = make_rule("vm_setting", {"key": "mks.enable3d", "value": False, "ignore_case": True, "missing": "Fail"})
+    assert rule.evaluate(host)["Value"]["VMs"] == {"db01": {"mks.enable3d": None}, "web01": {"mks.enable3d": None}}
+
+
+def test_vm_version_rules(make_host):
+    host = make_host("esx-01", VMs=[
+        vm("app01", HardwareVersion=13, ToolsStatus="guestToolsNeedUpgrade", ToolsUpgradePolicy="manual"),
+        vm("db01", HardwareVersion=19, ToolsStatus="guestToolsCurrent", ToolsUpgradePolicy="upgradeAtPowerCycle"),
+    ])
+    record = make_rule("vm_hardware_version", {"min_version": 19}).evaluate(host)
+    assert record["Value"] == {"VMCount": 2, "Versions": {"vmx-13": 1, "vmx-19": 1}, "VMs": {"app01": "vmx-13"}}
+    assert record["Status"] == "Fail"
+
+    record = make_rule("vm_tools", {"item": "ToolsStatus", "values": ["guestToolsCurrent"]}).evaluate(host)
+    assert record["Value"] == {"VMCount": 2, "VMs": {"app01": "guestToolsNeedUpgrade"}}
+
+
+def test_vswitch_security_and_vlan_rules(make_host):
+    network = {
+        "VSwitches": [{"Name": "vSwitch0", "Security": {"AllowPromiscuous": False, "MacChanges": True,
+                                                        "ForgedTransmits": False}}],
+        "PortGroups": [
+            {"Name": "Management", "VlanId": 0, "Security": {"AllowPromiscuous": False, "MacChanges": True,
+                                                             "ForgedTransmits": False}},
+            {"Name": "Trunk", "VlanId": 4095, "Security": {"AllowPromiscuous": None, "MacChanges": False,
+                                                           "ForgedTransmits": False}},
+        ],
+    }
+    host = make_host("esx-01", Network=network)
+
+    record = make_rule("vswitch_security", {"policy": "MacChanges"}).evaluate(host)
+    assert record["Status"] == "Fail"
+    assert record["Value"]["VSwitches"] == {"vSwitch0": True}
+    assert record["Value"]["PortGroups"] == {"Management": True}
+
+    record = make_rule("vswitch_security", {"policy": "AllowPromiscuous"}).evaluate(host)
+    assert record["Value"]["PortGroups"] == {"Trunk": None}
+    assert make_rule("vswitch_security", {"policy": "ForgedTransmits"}).evaluate(host)["Status"] == "Pass"
+
+    record = make_rule("portgroup_vlan", {"reject": [1, "4000-4095"]}).evaluate(host)
+    assert (record["Value"]["PortGroups"], record["Status"]) == ({"Trunk": 4095}, "Fail")
+    assert make_rule("portgroup_vlan", {"reject": [1]}).evaluate(host)["Status"] == "Pass"
+
+
+def test_datastore_unique_across_vcenters(make_host):
+    def mount(name, url, moid):
+        return {"Name": name, "Url": url, "Moid": moid}
+
+    facts = FactSet([
+        VCenterFacts("vc-a", [
+            make_host("esx-01", Datastores=[mount("shared", "ds:///shared/", "ds-1"), mount("local01", "ds:///a1/", "ds-2")]),
+            make_host("esx-02", Datastores=[mount("shared", "ds:///shared/", "ds-1")]),
+        ]),
+        VCenterFacts("vc-b", [
+            make_host("esx-03", Datastores=[mount("shared", "ds:///shared/", "ds-1"), mount("LOCAL01", "ds:///b1/", "ds-9")]),
+        ]),
+    ])
+    rule = make_rule("datastore_unique", {"ignore_case": True})
+    engine = RuleEngine([rule])
+    # 只评估 esx-01，索引仍来自全部 vCenter
+    selected = facts.select_hosts(["esx-01"])
+    contexts = engine.prepare(selected)
+    record = engine.evaluate(selected.hosts, contexts=contexts)[rule.id][0]
+
+    assert record["Status"] == "Fail"
+    assert record["Value"]["DatastoreCount"] == 2
+    assert record["Value"]["Duplicates"] == {"local01": [
+        {"Url": "ds:///a1/", "VCenters": ["vc-a"], "Hosts": ["esx-01"]},
+        {"Url": "ds:///b1/", "VCenters": ["vc-b"], "Hosts": ["esx-03"]},
+    ]}
+
+    record = engine.evaluate(facts.vcenters[0].hosts[1:], contexts=engine.prepare(facts))[rule.id][0]
+    assert record["Status"] == "Pass"
+
+    case_sensitive = make_rule("datastore_unique", {"ignore_case": False})
+    context = case_sensitive.prepare(facts)
+    assert case_sensitive.evaluate(facts.hosts[0], context)["Status"] == "Pass"
+    assert case_sensitive.evaluate(facts.hosts[0])["Error"]
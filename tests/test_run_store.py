@@ -0,0 +1,132 @@
+import os
+import json
+import threading
+from unittest import mock
+
+import pytest
+
+from config import settings
+from config.export_to_json import export_to_json
+from config.run_store import MANIFEST, SUMMARY, RunDirectory, diff_runs, latest_run, list_runs, load_manifest
+
+
+@pytest.fixture(autouse=True)
+def no_cmdb(monkeypatch):
+    monkeypatch.setitem(settings.CMDB_EXPORT_CONFIG, "enabled", False)
+
+
+def write(run, name, records):
+    export_to_json(records, os.path.join(run.path, name))
+
+
+def record(aiib_no, host, status):
+    return {"AIIB.No": aiib_no, "Name": "check", "CIS.No": "x", "Host": host, "Status": status}
+
+
+def test_finish_writes_manifest_summary_and_latest(tmp_path):
+    run = RunDirectory(str(tmp_path), keep=5)
+    write(run, "no_2.1_tsm_ssh.json", [record("2.1", "esx-01", "Pass")])
+    manifest = run.finish([{"AIIB.No": "2.1", "Status": "Done"}], {"Only": ["2.1"]})
+
+    assert latest_run(str(tmp_path)) == run.run_id
+    assert load_manifest(run.run_id, str(tmp_path)) == manifest
+    assert manifest["Previous"] is None
+    assert manifest["Selection"] == {"Only": ["2.1"]}
+    assert list(manifest["Files"]) == ["no_2.1_tsm_ssh.json"]
+    assert manifest["Files"]["no_2.1_tsm_ssh.json"]["Size"] == os.path.getsize(
+        os.path.join(run.path, "no_2.1_tsm_ssh.json"))
+    with open(os.path.join(run.path, SUMMARY), encoding="utf-8") as f:
+        assert json.load(f)["Totals"] == {"Pass": 1, "Total": 1}
+
+
+def test_finish_carries_over_missing_files(tmp_path):
+    first = RunDirectory(str(tmp_path), keep=5)
+    write(first, "no_2.1_tsm_ssh.json", [record("2.1", "esx-01", "Pass")])
+    write(first, "no_2.2_tsm.json", [record("2.2", "esx-01", "Pass")])
+    first.finish()
+
+    # 只重新运行 2.1：2.2 的结果从上一次运行沿用
+    second = RunDirectory(str(tmp_path), keep=5)
+    write(second, "no_2.1_tsm_ssh.json", [record("2.1", "esx-01", "Fail")])
+    manifest = second.finish()
+
+    assert manifest["Previous"] == first.run_id
+    assert "From" not in manifest["Files"]["no_2.1_tsm_ssh.json"]
+    assert manifest["Files"]["no_2.2_tsm.json"]["From"] == first.run_id
+    assert os.path.samefile(os.path.join(first.path, "no_2.2_tsm.json"), os.path.join(second.path, "no_2.2_tsm.json"))
+    assert diff_runs(first.run_id, second.run_id, str(tmp_path)) == {
+        "Added": [], "Removed": [], "Changed": ["no_2.1_tsm_ssh.json"]}
+    with open(os.path.join(second.path, SUMMARY), encoding="utf-8") as f:
+        assert json.load(f)["Totals"] == {"Fail": 1, "Pass": 1, "Total": 2}
+
+    # 沿用的文件继续指向最早产生它的运行
+    third = RunDirectory(str(tmp_path), keep=5)
+    assert third.finish()["Files"]["no_2.2_tsm.json"]["From"] == first.run_id
+
+
+def test_finish_merges_other_hosts_for_host_filtered_runs(tmp_path):
+    first = RunDirectory(str(tmp_path), keep=5)
+    write(first, "no_2.1_tsm_ssh.json", [record("2.1", "esx-01", "Fail"), record("2.1", "esx-02", "Fail"),
+                                         record("2.1", None, "Fail")])
+    write(first, "no_4.1_firewall.json", [record("4.1", "ALL_HOSTS", "Pass")])
+    first.finish()
+
+    # --hosts esx-01：本次文件只有 esx-01，esx-02 的记录从上一次运行合并，vCenter 级记录以本次为准
+    second = RunDirectory(str(tmp_path), keep=5)
+    write(second, "no_2.1_tsm_ssh.json", [record("2.1", "esx-01", "Pass")])
+    write(second, "no_4.1_firewall.json", [record("4.1", "ALL_HOSTS", "Pass")])
+    manifest = second.finish(hosts=["ESX-01"])
+
+    with open(os.path.join(second.path, "no_2.1_tsm_ssh.json"), encoding="utf-8") as f:
+        assert [(r["Host"], r["Status"]) for r in json.load(f)] == [("esx-02", "Fail"), ("esx-01", "Pass")]
+    with open(os.path.join(second.path, "no_4.1_firewall.json"), encoding="utf-8") as f:
+        assert len(json.load(f)) == 1
+    assert manifest["Files"]["no_2.1_tsm_ssh.json"]["Size"] == os.path.getsize(
+        os.path.join(second.path, "no_2.1_tsm_ssh.json"))
+
+
+def test_finish_ignores_staged_output_that_was_not_adopted(tmp_path):
+    run = RunDirectory(str(tmp_path), keep=5)
+    export_to_json([record("2.1", "esx-01", "Pass")], os.path.join(run.stage("2.1"), "no_2.1_tsm_ssh.json"))
+    assert run.adopt("2.1") == ["no_2.1_tsm_ssh.json"]
+    # 超时的检查：暂存的文件不进入本次运行
+    export_to_json([record("2.2", "esx-01", "Pass")], os.path.join(run.stage("2.2"), "no_2.2_tsm.json"))
+
+    manifest = run.finish()
+    assert list(manifest["Files"]) == ["no_2.1_tsm_ssh.json"]
+    assert sorted(os.listdir(run.path)) == [MANIFEST, "no_2.1_tsm_ssh.json", SUMMARY]
+
+
+def test_finish_does_not_wait_for_cmdb_export(tmp_path, monkeypatch):
+    monkeypatch.setitem(settings.CMDB_EXPORT_CONFIG, "enabled", True)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_export(run_id, base_dir):
+        started.set()
+        release.wait(5)
+        raise ConnectionError("cmdb unreachable")
+
+    run = RunDirectory(str(tmp_path), keep=5)
+    write(run, "no_2.1_tsm_ssh.json", [record("2.1", "esx-01", "Pass")])
+    with mock.patch("config.cmdb_exporter.CmdbExporter") as exporter:
+        exporter.return_value.export_run.side_effect = slow_export
+        run.finish()
+        # 导出还在进行时 latest 已经切换，finish() 已返回
+        assert started.wait(5)
+        assert latest_run(str(tmp_path)) == run.run_id
+        assert run.export_thread.is_alive()
+        release.set()
+        run.export_thread.join(5)
+
+    # 导出失败只记录日志，导出器照常关闭
+    assert not run.export_thread.is_alive()
+    exporter.return_value.close.assert_called_once()
+
+
+def test_prune_keeps_latest_runs(tmp_path):
+    runs = []
+    for _ in range(3):
+        run = RunDirectory(str(tmp_path), keep=2)
+        run.finish()
+        runs.append(run.run_id)
+    assert list_runs(str(tmp_path)) == runs[1:]
@@ -0,0 +1,45 @@
+from config.summary import build_summary
+
+
+def record(aiib_no, host, status, name="check"):
+    return {"AIIB.No": aiib_no, "Name": name, "CIS.No": "x", "Host": host, "Status": status}
+
+
+def test_counts_and_matrix():
+    summary = build_summary([
+        record("2.10", "esx-02", "Pass"),
+        record("2.1", "esx-01", "Pass"),
+        record("2.1", "esx-02", "Fail"),
+        record("4.2", "esx-01", "Manual"),
+        record("4.1", "ALL_HOSTS", "Pass"),
+        record("4.2", None, "Fail"),
+    ], run_id="20260101-000000")
+
+    assert summary["RunId"] == "20260101-000000"
+    assert summary["Totals"] == {"Pass": 3, "Fail": 2, "Manual": 1, "Total": 6}
+    # 检查按编号数值排序，2.10 在 2.1 之后
+    assert list(summary["Checks"]) == ["2.1", "2.10", "4.1", "4.2"]
+    assert summary["Checks"]["2.1"] == {"Name": "check", "CIS.No": "x", "Pass": 1, "Fail": 1, "Total": 2}
+    assert summary["Sections"] == {"Access": {"Pass": 2, "Fail": 1, "Total": 3},
+                                   "Network": {"Manual": 1, "Pass": 1, "Fail": 1, "Total": 3}}
+    # ALL_HOSTS 和没有主机的记录不进入主机统计和矩阵
+    assert list(summary["Hosts"]) == ["esx-01", "esx-02"]
+    assert summary["Matrix"]["Checks"] == ["2.1", "2.10", "4.1", "4.2"]
+    assert summary["Matrix"]["Rows"] == {"esx-01": "P--?", "esx-02": "FP--"}
+
+
+def test_matrix_keeps_worst_status_per_cell():
+    summary = build_summary([
+        record("6.3", "esx-01", "Pass"),
+        record("6.3", "esx-01", "Fail"),
+        record("6.3", "esx-01", "Unknown"),
+        record("6.4", "esx-01", None),
+    ])
+    assert summary["Matrix"]["Rows"] == {"esx-01": "F?"}
+    assert summary["Hosts"]["esx-01"] == {"Pass": 1, "Fail": 1, "Unknown": 2, "Total": 4}
+
+
+def test_empty_run():
+    summary = build_summary([])
+    assert summary["Totals"] == {}
+    assert summary["Matrix"]["Rows"] == {}
@@ -0,0 +1,54 @@
+from config.vm_settings import VmSettingIndex, VmVersionIndex
+
+
+def vm(name, **fields):
+    return {"Name": name, "Errors": {}, **fields}
+
+
+def test_lookup_exact_key_ignores_case():
+    index = VmSettingIndex([vm("app01", Settings={"mks.enable3d": "TRUE"}), vm("db01", Settings={"MKS.Enable3D": "FALSE"})])
+    assert index.lookup("Mks.Enable3d") == {"app01": {"mks.enable3d": "TRUE"}, "db01": {"MKS.Enable3D": "FALSE"}}
+    assert index.lookup("mks.enable3") == {}
+
+
+def test_lookup_wildcard_within_prefix():
+    index = VmSettingIndex([
+        vm("app01", Settings={"pciPassthru0.present": "TRUE", "pciPassthru1.present": "FALSE", "pciPassthru0.id": "x"}),
+        vm("db01", Settings={"pciHole.start": "2048", "pciPassthru.use64bitMMIO": "TRUE"}),
+    ])
+    assert index.lookup("pciPassthru*.present") == {
+        "app01": {"pciPassthru0.present": "TRUE", "pciPassthru1.present": "FALSE"}}
+    assert index.lookup("pciPassthru?.id") == {"app01": {"pciPassthru0.id": "x"}}
+    assert set(index.lookup("pci*")) == {"app01", "db01"}
+    # 通配符在开头时没有固定前缀，匹配全部键
+    assert index.lookup("*.present") == index.lookup("pciPassthru*.present")
+
+
+def test_lookup_records_vms_without_settings():
+    index = VmSettingIndex([vm("app01", Settings={}), vm("db01"), vm("web01", Errors={"Settings": "denied"})])
+    assert index.vm_names == ["app01", "db01", "web01"]
+    assert index.errors == {"db01": "没有采集该虚拟机的高级设置", "web01": "denied"}
+
+
+def test_version_below_and_histogram():
+    index = VmVersionIndex([
+        vm("app01", HardwareVersion=19), vm("db01", HardwareVersion=13), vm("web01", HardwareVersion=14),
+        vm("old01", HardwareVersion=13), vm("bad01", HardwareVersion=None),
+    ])
+    assert index.below(14) == [(13, "db01"), (13, "old01")]
+    assert index.below(19) == [(13, "db01"), (13, "old01"), (14, "web01")]
+    assert index.below(13) == []
+    assert index.below(100)[-1] == (19, "app01")
+    assert index.histogram == {13: 2, 14: 1, 19: 1}
+    assert index.errors["HardwareVersion"] == {"bad01": "无法识别的硬件版本"}
+
+
+def test_version_by_value_and_missing_items():
+    index = VmVersionIndex([
+        vm("app01", ToolsStatus="guestToolsCurrent"),
+        vm("db01", ToolsStatus="guestToolsNeedUpgrade"),
+        vm("web01", ToolsStatus="guestToolsCurrent", Errors={"ToolsUpgradePolicy": "denied"}),
+    ])
+    assert index.by_value("ToolsStatus") == {"guestToolsCurrent": ["app01", "web01"], "guestToolsNeedUpgrade": ["db01"]}
+    assert index.errors["ToolsUpgradePolicy"]["web01"] == "denied"
+    assert set(index.errors["HardwareVersion"]) == {"app01", "db01", "web01"}
@@ -1,44 +1,32 @@
-import os
+import sys
 import logging
-from typing import List, Dict, Any
-from config.export_to_json import export_to_json
+from config.vsphere_conn import VsphereSessionPool
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# 判定规则见 config/vmware_cis_checks.yaml (id: no_5.1)，由规则引擎统一评估
+CHECK_INFO = {
+    "AIIB.No": "5.1",
+    "Name": "Host must ensure all datastores have unique names (Manual)",
+    "CIS.No": "6.2.2",
+    "Output": "no_5.1_datastore_unique_names.json",
+    "Tag": "[Datastore Unique]",
+    "Requires": ["hosts"],
+    "Rule": "no_5.1",
+}
 
-def get_datastore_unique_names() -> List[Dict[str, Any]]:
-    """
-    Datastore 名称唯一性检查（默认通过，手工确认）。
-    """
-    results: List[Dict[str, Any]] = [{
-        "AIIB.No": "5.1",
-        "Name": "Host must ensure all datastores have unique names (Manual)",
-        "CIS.No": "6.2.2",
-        "CMD": r'Get-Datastore | Select Name, VMHost',
-        "Host": "ALL_HOSTS",
-        "Value": "默认通过（手工确认唯一）",
-        "Duplicates": None,
-        "Status": "Pass",
-        "Description": "Datastore 名称默认假定唯一，需手工验证",
-        "Error": None
-    }]
-    logger.info("[Datastore Unique] 默认通过检查")
-    return results
 
-
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions: VsphereSessionPool = None, max_age: float = None):
     """
-    直接返回默认通过结果并导出 JSON。
+    循环多个 vCenter，在全部 vCenter 中查找重名的数据存储，按主机汇总，输出为 JSON 文件
+    :param output_dir: 输出目录路径（默认写入新的运行目录并切换 latest）
+    :param sessions: 共享的 vCenter 会话池（为空时每个 vCenter 单独登录）
+    :param max_age: 允许使用的缓存采集结果最大时间（秒），0 表示强制重新采集
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_5.1_datastore_unique_names.json")
-
-    results = get_datastore_unique_names()
-    export_to_json(results, output_path)
-    logger.info("[Datastore Unique] 检查结果已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)
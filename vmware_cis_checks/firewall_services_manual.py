@@ -1,13 +1,22 @@
-import os
+import sys
 import logging
 from typing import List, Dict, Any
-from config.export_to_json import export_to_json
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+CHECK_INFO = {
+    "AIIB.No": "4.1",
+    "Name": "Host firewall services must be restricted to authorized networks (Manual)",
+    "CIS.No": "5.1",
+    "Output": "no_4.1_firewall_services_manual.json",
+    "Tag": "[Firewall]",
+    "Requires": [],
+}
 
-def get_hosts_firewall_services() -> List[Dict[str, Any]]:
+
+def evaluate(hosts=None) -> List[Dict[str, Any]]:
     """
     防火墙规则检查（默认通过，手工确认）。
     返回示例结果，Value 可自定义为空或默认允许配置。
@@ -28,18 +37,12 @@ def get_hosts_firewall_services() -> List[Dict[str, Any]]:
     return results
 
 
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions=None, max_age: float = None):
     """
     直接返回默认通过结果并导出 JSON。
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_4.1_firewall_services_manual.json")
-
-    results = get_hosts_firewall_services()
-    export_to_json(results, output_path)
-    logger.info("[Firewall] 防火墙检查结果已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)
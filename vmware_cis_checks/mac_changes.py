@@ -1,43 +1,32 @@
-import os
+import sys
 import logging
-from typing import List, Dict, Any
-from config.export_to_json import export_to_json
+from config.vsphere_conn import VsphereSessionPool
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# 判定规则见 config/vmware_cis_checks.yaml (id: no_4.5)，由规则引擎统一评估
+CHECK_INFO = {
+    "AIIB.No": "4.5",
+    "Name": "Host should reject MAC address changes on standard virtual switches and port groups (Automated)",
+    "CIS.No": "5.7",
+    "Output": "no_4.5_mac_changes.json",
+    "Tag": "[vSwitch MAC Changes]",
+    "Requires": ["hosts"],
+    "Rule": "no_4.5",
+}
 
-def get_hosts_mac_changes() -> List[Dict[str, Any]]:
-    """
-    标准 vSwitch MAC Address Changes 检查（默认通过，手工确认）。
-    """
-    results: List[Dict[str, Any]] = [{
-        "AIIB.No": "4.5",
-        "Name": "Host standard vSwitch must reject MAC Address Changes",
-        "CIS.No": "5.7",
-        "CMD": r'Get-VirtualSwitch | Select Name, @{Name="MacChanges";Expression={$_.Policy.Security.MacChanges}}',
-        "Host": "ALL_HOSTS",
-        "Value": "默认通过（手工确认）",
-        "Status": "Pass",
-        "Description": "vSwitch MAC Address Changes 默认认为已拒绝（手工确认）",
-        "Error": None
-    }]
-    logger.info("[vSwitch MAC Changes] 默认通过检查")
-    return results
 
-
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions: VsphereSessionPool = None, max_age: float = None):
     """
-    直接返回默认通过结果并导出 JSON。
+    循环多个 vCenter，按主机汇总未拒绝 MAC 地址更改的标准 vSwitch 及端口组，输出为 JSON 文件
+    :param output_dir: 输出目录路径（默认写入新的运行目录并切换 latest）
+    :param sessions: 共享的 vCenter 会话池（为空时每个 vCenter 单独登录）
+    :param max_age: 允许使用的缓存采集结果最大时间（秒），0 表示强制重新采集
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_4.5_mac_changes.json")
-
-    results = get_hosts_mac_changes()
-    export_to_json(results, output_path)
-    logger.info("[vSwitch MAC Changes] 检查结果已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)
@@ -1,13 +1,22 @@
-import os
+import sys
 import logging
 from typing import List, Dict, Any
-from config.export_to_json import export_to_json
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+CHECK_INFO = {
+    "AIIB.No": "4.9",
+    "Name": "Host management network interfaces must be isolated",
+    "CIS.No": "5.11",
+    "Output": "no_4.9_management_network_manual.json",
+    "Tag": "[Management Network]",
+    "Requires": [],
+}
 
-def get_management_networks() -> List[Dict[str, Any]]:
+
+def evaluate(hosts=None) -> List[Dict[str, Any]]:
     """
     管理网络 VMkernel 检查（默认通过，手工确认隔离）。
     """
@@ -26,18 +35,12 @@ def get_management_networks() -> List[Dict[str, Any]]:
     return results
 
 
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions=None, max_age: float = None):
     """
     直接返回默认通过结果并导出 JSON。
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_4.9_management_network_manual.json")
-
-    results = get_management_networks()
-    export_to_json(results, output_path)
-    logger.info("[Management Network] 检查结果已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)
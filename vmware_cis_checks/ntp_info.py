@@ -1,94 +1,32 @@
-import os
+import sys
 import logging
-from typing import List, Dict, Any
-from pyVmomi import vim
-from config.vsphere_conn import VsphereConnection
-from config.export_to_json import export_to_json
-from config import settings
+from config.vsphere_conn import VsphereSessionPool
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# 判定规则见 config/vmware_cis_checks.yaml (id: no_1.2)，由规则引擎统一评估
+CHECK_INFO = {
+    "AIIB.No": "1.2",
+    "Name": "Host must have reliable time synchronization sources",
+    "CIS.No": "2.6",
+    "Output": "no_1.2_ntp_info.json",
+    "Tag": "[NTP]",
+    "Requires": ["hosts"],
+    "Rule": "no_1.2",
+}
 
-def collect_ntp_info(content) -> List[Dict[str, Any]]:
-    """
-    收集所有主机的 NTP 配置并增加状态字段
-    :param content: vSphere service instance content
-    :return: 每台主机的 NTP 检查结果列表
-    """
-    container = content.viewManager.CreateContainerView(content.rootFolder, [vim.HostSystem], True)
-    hosts = container.view
-    results: List[Dict[str, Any]] = []
-
-    for host in hosts:
-        try:
-            ntp_servers = host.config.dateTimeInfo.ntpConfig.server or []
-            count = len(ntp_servers)
-
-            results.append({
-                "AIIB.No": "1.2",
-                "Name": "Host must have reliable time synchronization sources",
-                "CIS.No": "2.6",
-                "CMD": r'Get-VMHost | Select-Object Name, @{Name="NTPSetting"; Expression={ ($_ | Get-VMHostNtpServer)}}',
-                "Host": host.name,
-                "Value": {"NTPServers": ntp_servers, "Count": count},
-                "Status": "Pass" if count >= 2 else "Fail",
-                "Description": "检测值: 配置的 NTP 服务器列表, 推荐至少 2 个可靠 NTP 源或使用 PTP 并配置 NTP 备份",
-                "Error": None
-            })
-
-            logger.info("[NTP] 主机: %s | NTP: %s | Status: %s",
-                        host.name,
-                        ntp_servers if ntp_servers else "未配置",
-                        "Pass" if count >= 2 else "Fail")
-
-        except Exception as e:
-            results.append({
-                "AIIB.No": "1.2",
-                "Name": "Host must have reliable time synchronization sources",
-                "CIS.No": "2.6",
-                "CMD": r'Get-VMHost | Select-Object Name, @{Name="NTPSetting"; Expression={ ($_ | Get-VMHostNtpServer)}}',
-                "Host": host.name,
-                "Value": {"NTPServers": [], "Count": 0},
-                "Status": "Fail",
-                "Description": "NTP server configuration (Error)",
-                "Error": str(e)
-            })
-            logger.error("[NTP] 主机 %s 获取 NTP 配置失败: %s", host.name, e)
 
-    container.Destroy()
-    return results
-
-
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions: VsphereSessionPool = None, max_age: float = None):
     """
     循环多个 vCenter，收集所有主机的 NTP 配置，输出为一个 JSON 文件
-    :param output_dir: 输出目录路径（默认 ../log）
+    :param output_dir: 输出目录路径（默认写入新的运行目录并切换 latest）
+    :param sessions: 共享的 vCenter 会话池（为空时每个 vCenter 单独登录）
+    :param max_age: 允许使用的缓存采集结果最大时间（秒），0 表示强制重新采集
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_1.2_ntp_info.json")
-
-    # 读取 vCenter 列表
-    vsphere_data = settings.get_vsphere_config(os.getenv('project_env', 'prod'))
-    host_list = vsphere_data["HOST"]
-    if not isinstance(host_list, list):
-        host_list = [host_list]
-
-    all_results: List[Dict[str, Any]] = []
-
-    for vc_host in host_list:
-        try:
-            with VsphereConnection(host=vc_host) as si:
-                content = si.RetrieveContent()
-                results = collect_ntp_info(content)
-                all_results.extend(results)
-        except Exception as e:
-            logger.error("[NTP] 连接 vCenter %s 失败: %s", vc_host, e)
-
-    export_to_json(all_results, output_path)
-    logger.info("[NTP] 所有主机的 NTP 配置已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)
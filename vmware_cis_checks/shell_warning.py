@@ -1,100 +1,29 @@
-import os
+import sys
 import logging
-from typing import List, Dict, Any
-from pyVmomi import vim
-from config.vsphere_conn import VsphereConnection
-from config.export_to_json import export_to_json
-from config import settings
+from config.vsphere_conn import VsphereSessionPool
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# 判定规则见 config/vmware_cis_checks.yaml (id: no_2.6)，由规则引擎统一评估
+CHECK_INFO = {
+    "AIIB.No": "2.6",
+    "Name": "Host must not suppress warnings that the shell is enabled",
+    "CIS.No": "3.10",
+    "Output": "no_2.6_shell_warning_status.json",
+    "Tag": "[ShellWarning]",
+    "Requires": ["hosts"],
+    "Rule": "no_2.6",
+}
 
-def collect_shell_warning_status(content) -> List[Dict[str, Any]]:
-    """
-    收集每台主机 UserVars.SuppressShellWarning 配置
-    推荐值：0 (显示警告)
-    :param content: vSphere service instance content
-    :return: 每台主机 Shell Warning 检查结果列表
-    """
-    container = content.viewManager.CreateContainerView(content.rootFolder, [vim.HostSystem], True)
-    results: List[Dict[str, Any]] = []
-
-    for host in container.view:
-        record = {
-            "AIIB.No": "2.6",
-            "Name": "Host must not suppress warnings that the shell is enabled",
-            "CIS.No": "3.10",
-            "CMD": "Get-VMHost | Get-AdvancedSetting -Name UserVars.SuppressShellWarning",
-            "Host": host.name,
-            "Value": None,
-            "Status": "Fail",
-            "Description": "未配置或错误",
-            "Error": None
-        }
-
-        try:
-            adv_settings = host.configManager.advancedOption.QueryOptions("UserVars.SuppressShellWarning")
-            if adv_settings:
-                setting = adv_settings[0]
-                value = int(setting.value) if setting.value is not None else 1
-                status = "Pass" if value == 0 else "Fail"
-
-                record.update({
-                    "Value": {
-                        "key": setting.key,
-                        "value": value,
-                        "type": type(setting.value).__name__
-                    },
-                    "Status": status,
-                    "Description": '当 value=1 表示抑制警告，不符合要求；当 value=0 表示显示警告，符合要求'
-                })
-
-                logger.info("[ShellWarning] 主机: %s, value=%s, Status=%s", host.name, value, status)
-            else:
-                logger.warning("[ShellWarning] 主机 %s 未找到 UserVars.SuppressShellWarning 设置", host.name)
-
-        except Exception as e:
-            record.update({
-                "Value": None,
-                "Status": "Fail",
-                "Error": str(e)
-            })
-            logger.error("[ShellWarning] 主机 %s 查询 UserVars.SuppressShellWarning 失败: %s", host.name, e)
 
-        results.append(record)
-
-    container.Destroy()
-    return results
-
-
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions: VsphereSessionPool = None, max_age: float = None):
     """
     循环多个 vCenter，收集所有主机 Shell Warning 配置，输出为 JSON 文件
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_2.6_shell_warning_status.json")
-
-    vsphere_data = settings.get_vsphere_config(os.getenv("project_env", "prod"))
-    host_list = vsphere_data.get("HOST", [])
-    if not isinstance(host_list, list):
-        host_list = [host_list]
-
-    all_results: List[Dict[str, Any]] = []
-
-    for vc_host in host_list:
-        try:
-            with VsphereConnection(host=vc_host) as si:
-                content = si.RetrieveContent()
-                results = collect_shell_warning_status(content)
-                all_results.extend(results)
-        except Exception as e:
-            logger.error("[ShellWarning] 连接 vCenter %s 失败: %s", vc_host, e)
-
-    export_to_json(all_results, output_path)
-    logger.info("[ShellWarning] 所有主机 Shell Warning 检查结果已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)
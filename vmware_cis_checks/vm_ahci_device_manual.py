@@ -1,45 +1,32 @@
-import os
+import sys
 import logging
-from typing import List, Dict, Any
-from config.export_to_json import export_to_json
+from config.vsphere_conn import VsphereSessionPool
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# 判定规则见 config/vmware_cis_checks.yaml (id: no_6.4)，由规则引擎统一评估
+CHECK_INFO = {
+    "AIIB.No": "6.4",
+    "Name": "Virtual machines must remove unnecessary AHCI devices (Manual)",
+    "CIS.No": "7.11",
+    "Output": "no_6.4_vm_ahci_device_manual.json",
+    "Tag": "[VM AHCI Device]",
+    "Requires": ["hosts"],
+    "Rule": "no_6.4",
+}
 
-def get_vm_ahci_device_manual(content=None) -> List[Dict[str, Any]]:
-    """
-    手工检查：Virtual machines must remove unnecessary AHCI devices
-    默认通过
-    """
-    results: List[Dict[str, Any]] = [{
-        "AIIB.No": "6.4",
-        "Name": "Virtual machines must remove unnecessary AHCI devices (Manual)",
-        "CIS.No": "7.11",
-        "CMD": None,
-        "Host": "ALL_HOSTS",
-        "Value": "默认通过（手工确认）",
-        "Status": "Pass",
-        "Description": "VM AHCI 设备默认假定已移除不必要设备，需手工验证",
-        "Error": None
-    }]
-
-    logger.info("[VM AHCI Device] 默认通过检查生成完成")
-    return results
 
-
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions: VsphereSessionPool = None, max_age: float = None):
     """
-    直接返回默认通过结果并导出 JSON。
+    循环多个 vCenter，按主机汇总虚拟机的 AHCI 控制器，输出为 JSON 文件
+    :param output_dir: 输出目录路径（默认写入新的运行目录并切换 latest）
+    :param sessions: 共享的 vCenter 会话池（为空时每个 vCenter 单独登录）
+    :param max_age: 允许使用的缓存采集结果最大时间（秒），0 表示强制重新采集
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_6.4_vm_ahci_device_manual.json")
-
-    results = get_vm_ahci_device_manual()
-    export_to_json(results, output_path)
-    logger.info("[VM AHCI Device] 检查结果已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)
@@ -1,43 +1,32 @@
-import os
+import sys
 import logging
-from typing import List, Dict, Any
-from config.export_to_json import export_to_json
+from config.vsphere_conn import VsphereSessionPool
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# 判定规则见 config/vmware_cis_checks.yaml (id: no_6.2)，由规则引擎统一评估
+CHECK_INFO = {
+    "AIIB.No": "6.2",
+    "Name": "Virtual machines must limit PCI/PCIe device passthrough functionality (Automated)",
+    "CIS.No": "7.7",
+    "Output": "no_6.2_vm_pci_passthru.json",
+    "Tag": "[VM PCI Passthrough]",
+    "Requires": ["hosts"],
+    "Rule": "no_6.2",
+}
 
-def get_vm_pci_passthru() -> List[Dict[str, Any]]:
-    """
-    VM PCI/PCIe Passthrough 检查（默认通过，自动化检查可手工确认）。
-    """
-    results: List[Dict[str, Any]] = [{
-        "AIIB.No": "6.2",
-        "Name": "Virtual machines must limit PCI/PCIe device passthrough functionality (Automated)",
-        "CIS.NO": "7.7",
-        "CMD": r'Get-VM | Get-AdvancedSetting -Name "pciPassthru*.present" | Select Entity,Name,Value',
-        "Host": "ALL_HOSTS",
-        "Value": "默认通过（手工确认 PCI/PCIe Passthrough 未滥用）",
-        "Status": "Pass",
-        "Description": "VM PCI/PCIe passthrough 默认假定安全，需手工验证",
-        "Error": None
-    }]
-    logger.info("[VM PCI Passthrough] 默认通过检查")
-    return results
 
-
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions: VsphereSessionPool = None, max_age: float = None):
     """
-    直接返回默认通过结果并导出 JSON。
+    循环多个 vCenter，按主机汇总配置了 PCI/PCIe 直通的虚拟机，输出为 JSON 文件
+    :param output_dir: 输出目录路径（默认写入新的运行目录并切换 latest）
+    :param sessions: 共享的 vCenter 会话池（为空时每个 vCenter 单独登录）
+    :param max_age: 允许使用的缓存采集结果最大时间（秒），0 表示强制重新采集
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_6.2_vm_pci_passthru.json")
-
-    results = get_vm_pci_passthru()
-    export_to_json(results, output_path)
-    logger.info("[VM PCI Passthrough] 检查结果已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)
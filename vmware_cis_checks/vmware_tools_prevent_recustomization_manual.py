@@ -1,13 +1,22 @@
-import os
+import sys
 import logging
 from typing import List, Dict
-from config.export_to_json import export_to_json
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+CHECK_INFO = {
+    "AIIB.No": "7.3",
+    "Name": "VMware Tools on deployed virtual machines must prevent being recustomized",
+    "CIS.No": "8.4",
+    "Output": "no_7.3_vmware_tools_prevent_recustomization_manual.json",
+    "Tag": "[7.3]",
+    "Requires": [],
+}
 
-def get_vmware_tools_prevent_recustomization_manual(content=None) -> List[Dict]:
+
+def evaluate(hosts=None) -> List[Dict]:
     """
     VMware Tools on deployed virtual machines must prevent being recustomized (默认通过)
     """
@@ -26,18 +35,12 @@ def get_vmware_tools_prevent_recustomization_manual(content=None) -> List[Dict]:
     return results
 
 
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions=None, max_age: float = None):
     """
     导出 VMware Tools 防止 VM 重新定制检查 JSON
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_7.3_vmware_tools_prevent_recustomization_manual.json")
-
-    results = get_vmware_tools_prevent_recustomization_manual()
-    export_to_json(results, output_path)
-    logger.info("[7.3] 检查结果已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)
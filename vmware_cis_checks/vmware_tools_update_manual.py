@@ -1,45 +1,32 @@
-import os
+import sys
 import logging
-from typing import List, Dict
-from config.export_to_json import export_to_json
+from config.vsphere_conn import VsphereSessionPool
+from config.pipeline import run_checks, parse_module_args
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# 判定规则见 config/vmware_cis_checks.yaml (id: no_7.1)，由规则引擎统一评估
+CHECK_INFO = {
+    "AIIB.No": "7.1",
+    "Name": "VMware Tools must have all software updates installed (Manual)",
+    "CIS.No": "8.2",
+    "Output": "no_7.1_vmware_tools_update_manual.json",
+    "Tag": "[VMware Tools Update]",
+    "Requires": ["hosts"],
+    "Rule": "no_7.1",
+}
 
-def get_vmware_tools_update_manual(content=None) -> List[Dict]:
-    """
-    手工检查：VMware Tools must have all software updates installed
-    默认通过
-    """
-    results: List[Dict] = [{
-        "AIIB.No": "7.1",
-        "Name": "VMware Tools must have all software updates installed (Manual)",
-        "CIS.No": "8.2",
-        "CMD": None,
-        "Host": "ALL_HOSTS",
-        "Value": "默认通过（手工确认）",
-        "Status": "Pass",
-        "Description": "VMware Tools 更新默认假定已安装，需人工验证",
-        "Error": None
-    }]
-
-    logger.info("[VMware Tools Update] 默认通过检查生成完成")
-    return results
 
-
-def main(output_dir: str = None):
+def main(output_dir: str = None, sessions: VsphereSessionPool = None, max_age: float = None):
     """
-    直接返回默认通过结果并导出 JSON。
+    循环多个 vCenter，按主机汇总 VMware Tools 不是最新版本的虚拟机，输出为 JSON 文件
+    :param output_dir: 输出目录路径（默认写入新的运行目录并切换 latest）
+    :param sessions: 共享的 vCenter 会话池（为空时每个 vCenter 单独登录）
+    :param max_age: 允许使用的缓存采集结果最大时间（秒），0 表示强制重新采集
     """
-    output_dir = output_dir or "../log"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "no_7.1_vmware_tools_update_manual.json")
-
-    results = get_vmware_tools_update_manual()
-    export_to_json(results, output_path)
-    logger.info("[VMware Tools Update] 检查结果已导出到 %s", output_path)
+    run_checks([sys.modules[__name__]], output_dir, sessions=sessions, max_age=max_age)
 
 
 if __name__ == "__main__":
-    main()
+    main(max_age=parse_module_args().max_age)